@@ -0,0 +1,132 @@
+"""Сериализация ответов JSON API без экземпляров моделей.
+
+Ресурс описывает поля ответа словарём «имя → путь ORM». Список и
+отдельный объект читаются одним `values()` только по выбранным полям:
+связи приходят JOIN-ом, так что число запросов не зависит от числа
+объектов, а параметр `fields` (`?fields=id,text`) избавляет клиента от
+лишних колонок — например, от полного текста постов в ленте.
+"""
+from django.core.files.storage import default_storage
+from django.http import QueryDict
+
+from posts.utils import NUMBER_OF_OBJECTS, CursorPaginator
+
+MAX_LIMIT = 100
+
+
+class FieldError(ValueError):
+    pass
+
+
+def image_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Resource:
+    """Поля ресурса и их преобразование для ответа."""
+
+    def __init__(self, fields, formatters=None):
+        self.fields = fields
+        self.formatters = formatters or {}
+
+    def select(self, request):
+        """Имена полей из параметра `fields`; по умолчанию все."""
+        names = [name for name in request.GET.get('fields', '').split(',')
+                 if name]
+        unknown = set(names) - self.fields.keys()
+        if unknown:
+            raise FieldError(
+                'Неизвестные поля: ' + ', '.join(sorted(unknown))
+            )
+        return names or list(self.fields)
+
+    def values(self, queryset, names, extra=()):
+        lookups = {self.fields[name] for name in names} | set(extra)
+        return queryset.values(*lookups)
+
+    def render(self, row, names):
+        data = {}
+        for name in names:
+            value = row[self.fields[name]]
+            formatter = self.formatters.get(name)
+            data[name] = formatter(value) if formatter else value
+        return data
+
+    def one(self, request, queryset):
+        """Объект из `queryset` или None, если его нет."""
+        names = self.select(request)
+        row = self.values(queryset, names).first()
+        return None if row is None else self.render(row, names)
+
+    def page(self, request, queryset, ordering):
+        """Страница keyset-пагинации со ссылками на соседние страницы."""
+        names = self.select(request)
+        try:
+            limit = min(int(request.GET.get('limit', NUMBER_OF_OBJECTS)),
+                        MAX_LIMIT)
+        except ValueError:
+            raise FieldError('limit должен быть числом')
+        paginator = ValuesCursorPaginator(
+            self.values(queryset, names, extra=ordering_fields(ordering)),
+            max(limit, 1), ordering
+        )
+        page = paginator.get_page(request.GET.get('cursor'))
+        return {
+            'results': [self.render(row, names) for row in page],
+            'next': page_url(request, page.next_cursor),
+            'previous': page_url(request, page.previous_cursor),
+        }
+
+
+def ordering_fields(ordering):
+    return [field.lstrip('-') for field in ordering]
+
+
+class ValuesCursorPaginator(CursorPaginator):
+    """`CursorPaginator` для словарей из `values()`."""
+
+    def _key(self, obj):
+        return [str(obj[field]) for field in self.fields]
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = QueryDict(mutable=True)
+    query.update(request.GET)
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+POSTS = Resource({
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}, formatters={'image': image_url})
+
+GROUPS = Resource({
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+    'posts_count': 'posts_count',
+    'last_post_at': 'last_post_at',
+})
+
+COMMENTS = Resource({
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+})
+
+PROFILES = Resource({
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'post_counter__posts_count',
+}, formatters={'posts_count': lambda value: value or 0})
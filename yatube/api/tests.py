@@ -0,0 +1,183 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiReadTest(TestCase):
+    """Чтение постов, групп, комментариев и профилей"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author',
+                                              first_name='Лев')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {number}')
+            for number in range(25)
+        )
+        cls.post = Post.objects.create(author=cls.author, text='Последний')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f'Коммент {i}')
+            for i in range(3)
+        )
+        counters.recount()
+
+    def collect(self, url, **params):
+        """Все объекты списка, пройденного по ссылкам `next`."""
+        results = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            results += data['results']
+            if data['next'] is None:
+                return results
+            response = self.client.get(data['next'])
+
+    def test_posts_are_paginated_by_cursor(self):
+        """Список постов проходится по курсору целиком и по порядку"""
+        ids = [post['id'] for post in self.collect(reverse('api:posts'))]
+        expected = list(Post.objects.order_by('-pub_date', '-pk')
+                        .values_list('pk', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_posts_filter_and_fields(self):
+        """Фильтр по группе и выбор полей"""
+        results = self.collect(reverse('api:posts'), group='group',
+                               fields='id,group')
+        self.assertEqual(len(results), 25)
+        self.assertEqual(set(results[0]), {'id', 'group'})
+        self.assertEqual({post['group'] for post in results}, {'group'})
+
+    def test_unknown_field_is_rejected(self):
+        """Неизвестное поле даёт 400"""
+        response = self.client.get(reverse('api:posts'), {'fields': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('x', response.json()['detail'])
+
+    def test_queries_do_not_depend_on_page_size(self):
+        """Число запросов списка не зависит от размера страницы"""
+        counts = []
+        for limit in (2, 20):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('api:posts'),
+                                           {'limit': limit})
+            self.assertEqual(len(response.json()['results']), limit)
+            counts.append(len(queries))
+        self.assertEqual(counts, [1, 1])
+
+    def test_detail_views(self):
+        """Пост, группа, комментарии и профиль"""
+        post = self.client.get(
+            reverse('api:post_detail', args=(self.post.pk,))).json()
+        self.assertEqual(post['author'], 'author')
+        self.assertIsNone(post['group'])
+        group = self.client.get(
+            reverse('api:group_detail', args=('group',))).json()
+        self.assertEqual(group['posts_count'], 25)
+        comments = self.collect(reverse('api:comments', args=(self.post.pk,)))
+        self.assertEqual([comment['text'] for comment in comments],
+                         ['Коммент 2', 'Коммент 1', 'Коммент 0'])
+        profile = self.client.get(
+            reverse('api:profile', args=('author',))).json()
+        self.assertEqual(profile['first_name'], 'Лев')
+        self.assertEqual(profile['posts_count'], 26)
+        groups = self.collect(reverse('api:groups'))
+        self.assertEqual([group['slug'] for group in groups], ['group'])
+
+    def test_missing_objects_are_not_found(self):
+        """Несуществующие объекты отдают 404 в JSON"""
+        for url in (reverse('api:post_detail', args=(10 ** 6,)),
+                    reverse('api:comments', args=(10 ** 6,)),
+                    reverse('api:group_detail', args=('missing',)),
+                    reverse('api:profile', args=('missing',))):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+
+class ApiWriteTest(TestCase):
+    """Запись через API идёт через формы и сигналы сайта"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_create_and_edit_post(self):
+        """Автор создаёт пост и правит его; чужой правки нет"""
+        response = self.client.post(
+            reverse('api:posts'), {'text': 'Новый', 'group': self.group.pk},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        post_id = response.json()['id']
+        url = reverse('api:post_detail', args=(post_id,))
+        response = self.client.patch(url, {'text': 'Исправленный'},
+                                     content_type='application/json')
+        self.assertEqual(response.json()['text'], 'Исправленный')
+        self.assertEqual(response.json()['group'], 'group')
+        response = self.reader_client.patch(
+            url, {'text': 'Чужая правка'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 403)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+    def test_writes_require_login(self):
+        """Аноним не пишет, пустой текст не проходит форму"""
+        response = Client().post(reverse('api:posts'), {'text': 'Пост'})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(reverse('api:posts'), {'text': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+
+    def test_comment(self):
+        """Комментарий создаётся и виден в списке"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        url = reverse('api:comments', args=(post.pk,))
+        response = self.reader_client.post(url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'reader')
+        self.assertEqual(len(self.client.get(url).json()['results']), 1)
+
+    def test_follow_feed_follow_and_unfollow(self):
+        """Подписка наполняет ленту, отписка её очищает"""
+        Post.objects.create(author=self.author, text='Пост автора')
+        follow = reverse('api:follow', args=('author',))
+        feed = reverse('api:follow_feed')
+        self.assertEqual(self.reader_client.post(follow).status_code, 201)
+        self.assertEqual(
+            [post['text'] for post in
+             self.reader_client.get(feed).json()['results']],
+            ['Пост автора']
+        )
+        self.assertTrue(self.reader_client.get(
+            reverse('api:profile', args=('author',))).json()['following'])
+        self.reader_client.delete(follow)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.reader_client.get(feed).json()['results'], [])
+        self.assertEqual(self.client.post(follow).status_code, 400)
+        self.assertEqual(Client().get(feed).status_code, 401)
+
+    def test_wrong_method(self):
+        """Неподдерживаемый метод даёт 405 с Allow"""
+        response = self.client.delete(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, POST')
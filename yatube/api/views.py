@@ -0,0 +1,192 @@
+"""JSON API: те же данные и действия, что у posts.urls, без шаблонов.
+
+Чтение доступно всем, запись — вошедшим пользователям по сессии
+(с CSRF-токеном, как у форм сайта). Запись идёт через формы posts,
+поэтому проверки и сигналы (счётчики, ленты, кэш) те же, что у HTML.
+Тело записи — JSON-объект или, для POST, поля формы (картинка поста
+передаётся только формой). Ошибки приходят JSON-ом: `{"detail": ...}`
+и, для форм, `errors`.
+"""
+import json
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.http.multipartparser import MultiPartParserError
+from django.shortcuts import get_object_or_404
+
+from posts import timeline
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import COMMENT_ORDERING, CURSOR_ORDERING
+
+from .serializers import COMMENTS, GROUPS, POSTS, PROFILES, FieldError
+
+User = get_user_model()
+GROUP_ORDERING = ('title', 'pk')
+
+
+class ApiError(Exception):
+
+    def __init__(self, status, detail, errors=None):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.errors = errors
+
+
+def api_view(*methods):
+    """Проверяет метод и переводит ошибки в ответы JSON."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = error(405, 'Метод не поддерживается')
+                response['Allow'] = ', '.join(methods)
+                return response
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as problem:
+                return error(problem.status, problem.detail, problem.errors)
+            except FieldError as problem:
+                return error(400, str(problem))
+            except Http404:
+                return error(404, 'Не найдено')
+        return wrapper
+    return decorator
+
+
+def error(status, detail, errors=None):
+    data = {'detail': detail}
+    if errors is not None:
+        data['errors'] = errors
+    return JsonResponse(data, status=status)
+
+
+def require_user(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужно войти')
+    return request.user
+
+
+def payload(request):
+    """Данные запроса: JSON-объект или поля формы."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError(400, 'Тело запроса не JSON')
+        if not isinstance(data, dict):
+            raise ApiError(400, 'Ожидается JSON-объект')
+        return data
+    try:
+        return request.POST
+    except MultiPartParserError:
+        raise ApiError(400, 'Не удалось разобрать тело запроса')
+
+
+def submit(form):
+    if not form.is_valid():
+        raise ApiError(400, 'Ошибка в данных', form.errors.get_json_data())
+    return form
+
+
+def post_detail_response(request, post_id, status=200):
+    data = POSTS.one(request, Post.objects.filter(pk=post_id))
+    if data is None:
+        raise Http404
+    return JsonResponse(data, status=status)
+
+
+@api_view('GET', 'POST')
+def posts(request):
+    if request.method == 'POST':
+        user = require_user(request)
+        form = submit(PostForm(payload(request), files=request.FILES))
+        post = form.save(commit=False)
+        post.author = user
+        post.save()
+        return post_detail_response(request, post.pk, status=201)
+    queryset = Post.objects.all()
+    if 'group' in request.GET:
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        queryset = queryset.filter(author__username=request.GET['author'])
+    return JsonResponse(POSTS.page(request, queryset, CURSOR_ORDERING))
+
+
+@api_view('GET', 'PATCH')
+def post_detail(request, post_id):
+    if request.method == 'PATCH':
+        user = require_user(request)
+        post = get_object_or_404(Post, pk=post_id)
+        if post.author_id != user.pk:
+            raise ApiError(403, 'Редактировать пост может только автор')
+        data = {'text': post.text, 'group': post.group_id}
+        data.update(payload(request))
+        submit(PostForm(data, instance=post)).save()
+    return post_detail_response(request, post_id)
+
+
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    if request.method == 'POST':
+        user = require_user(request)
+        post = get_object_or_404(Post, pk=post_id)
+        comment = submit(CommentForm(payload(request))).save(commit=False)
+        comment.post = post
+        comment.author = user
+        comment.save()
+        data = COMMENTS.one(request, Comment.objects.filter(pk=comment.pk))
+        return JsonResponse(data, status=201)
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return JsonResponse(COMMENTS.page(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_ORDERING
+    ))
+
+
+@api_view('GET')
+def groups(request):
+    return JsonResponse(GROUPS.page(request, Group.objects.all(),
+                                    GROUP_ORDERING))
+
+
+@api_view('GET')
+def group_detail(request, slug):
+    data = GROUPS.one(request, Group.objects.filter(slug=slug))
+    if data is None:
+        raise Http404
+    return JsonResponse(data)
+
+
+@api_view('GET')
+def follow_feed(request):
+    user = require_user(request)
+    return JsonResponse(POSTS.page(request, timeline.feed(user, keyset=True),
+                                   timeline.CURSOR_ORDERING))
+
+
+@api_view('GET')
+def profile(request, username):
+    data = PROFILES.one(request, User.objects.filter(username=username))
+    if data is None:
+        raise Http404
+    if request.user.is_authenticated:
+        data['following'] = Follow.objects.filter(
+            user=request.user, author__username=username
+        ).exists()
+    return JsonResponse(data)
+
+
+@api_view('POST', 'DELETE')
+def follow(request, username):
+    user = require_user(request)
+    if request.method == 'DELETE':
+        Follow.objects.filter(user=user, author__username=username).delete()
+        return JsonResponse({'following': False})
+    author = get_object_or_404(User, username=username)
+    if author == user:
+        raise ApiError(400, 'Нельзя подписаться на себя')
+    Follow.objects.get_or_create(user=user, author=author)
+    return JsonResponse({'following': True}, status=201)
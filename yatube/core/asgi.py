@@ -0,0 +1,177 @@
+"""ASGI-приложение для Django 2.2, у которого своего ASGI ещё нет.
+
+Соединения обслуживает цикл событий: он читает тело запроса во
+временный файл (первые `SPOOL_SIZE` байт в памяти) и только потом
+отдаёт запрос обычному WSGI-обработчику Django в пул из
+`settings.ASGI_THREADS` потоков. Медленная загрузка картинки или
+медленный клиент занимают корутину, а не поток; потоки, а с ними и
+соединения с базой, заняты только на время работы представления.
+
+Адреса из `settings.ASGI_ROUTES` обслуживают асинхронные приложения
+без пула: так устроены долгие потоки событий, которые иначе держали бы
+поток на всё время соединения. Такое приложение создаётся с пулом
+обработчика и может выполнять в нём короткую синхронную работу.
+
+Поддерживаются соединения `http` и `lifespan`.
+"""
+import asyncio
+import io
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+SPOOL_SIZE = 1024 * 1024
+# Ключ окружения WSGI, по которому представление узнаёт, что запрос
+# пришёл через это приложение.
+ENVIRON_KEY = 'yatube.asgi'
+
+
+def to_wsgi_str(value):
+    """Строка WSGI: байты, прочитанные как latin-1 (PEP 3333)."""
+    return value.encode('utf-8').decode('latin-1')
+
+
+def build_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': to_wsgi_str(scope.get('root_path', '')),
+        'PATH_INFO': to_wsgi_str(scope['path']),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1] or 80),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        ENVIRON_KEY: True,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+def is_asgi(request):
+    """Обслуживается ли запрос через ASGI, а не WSGI-сервером."""
+    return request.META.get(ENVIRON_KEY, False)
+
+
+def request_from_scope(scope):
+    """Запрос без тела с сессией и пользователем для приложений из
+    ASGI_ROUTES; читает базу, так что вызывается в потоке пула."""
+    request = WSGIRequest(build_environ(scope, io.BytesIO()))
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    request.user = auth.get_user(request)
+    return request
+
+
+class ASGIHandler:
+    """ASGI 3 поверх WSGI-приложения с ограниченным пулом потоков."""
+
+    def __init__(self, wsgi_application=None, max_threads=None):
+        self.wsgi_application = wsgi_application or get_wsgi_application()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_threads or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+        self.routes = {
+            reverse(name): import_string(path)(self.executor)
+            for name, path in settings.ASGI_ROUTES.items()
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип соединения '
+                             f'{scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса; None, если клиент отключился раньше."""
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    async def http(self, scope, receive, send):
+        route = self.routes.get(scope['path'])
+        if route is not None:
+            await route(scope, receive, send)
+            return
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            status, headers, chunks = await loop.run_in_executor(
+                self.executor, self.run_wsgi, build_environ(scope, body)
+            )
+        finally:
+            body.close()
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk,
+                        'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    def run_wsgi(self, environ):
+        """Выполняет запрос в потоке пула и собирает ответ целиком."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            chunks = [chunk for chunk in response if chunk]
+        finally:
+            # Здесь Django шлёт request_finished и закрывает соединения.
+            if hasattr(response, 'close'):
+                response.close()
+        return started['status'], started['headers'], chunks
@@ -0,0 +1,14 @@
+"""SQLite, в котором `atomic` начинает транзакцию с BEGIN IMMEDIATE.
+
+Django начинает транзакцию с BEGIN (DEFERRED): блокировка на запись
+берётся на первой записи, и если её уже держит другой писатель, SQLite
+сразу отвечает «database is locked», не дожидаясь busy_timeout.
+BEGIN IMMEDIATE берёт блокировку в начале транзакции и ждёт её.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
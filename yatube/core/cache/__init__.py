@@ -0,0 +1,11 @@
+"""Бэкенды кэша, общие для всех воркеров.
+
+Выбираются в settings.CACHES по переменной окружения YATUBE_CACHE:
+
+* ``locmem`` — кэш в памяти процесса (по умолчанию, для разработки);
+* ``redis`` — любой сервер, говорящий на протоколе Redis;
+* ``sqlite`` — файл SQLite для развёртывания на одном хосте.
+
+Все бэкенды считают попадания и промахи (``cache.stats()``), сетевой и
+файловый сжимают большие значения, например отрендеренные страницы.
+"""
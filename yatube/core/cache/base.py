@@ -0,0 +1,81 @@
+import pickle
+import threading
+import zlib
+from collections import Counter
+
+from .. import metrics
+
+PLAIN = b'p'
+COMPRESSED = b'z'
+
+
+class Serializer:
+    """Pickle со сжатием zlib для значений длиннее `min_length` байт.
+
+    Целые числа хранятся как текст, чтобы сервер мог сам выполнять
+    INCR над ними.
+    """
+
+    def __init__(self, min_length=1024, level=6):
+        self.min_length = min_length
+        self.level = level
+
+    def dumps(self, value):
+        if type(value) is int:
+            return str(value).encode()
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self.min_length is not None and len(data) >= self.min_length:
+            return COMPRESSED + zlib.compress(data, self.level)
+        return PLAIN + data
+
+    def loads(self, data):
+        marker, payload = data[:1], data[1:]
+        if marker == COMPRESSED:
+            return pickle.loads(zlib.decompress(payload))
+        if marker == PLAIN:
+            return pickle.loads(payload)
+        return int(data)
+
+
+def serializer_from_options(options):
+    return Serializer(
+        min_length=options.get('COMPRESS_MIN_LENGTH', 1024),
+        level=options.get('COMPRESS_LEVEL', 6),
+    )
+
+
+class StatsMixin:
+    """Счётчики попаданий и промахов кэша в пределах процесса.
+
+    Считает обращения через `get`; бэкенды со своим `get_many`
+    отчитываются через `_record` сами.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def _record(self, hits=0, misses=0):
+        with self._stats_lock:
+            self._stats['hits'] += hits
+            self._stats['misses'] += misses
+        metrics.record_cache(hits, misses)
+
+    def get(self, key, default=None, version=None):
+        missing = object()
+        value = super().get(key, missing, version=version)
+        if value is missing:
+            self._record(misses=1)
+            return default
+        self._record(hits=1)
+        return value
+
+    def stats(self):
+        with self._stats_lock:
+            return {'hits': self._stats['hits'],
+                    'misses': self._stats['misses']}
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats.clear()
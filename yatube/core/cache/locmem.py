@@ -0,0 +1,7 @@
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+
+from .base import StatsMixin
+
+
+class LocMemCache(StatsMixin, BaseLocMemCache):
+    """Кэш в памяти процесса со статистикой попаданий."""
@@ -0,0 +1,209 @@
+import socket
+import threading
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .base import StatsMixin, serializer_from_options
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisClient:
+    """Минимальный клиент протокола Redis (RESP2) без зависимостей.
+
+    Держит по одному соединению на поток; при обрыве соединение
+    открывается заново на следующей команде.
+    """
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None,
+                 timeout=5):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        if '://' not in url:
+            url = f'redis://{url}'
+        parsed = urlparse(url)
+        db = parsed.path.strip('/')
+        return cls(host=parsed.hostname or '127.0.0.1',
+                   port=parsed.port or 6379,
+                   db=int(db) if db else 0,
+                   password=parsed.password, **kwargs)
+
+    def connect(self):
+        sock = socket.create_connection((self.host, self.port),
+                                        timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = sock.makefile('rb')
+        if self.password:
+            self._call(sock, reader, 'AUTH', self.password)
+        if self.db:
+            self._call(sock, reader, 'SELECT', self.db)
+        return sock, reader
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self.connect()
+        return connection
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            connection[1].close()
+            connection[0].close()
+
+    def execute(self, *args):
+        sock, reader = self._connection()
+        try:
+            return self._call(sock, reader, *args)
+        except (OSError, EOFError):
+            self.close()
+            raise
+
+    def _call(self, sock, reader, *args):
+        sock.sendall(pack_command(*args))
+        return read_reply(reader)
+
+
+def pack_command(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise EOFError('Соединение с сервером кэша закрыто')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest.decode()
+    if kind == b'-':
+        raise RedisError(rest.decode())
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        length = int(rest)
+        if length == -1:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        length = int(rest)
+        if length == -1:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise RedisError(f'Неизвестный ответ сервера: {line!r}')
+
+
+class RedisCache(StatsMixin, BaseCache):
+    """Кэш Django поверх сервера с протоколом Redis.
+
+    LOCATION — адрес вида ``redis://host:port/db``. В OPTIONS можно
+    задать ``COMPRESS_MIN_LENGTH``, ``COMPRESS_LEVEL`` и ``SOCKET_TIMEOUT``.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._client = RedisClient.from_url(
+            server or 'redis://127.0.0.1:6379/0',
+            timeout=options.get('SOCKET_TIMEOUT', 5),
+        )
+        self._serializer = serializer_from_options(options)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expiry(self, timeout):
+        """Время жизни в миллисекундах; None — бессрочно."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(int(timeout * 1000), 0)
+
+    def _set(self, key, value, timeout, *flags):
+        expiry = self._expiry(timeout)
+        if expiry == 0:
+            self._client.execute('DEL', key)
+            return False
+        args = ['SET', key, self._serializer.dumps(value)]
+        if expiry is not None:
+            args += ['PX', expiry]
+        return self._client.execute(*args, *flags) is not None
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._set(self._key(key, version), value, timeout, 'NX')
+
+    def get(self, key, default=None, version=None):
+        data = self._client.execute('GET', self._key(key, version))
+        if data is None:
+            self._record(misses=1)
+            return default
+        self._record(hits=1)
+        return self._serializer.loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._key(key, version), value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            self._client.execute('PERSIST', key)
+            return bool(self._client.execute('EXISTS', key))
+        return bool(self._client.execute('PEXPIRE', key, expiry))
+
+    def delete(self, key, version=None):
+        self._client.execute('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self._key(key, version) for key in keys]
+        values = self._client.execute('MGET', *made)
+        found = {
+            key: self._serializer.loads(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+        self._record(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def has_key(self, key, version=None):
+        return bool(self._client.execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self._client.execute('EXISTS', key):
+            raise ValueError(f"Key '{key}' not found")
+        try:
+            return self._client.execute('INCRBY', key, delta)
+        except RedisError as error:
+            raise ValueError(str(error))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._client.execute('DEL', *keys)
+
+    def clear(self):
+        self._client.execute('FLUSHDB')
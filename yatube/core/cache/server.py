@@ -0,0 +1,212 @@
+"""Учебный сервер с протоколом Redis для тестов и локального запуска.
+
+Поддерживает только команды, которые нужны `RedisCache` и
+`core.pubsub.RedisBroker` (PUBLISH и PSUBSCRIBE), и хранит данные в
+памяти. Запуск в отдельном потоке:
+
+    with FakeRedisServer() as server:
+        location = server.url
+"""
+import fnmatch
+import socketserver
+import threading
+import time
+
+from .redis import read_reply
+
+
+def encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Exception):
+        return b'-ERR %s\r\n' % str(reply).encode()
+    if isinstance(reply, bool):
+        return b':%d\r\n' % reply
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode()
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(map(encode, reply))
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class Storage:
+    """Словарь ключ → (значение, срок годности) с блокировкой."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def _alive(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return item
+
+    def execute(self, command, *args):
+        handler = getattr(self, f'cmd_{command.decode().lower()}', None)
+        if handler is None:
+            return ValueError(f'unknown command {command.decode()!r}')
+        with self.lock:
+            try:
+                return handler(*args)
+            except ValueError as error:
+                return error
+
+    def cmd_ping(self, *args):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_auth(self, password):
+        return 'OK'
+
+    def cmd_get(self, key):
+        item = self._alive(key)
+        return None if item is None else item[0]
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        if b'PX' in options:
+            milliseconds = int(options[options.index(b'PX') + 1])
+            expires = time.monotonic() + milliseconds / 1000
+        exists = self._alive(key) is not None
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        self.data[key] = (value, expires)
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def cmd_exists(self, *keys):
+        return sum(self._alive(key) is not None for key in keys)
+
+    def cmd_incrby(self, key, delta):
+        value, expires = self._alive(key) or (b'0', None)
+        try:
+            value = int(value) + int(delta)
+        except ValueError:
+            raise ValueError('value is not an integer or out of range')
+        self.data[key] = (str(value).encode(), expires)
+        return value
+
+    def cmd_pexpire(self, key, milliseconds):
+        item = self._alive(key)
+        if item is None:
+            return 0
+        expires = time.monotonic() + int(milliseconds) / 1000
+        self.data[key] = (item[0], expires)
+        return 1
+
+    def cmd_persist(self, key):
+        item = self._alive(key)
+        if item is None or item[1] is None:
+            return 0
+        self.data[key] = (item[0], None)
+        return 1
+
+    def cmd_flushdb(self):
+        self.data.clear()
+        return 'OK'
+
+
+class Handler(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+
+    def handle(self):
+        try:
+            while True:
+                try:
+                    command = read_reply(self.rfile)
+                except (EOFError, OSError):
+                    return
+                name = command[0].decode().lower()
+                if name == 'publish':
+                    reply = self.server.publish(*command[1:])
+                elif name == 'psubscribe':
+                    for pattern in command[1:]:
+                        count = self.server.subscribe(self, pattern)
+                        self.send([b'psubscribe', pattern, count])
+                    continue
+                else:
+                    reply = self.server.storage.execute(*command)
+                self.send(reply)
+        finally:
+            self.server.unsubscribe(self)
+
+    def send(self, reply):
+        with self.write_lock:
+            self.wfile.write(encode(reply))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), Handler)
+        self.storage = Storage()
+        self.subscribers = {}
+        self.subscribers_lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, handler, pattern):
+        with self.subscribers_lock:
+            patterns = self.subscribers.setdefault(handler, set())
+            patterns.add(pattern)
+            return len(patterns)
+
+    def unsubscribe(self, handler):
+        with self.subscribers_lock:
+            self.subscribers.pop(handler, None)
+
+    def publish(self, channel, message):
+        """Рассылает сообщение подписчикам шаблонов; число получателей."""
+        with self.subscribers_lock:
+            subscribers = list(self.subscribers.items())
+        received = 0
+        for handler, patterns in subscribers:
+            for pattern in patterns:
+                if fnmatch.fnmatchcase(channel.decode(), pattern.decode()):
+                    try:
+                        handler.send([b'pmessage', pattern, channel,
+                                      message])
+                    except OSError:
+                        continue
+                    received += 1
+        return received
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .base import StatsMixin, serializer_from_options
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+)
+'''
+
+
+class SQLiteCache(StatsMixin, BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов одного хоста.
+
+    LOCATION — путь к файлу. База открывается в режиме WAL, поэтому
+    чтения из разных воркеров не блокируют друг друга.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location or 'cache.sqlite3'
+        self._serializer = serializer_from_options(options)
+        self._busy_timeout = options.get('BUSY_TIMEOUT', 5)
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout,
+                isolation_level=None, check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _fetch(self, connection, key):
+        row = connection.execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _write(self, connection, mode, key, value, timeout):
+        connection.execute(
+            f'INSERT {mode} INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (key, self._serializer.dumps(value), self._expires(timeout)),
+        )
+        self._cull(connection)
+
+    def _cull(self, connection):
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count[0] <= self._max_entries:
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?',
+                           (time.time(),))
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache '
+            'ORDER BY rowid LIMIT ?)', (count[0] // self._cull_frequency,)
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            if self._fetch(connection, key) is not None:
+                return False
+            self._write(connection, 'OR REPLACE', key, value, timeout)
+            return True
+
+    def get(self, key, default=None, version=None):
+        data = self._fetch(self._connection(), self._key(key, version))
+        if data is None:
+            self._record(misses=1)
+            return default
+        self._record(hits=1)
+        return self._serializer.loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            self._write(connection, 'OR REPLACE', key, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), self._key(key, version), time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        self._connection().execute('DELETE FROM cache WHERE key = ?',
+                                   (self._key(key, version),))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = {self._key(key, version): key for key in keys}
+        placeholders = ', '.join('?' * len(made))
+        rows = self._connection().execute(
+            f'SELECT key, value FROM cache WHERE key IN ({placeholders}) '
+            'AND (expires IS NULL OR expires > ?)', (*made, time.time())
+        ).fetchall()
+        found = {made[key]: self._serializer.loads(value)
+                 for key, value in rows}
+        self._record(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def has_key(self, key, version=None):
+        return self._fetch(self._connection(),
+                           self._key(key, version)) is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            data = self._fetch(connection, key)
+            if data is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._serializer.loads(data) + delta
+            connection.execute('UPDATE cache SET value = ? WHERE key = ?',
+                               (self._serializer.dumps(value), key))
+        return value
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            placeholders = ', '.join('?' * len(keys))
+            self._connection().execute(
+                f'DELETE FROM cache WHERE key IN ({placeholders})', keys
+            )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
@@ -0,0 +1,63 @@
+"""Счётчики ссылок на файлы контентно-адресуемого хранилища.
+
+Файл без ссылок остаётся в `StoredFile` с нулевым счётчиком, а с диска
+его удаляет `sweep` (команда `sweep_files`), когда файл не менялся
+дольше FILES_ORPHAN_MIN_AGE. Удалять сразу после коммита нельзя:
+загрузка той же картинки в соседней транзакции уже могла найти файл
+на диске и ещё не закоммитить свою ссылку. Хранилище при такой
+загрузке обновляет время изменения файла, и он переживает сборку.
+
+Имена, созданные не этим хранилищем, не учитываются и никогда не
+удаляются.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+
+from .models import StoredFile
+from .storage import is_content_addressed
+
+
+def retain(name):
+    if not is_content_addressed(name):
+        return
+    StoredFile.objects.get_or_create(name=name)
+    StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def release(name):
+    if not is_content_addressed(name):
+        return
+    StoredFile.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1
+    )
+
+
+def _is_recent(name, deadline):
+    try:
+        return default_storage.get_modified_time(name) > deadline
+    except FileNotFoundError:
+        return False
+
+
+def sweep(min_age=None):
+    """Удаляет файлы без ссылок старше `min_age` секунд; их число."""
+    if min_age is None:
+        min_age = settings.FILES_ORPHAN_MIN_AGE
+    deadline = timezone.now() - timedelta(seconds=min_age)
+    orphans = StoredFile.objects.filter(refcount=0).values_list(
+        'name', flat=True
+    )
+    deleted = 0
+    for name in orphans.iterator():
+        if _is_recent(name, deadline):
+            continue
+        removed, _ = StoredFile.objects.filter(name=name, refcount=0).delete()
+        # Загрузка могла найти файл между проверкой и удалением записи.
+        if removed and not _is_recent(name, deadline):
+            default_storage.delete(name)
+            deleted += 1
+    return deleted
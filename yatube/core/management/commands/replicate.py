@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.replication import replicate
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в реплики из DATABASE_REPLICAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch', action='store_true',
+            help='Не завершаться, а копировать с интервалом'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между копиями в режиме --watch, секунды'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                replicate(alias)
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Реплик обновлено: {len(settings.DATABASE_REPLICAS)}'
+        ))
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import metrics, tasks
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Метрики воркера и очереди для Prometheus."""
+
+    def do_GET(self):
+        try:
+            body = (metrics.registry.render()
+                    + tasks.render_queue_metrics()).encode()
+        finally:
+            close_old_connections()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди core.Task'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Число потоков; 1 — выполнять в текущем потоке'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=0,
+            help='Пул процессов вместо потоков для задач, нагружающих CPU'
+        )
+        parser.add_argument(
+            '--watch', action='store_true',
+            help='Не завершаться, а ждать новые задачи'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1,
+            help='Пауза между опросами очереди в режиме --watch, секунды'
+        )
+        parser.add_argument(
+            '--metrics-port', type=int, default=None,
+            help='Отдавать метрики воркера по HTTP на 127.0.0.1:PORT'
+        )
+
+    def handle(self, *args, **options):
+        if options['metrics_port'] is not None:
+            server = ThreadingHTTPServer(
+                ('127.0.0.1', options['metrics_port']), MetricsHandler
+            )
+            threading.Thread(target=server.serve_forever,
+                             daemon=True).start()
+        if options['processes'] > 0:
+            context = multiprocessing.get_context('fork')
+            pool = ProcessPoolExecutor(options['processes'],
+                                       mp_context=context)
+            workers = options['processes']
+        elif options['threads'] > 1:
+            pool = ThreadPoolExecutor(options['threads'],
+                                      thread_name_prefix='task')
+            workers = options['threads']
+        else:
+            return self.run(None, 1, options)
+        with pool:
+            self.run(pool, workers, options)
+
+    def run(self, pool, workers, options):
+        done = failed = 0
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        batch_size = tasks.BATCH_SIZE * workers
+        while True:
+            ok, errors = tasks.process_pending(batch_size, pool, worker)
+            done, failed = done + ok, failed + errors
+            if ok + errors:
+                continue
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {done}, с ошибками: {failed}'
+        ))
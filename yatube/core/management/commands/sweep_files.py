@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core import files
+
+
+class Command(BaseCommand):
+    help = 'Удаляет из хранилища файлы, на которые не осталось ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=float, default=None,
+            help='Удалять файлы старше стольких секунд '
+                 '(по умолчанию FILES_ORPHAN_MIN_AGE)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = files.sweep(options['min_age'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {deleted}'))
@@ -0,0 +1,264 @@
+"""Метрики запросов: число и время SQL, рендер шаблонов, кэш.
+
+`core.middleware.MetricsMiddleware` измеряет время каждого запроса, а
+для доли `METRICS_SAMPLE_RATE` запросов ещё и собирает подробности в
+`RequestStats`. Всё складывается в `registry` — реестр процесса,
+который `core.views.metrics` отдаёт в текстовом формате Prometheus.
+Каждый воркер отдаёт свои счётчики; суммирует их Prometheus.
+
+Время SQL, выполненного из шаблона, входит и в `sql`, и в `template`.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.base import Template
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNRESOLVED = '<unresolved>'
+
+_local = threading.local()
+
+
+class RequestStats:
+    """Подробности одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rendering = False
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_seconds += time.perf_counter() - started
+
+    def as_dict(self):
+        return {
+            'sql_count': self.queries,
+            'sql_ms': round(self.sql_seconds * 1000, 3),
+            'template_ms': round(self.template_seconds * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def collect():
+    """Собирает `RequestStats` для кода внутри блока в этом потоке."""
+    stats = _local.stats = RequestStats()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(stats.execute)
+                )
+            yield stats
+    finally:
+        _local.stats = None
+
+
+def record_cache(hits=0, misses=0):
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def instrument_templates():
+    """Оборачивает `Template.render`; вложенные шаблоны не считаются."""
+    if getattr(Template.render, 'instrumented', False):
+        return
+    original = Template.render
+
+    def render(self, context):
+        stats = current()
+        if stats is None or stats.rendering:
+            return original(self, context)
+        stats.rendering = True
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            stats.rendering = False
+            stats.template_seconds += time.perf_counter() - started
+
+    render.instrumented = True
+    Template.render = render
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else UNRESOLVED
+
+
+class ViewMetrics:
+
+    def __init__(self):
+        self.statuses = Counter()
+        self.buckets = [0] * len(BUCKETS)
+        self.seconds = 0.0
+        self.sampled = Counter()
+
+    def observe(self, status, seconds, stats):
+        self.statuses[status] += 1
+        self.seconds += seconds
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+        if stats is not None:
+            self.sampled['requests'] += 1
+            self.sampled['sql_queries'] += stats.queries
+            self.sampled['sql_seconds'] += stats.sql_seconds
+            self.sampled['template_seconds'] += stats.template_seconds
+            self.sampled['cache_hits'] += stats.cache_hits
+            self.sampled['cache_misses'] += stats.cache_misses
+
+
+class TaskMetrics:
+
+    def __init__(self):
+        self.statuses = Counter()
+        self.buckets = [0] * len(BUCKETS)
+        self.seconds = 0.0
+        self.wait_buckets = [0] * len(BUCKETS)
+        self.wait_seconds = 0.0
+
+    def observe(self, status, seconds, wait):
+        self.statuses[status] += 1
+        self.seconds += seconds
+        self.wait_seconds += wait
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+            if wait <= bound:
+                self.wait_buckets[index] += 1
+
+
+SAMPLED = (
+    ('requests', 'yatube_sampled_requests_total',
+     'Запросы с подробными метриками.'),
+    ('sql_queries', 'yatube_sql_queries_total',
+     'SQL-запросы в сэмплированных запросах.'),
+    ('sql_seconds', 'yatube_sql_duration_seconds_total',
+     'Время SQL в сэмплированных запросах.'),
+    ('template_seconds', 'yatube_template_render_seconds_total',
+     'Время рендера шаблонов в сэмплированных запросах.'),
+    ('cache_hits', 'yatube_cache_hits_total',
+     'Попадания в кэш в сэмплированных запросах.'),
+    ('cache_misses', 'yatube_cache_misses_total',
+     'Промахи кэша в сэмплированных запросах.'),
+)
+
+
+def _label(value):
+    value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return value.replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram(name, help_text, series):
+    """Строки гистограммы из (метка, корзины, сумма, количество)."""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for label, buckets, seconds, total in series:
+        for bound, count in zip(BUCKETS, buckets):
+            lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+        lines += [
+            f'{name}_bucket{{{label},le="+Inf"}} {total}',
+            f'{name}_sum{{{label}}} {seconds!r}',
+            f'{name}_count{{{label}}} {total}',
+        ]
+    return lines
+
+
+class Registry:
+    """Счётчики всех представлений процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewMetrics)
+        self.tasks = defaultdict(TaskMetrics)
+
+    def observe(self, view, status, seconds, stats=None):
+        with self.lock:
+            self.views[view].observe(status, seconds, stats)
+
+    def observe_task(self, task, status, seconds, wait):
+        """Выполненная задача очереди; `wait` — сколько она ждала."""
+        with self.lock:
+            self.tasks[task].observe(status, seconds, wait)
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+            self.tasks.clear()
+
+    def render(self):
+        """Текст в формате Prometheus exposition 0.0.4."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = [
+                '# HELP yatube_requests_total Обработанные запросы.',
+                '# TYPE yatube_requests_total counter',
+            ]
+            for view, metrics in views:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'yatube_requests_total{{view="'
+                                 f'{_label(view)}",status="{status}"}} '
+                                 f'{count}')
+            lines += _histogram(
+                'yatube_request_duration_seconds',
+                'Время обработки запроса.',
+                [(f'view="{_label(view)}"', metrics.buckets, metrics.seconds,
+                  sum(metrics.statuses.values()))
+                 for view, metrics in views],
+            )
+            for key, name, help_text in SAMPLED:
+                lines += [f'# HELP {name} {help_text}',
+                          f'# TYPE {name} counter']
+                for view, metrics in views:
+                    lines.append(f'{name}{{view="{_label(view)}"}} '
+                                 f'{_number(metrics.sampled[key])}')
+            if self.tasks:
+                lines += self.render_tasks()
+        return '\n'.join(lines) + '\n'
+
+    def render_tasks(self):
+        tasks = sorted(self.tasks.items())
+        lines = ['# HELP yatube_tasks_total Выполненные задачи очереди.',
+                 '# TYPE yatube_tasks_total counter']
+        for task, metrics in tasks:
+            for status, count in sorted(metrics.statuses.items()):
+                lines.append(f'yatube_tasks_total{{task="{_label(task)}",'
+                             f'status="{status}"}} {count}')
+        lines += _histogram(
+            'yatube_task_duration_seconds', 'Время выполнения задачи.',
+            [(f'task="{_label(task)}"', metrics.buckets, metrics.seconds,
+              sum(metrics.statuses.values())) for task, metrics in tasks],
+        )
+        lines += _histogram(
+            'yatube_task_wait_seconds',
+            'Время от готовности задачи до начала выполнения.',
+            [(f'task="{_label(task)}"', metrics.wait_buckets,
+              metrics.wait_seconds, sum(metrics.statuses.values()))
+             for task, metrics in tasks],
+        )
+        return lines
+
+
+registry = Registry()
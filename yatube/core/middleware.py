@@ -0,0 +1,87 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from . import metrics, routers
+
+logger = logging.getLogger('yatube.metrics')
+
+
+class MetricsMiddleware:
+    """Время, SQL, шаблоны и кэш по представлениям, см. core.metrics.
+
+    Подключается первым в `MIDDLEWARE`, чтобы учесть работу остальных.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.instrument_templates()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        if random.random() < settings.METRICS_SAMPLE_RATE:
+            with metrics.collect() as stats:
+                response = self.get_response(request)
+        else:
+            stats = None
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started
+        view = metrics.view_name(request)
+        metrics.registry.observe(view, response.status_code, seconds, stats)
+        if stats is not None:
+            logger.info(json.dumps({
+                'view': view,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(seconds * 1000, 3),
+                **stats.as_dict(),
+            }, ensure_ascii=False))
+        return response
+
+
+class ReplicaMiddleware:
+    """Чтение из реплик для `REPLICA_VIEWS`, см. core.routers.
+
+    Окно чтения из основной базы хранится в cookie со временем его
+    окончания, а не в сессии: так страницы из кэша не обращаются к
+    таблице сессий. Без `DATABASE_REPLICAS` middleware ничего не делает.
+    """
+
+    cookie_name = 'read_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        routers.reset()
+        try:
+            response = self.get_response(request)
+            if routers.wrote():
+                window = settings.REPLICA_STICKY_SECONDS
+                response.set_cookie(self.cookie_name,
+                                    str(time.time() + window),
+                                    max_age=max(int(window), 0),
+                                    httponly=True, samesite='Lax')
+        finally:
+            routers.reset()
+        return response
+
+    def pinned(self, request):
+        try:
+            until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            return False
+        return until > time.time()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (settings.DATABASE_REPLICAS
+                and request.method in ('GET', 'HEAD')
+                and metrics.view_name(request) in settings.REPLICA_VIEWS
+                and not self.pinned(request)):
+            routers.use_replica()
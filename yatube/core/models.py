@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -10,3 +11,40 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class StoredFile(models.Model):
+    """Число ссылок на файл в контентно-адресуемом хранилище."""
+    name = models.CharField('Имя файла', max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField('Ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+
+class Task(models.Model):
+    """Задача фоновой очереди, см. core.tasks."""
+    name = models.CharField('Задача', max_length=100)
+    args = models.TextField('Аргументы (JSON)', default='[]')
+    key = models.CharField('Ключ идемпотентности', max_length=200,
+                           unique=True, null=True, blank=True)
+    created = models.DateTimeField('Поставлена', auto_now_add=True)
+    available_at = models.DateTimeField('Доступна с', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    error = models.TextField('Последняя ошибка', blank=True)
+    locked_by = models.CharField('Воркер', max_length=64, blank=True)
+    locked_until = models.DateTimeField('Аренда до', null=True, blank=True)
+    failed_at = models.DateTimeField('Провалена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['failed_at', 'available_at'],
+                         name='task_queue_idx'),
+            models.Index(fields=['locked_by'], name='task_locked_by_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
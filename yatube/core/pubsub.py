@@ -0,0 +1,254 @@
+"""Публикация событий и подписка на них внутри процесса и между ними.
+
+`Hub` раздаёт сообщения подписчикам своего процесса. Подписка — это
+очередь на несколько каналов. Асинхронная (`AsyncSubscription`) будит
+корутину через `call_soon_threadsafe`, поэтому публиковать можно из
+любого потока, а ожидающее соединение не держит поток: тысяча открытых
+соединений — это тысяча корутин и очередей.
+
+Публикует брокер. `LocalBroker` сразу отдаёт сообщение хабу и годится,
+пока процесс один. `RedisBroker` шлёт PUBLISH серверу с протоколом
+Redis, а поток-слушатель каждого процесса получает сообщения по
+PSUBSCRIBE и отдаёт их своему хабу; для разработки и тестов подойдёт
+`core.cache.server.FakeRedisServer`. Брокер выбирают настройки
+`PUBSUB_BACKEND` и `PUBSUB_LOCATION`.
+
+Сообщения — объекты, которые переводятся в JSON. Доставка не больше
+одного раза: кто не подписан в момент публикации или переполнил свою
+очередь, сообщение не получит.
+"""
+import asyncio
+import functools
+import json
+import queue
+import socket
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .cache.redis import RedisClient, RedisError, pack_command, read_reply
+
+MAX_PENDING = 100
+RECONNECT_DELAY = 1
+
+
+class Subscription:
+    """Подписка на каналы; пока открыта, получает их сообщения."""
+
+    def __init__(self, hub, channels):
+        self.hub = hub
+        self.channels = frozenset(channels)
+        self.dropped = 0
+
+    def __enter__(self):
+        self.hub.subscribe(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def deliver(self, channel, message):
+        raise NotImplementedError
+
+
+class ThreadSubscription(Subscription):
+    """Подписка для синхронного кода."""
+
+    def __init__(self, hub, channels):
+        super().__init__(hub, channels)
+        self.queue = queue.Queue(MAX_PENDING)
+
+    def deliver(self, channel, message):
+        try:
+            self.queue.put_nowait((channel, message))
+        except queue.Full:
+            self.dropped += 1
+
+    def get(self, timeout=None):
+        """Пара (канал, сообщение); None, если за `timeout` ничего нет."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """Подписка для корутин цикла событий, в котором создана."""
+
+    def __init__(self, hub, channels):
+        super().__init__(hub, channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(MAX_PENDING)
+
+    def deliver(self, channel, message):
+        try:
+            self.loop.call_soon_threadsafe(self.put, (channel, message))
+        except RuntimeError:
+            # Цикл событий уже закрыт.
+            pass
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Hub:
+    """Подписки процесса по каналам."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = defaultdict(set)
+
+    def subscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                self.channels[channel].add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.channels.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.channels[channel]
+
+    def dispatch(self, channel, message):
+        """Отдаёт сообщение подписчикам канала; их число."""
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(channel, message)
+        return len(subscribers)
+
+
+class LocalBroker:
+    """Брокер одного процесса."""
+
+    def __init__(self, location='', hub=None):
+        self.hub = hub or Hub()
+
+    def publish(self, channel, message):
+        self.hub.dispatch(channel, message)
+
+    def subscribe(self, channels):
+        return ThreadSubscription(self.hub, channels)
+
+    def subscribe_async(self, channels):
+        return AsyncSubscription(self.hub, channels)
+
+    def close(self):
+        pass
+
+
+class RedisBroker(LocalBroker):
+    """Брокер процессов, общающихся через сервер с протоколом Redis.
+
+    LOCATION — адрес вида ``redis://host:port/db``. Каналы на сервере
+    получают приставку `prefix`, чтобы не пересекаться с чужими.
+    Слушатель запускается при первой подписке и переподключается при
+    обрыве; сообщения, опубликованные во время обрыва, теряются.
+    """
+
+    def __init__(self, location='', hub=None, prefix='yatube:'):
+        super().__init__(location, hub)
+        self.client = RedisClient.from_url(
+            location or 'redis://127.0.0.1:6379/0'
+        )
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.stopped = threading.Event()
+        self.listener = None
+        self.connection = None
+
+    def publish(self, channel, message):
+        self.client.execute('PUBLISH', self.prefix + channel,
+                            json.dumps(message))
+
+    def subscribe(self, channels):
+        self.listen()
+        return super().subscribe(channels)
+
+    def subscribe_async(self, channels):
+        self.listen()
+        return super().subscribe_async(channels)
+
+    def listen(self):
+        """Запускает слушателя и ждёт, пока он подпишется на сервере.
+
+        Подписка из цикла событий может прождать здесь до таймаута
+        клиента, но только пока слушатель не подключился.
+        """
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(
+                    target=self.run, name='pubsub', daemon=True
+                )
+                self.listener.start()
+        self.ready.wait(self.client.timeout)
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.receive()
+            except (OSError, EOFError, RedisError, ValueError):
+                pass
+            finally:
+                self.ready.clear()
+                self.disconnect()
+            self.stopped.wait(RECONNECT_DELAY)
+
+    def receive(self):
+        sock, reader = self.connection = self.client.connect()
+        sock.settimeout(None)
+        sock.sendall(pack_command('PSUBSCRIBE', self.prefix + '*'))
+        read_reply(reader)
+        self.ready.set()
+        while True:
+            kind, _, channel, data = read_reply(reader)
+            if kind == b'pmessage':
+                self.hub.dispatch(channel.decode()[len(self.prefix):],
+                                  json.loads(data))
+
+    def disconnect(self):
+        connection, self.connection = self.connection, None
+        if connection is not None:
+            sock, reader = connection
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            reader.close()
+            sock.close()
+
+    def close(self):
+        self.stopped.set()
+        self.disconnect()
+        if self.listener is not None:
+            self.listener.join(RECONNECT_DELAY + 1)
+        self.client.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_broker():
+    """Брокер процесса по настройкам PUBSUB_BACKEND и PUBSUB_LOCATION."""
+    return import_string(settings.PUBSUB_BACKEND)(settings.PUBSUB_LOCATION)
+
+
+def publish(channel, message):
+    get_broker().publish(channel, message)
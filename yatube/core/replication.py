@@ -0,0 +1,68 @@
+"""Локальная замена репликации для SQLite.
+
+`replicate` целиком копирует основную базу в файл реплики через
+sqlite3 backup API. Команда `replicate --watch` повторяет копирование
+с интервалом; интервал и есть отставание реплики.
+
+Версии кэша (posts.cache) меняются сразу после коммита, а реплика
+получает коммит только со следующей копией. Страница, собранная из
+отстающей реплики, попала бы в кэш под новой версией, поэтому каждая
+смена версий увеличивает счётчик изменений `changed()`, копия
+запоминает, до какого значения счётчика она догнала базу, а
+`fresh_replicas()` отдаёт только догнавшие реплики.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+CHANGES_KEY = 'replication:changes'
+SYNCED_KEY = 'replication:synced:{}'
+
+
+def _initial_changes():
+    # Счётчик, созданный заново после вытеснения ключа, должен быть
+    # больше всех выданных раньше, иначе реплики сочтутся догнавшими.
+    return time.time_ns() // 1000
+
+
+def current_changes():
+    cache.add(CHANGES_KEY, _initial_changes(), None)
+    return cache.get(CHANGES_KEY)
+
+
+def changed():
+    """Отмечает изменение, которое должны получить реплики."""
+    if not settings.DATABASE_REPLICAS:
+        return
+    try:
+        cache.incr(CHANGES_KEY)
+    except ValueError:
+        cache.set(CHANGES_KEY, _initial_changes(), None)
+
+
+def fresh_replicas():
+    """Реплики, в которых есть все отмеченные изменения."""
+    keys = {SYNCED_KEY.format(alias): alias
+            for alias in settings.DATABASE_REPLICAS}
+    values = cache.get_many([CHANGES_KEY, *keys])
+    changes = values.get(CHANGES_KEY)
+    if changes is None:
+        return []
+    return [alias for key, alias in keys.items()
+            if values.get(key, -1) >= changes]
+
+
+def replicate(alias, source=DEFAULT_DB_ALIAS):
+    """Копирует базу `source` в SQLite-реплику `alias`."""
+    for name in (source, alias):
+        if connections[name].vendor != 'sqlite':
+            raise ValueError(f'{name}: репликация поддержана только для '
+                             f'SQLite')
+        connections[name].ensure_connection()
+    # Счётчик читается до копии: изменения, отмеченные позже, могли в
+    # неё не попасть.
+    changes = current_changes()
+    connections[source].connection.backup(connections[alias].connection)
+    cache.set(SYNCED_KEY.format(alias), changes, None)
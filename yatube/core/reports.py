@@ -0,0 +1,35 @@
+"""Отчёты замеров в `REPORTS_DIR` для сравнения между коммитами."""
+import json
+import os
+import subprocess
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def revision():
+    """Короткий хэш текущего коммита или None вне git."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, cwd=settings.BASE_DIR, timeout=5
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def write_report(filename, report, history=None):
+    """Пишет отчёт с коммитом и временем; возвращает путь к файлу.
+
+    С `history` та же запись добавляется строкой в этот JSONL-файл.
+    """
+    report = {'commit': revision(), 'created': timezone.now().isoformat(),
+              **report}
+    os.makedirs(settings.REPORTS_DIR, exist_ok=True)
+    path = os.path.join(settings.REPORTS_DIR, filename)
+    with open(path, 'w') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+    if history:
+        with open(os.path.join(settings.REPORTS_DIR, history), 'a') as output:
+            output.write(json.dumps(report, ensure_ascii=False) + '\n')
+    return path
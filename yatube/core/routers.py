@@ -0,0 +1,71 @@
+"""Чтение из реплик с гарантией «читаю свои записи».
+
+`core.middleware.ReplicaMiddleware` включает реплику на время запроса
+к представлению из `REPLICA_VIEWS`. Роутер запоминает, что запрос
+что-то писал в основную базу; после такого запроса браузер на
+`REPLICA_STICKY_SECONDS` читает только из основной базы, пока реплики
+догоняют. Поэтому окно должно быть дольше отставания реплик.
+
+Кроме того, реплика выбирается, только если она догнала последнюю смену
+версий кэша (см. core.replication): иначе страница из неё закэшировалась
+бы под новой версией вместе с ETag. `verify_replica()` повторяет
+проверку после чтения версий, если они сменились уже после выбора.
+
+Сессии читаются из основной базы всегда: их пишет каждый вход.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import replication
+
+PRIMARY_APPS = ('sessions',)
+
+_local = threading.local()
+
+
+def use_replica():
+    """Направляет чтения этого потока в случайную догнавшую реплику."""
+    if settings.DATABASE_REPLICAS:
+        fresh = replication.fresh_replicas()
+        if fresh:
+            _local.replica = random.choice(fresh)
+
+
+def verify_replica():
+    """Возвращает чтения в основную базу, если реплика уже отстала."""
+    replica = getattr(_local, 'replica', None)
+    if replica and replica not in replication.fresh_replicas():
+        _local.replica = None
+
+
+def reset():
+    _local.replica = None
+    _local.wrote = False
+
+
+def wrote():
+    """Писал ли поток в основную базу после `reset()`."""
+    return getattr(_local, 'wrote', False)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return getattr(_local, 'replica', None) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему в реплики переносит репликация, см. core.replication.
+        return db not in settings.DATABASE_REPLICAS
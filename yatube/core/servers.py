@@ -0,0 +1,189 @@
+"""Локальные HTTP-серверы и нагрузочный клиент для замеров.
+
+`LocalWSGIServer` — wsgiref с потоком на соединение, как у простых
+потоковых WSGI-серверов. `LocalASGIServer` — минимальный HTTP/1.1 на
+asyncio для ASGI-приложения (без keep-alive и без chunked). Оба
+работают в фоновом потоке этого же процесса, так что видят ту же
+тестовую базу. `hammer` открывает все соединения разом и возвращает
+время ответа каждого; успех — ответ без 5xx и без обрыва.
+"""
+import asyncio
+import socketserver
+import threading
+import time
+from urllib.parse import unquote
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+BACKLOG = 4096
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = BACKLOG
+
+
+class LocalWSGIServer:
+    """WSGI-приложение на свободном порту 127.0.0.1 в блоке `with`."""
+
+    def __init__(self, application):
+        self.server = ThreadingWSGIServer(('127.0.0.1', 0), QuietHandler)
+        self.server.set_app(application)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class LocalASGIServer:
+    """ASGI-приложение на свободном порту 127.0.0.1 в блоке `with`."""
+
+    def __init__(self, application):
+        self.application = application
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.port = None
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(
+            self.handle, '127.0.0.1', 0, backlog=BACKLOG
+        ))
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+        server.close()
+        self.loop.run_until_complete(server.wait_closed())
+        self.loop.close()
+
+    def __enter__(self):
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, version = lines[0].split(' ')
+            headers = [line.split(':', 1) for line in lines[1:] if line]
+            headers = [(name.strip().lower().encode('latin-1'),
+                        value.strip().encode('latin-1'))
+                       for name, value in headers]
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'},
+                'http_version': version.split('/')[1], 'method': method,
+                'scheme': 'http', 'path': unquote(path),
+                'raw_path': path.encode('latin-1'),
+                'query_string': query.encode('latin-1'), 'root_path': '',
+                'headers': headers,
+                'client': writer.get_extra_info('peername'),
+                'server': ('127.0.0.1', self.port),
+            }
+            length = int(dict(headers).get(b'content-length', 0))
+            await self.application(scope, self.receiver(reader, length),
+                                   self.sender(writer))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def receiver(reader, length):
+        finished = False
+
+        async def receive():
+            nonlocal length, finished
+            if finished:
+                # Тело прочитано, дальше ждём только отключения клиента.
+                while await reader.read(64 * 1024):
+                    pass
+                return {'type': 'http.disconnect'}
+            chunk = b''
+            if length > 0:
+                chunk = await reader.read(min(length, 64 * 1024))
+                if not chunk:
+                    return {'type': 'http.disconnect'}
+                length -= len(chunk)
+            finished = length <= 0
+            return {'type': 'http.request', 'body': chunk,
+                    'more_body': not finished}
+        return receive
+
+    @staticmethod
+    def sender(writer):
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                lines = [f'HTTP/1.1 {message["status"]} -'.encode()]
+                lines += [name + b': ' + value
+                          for name, value in message['headers']]
+                lines.append(b'connection: close')
+                writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+            else:
+                writer.write(message.get('body', b''))
+            await writer.drain()
+        return send
+
+
+async def _request(port, request, trickle):
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        head, _, body = request.partition(b'\r\n\r\n')
+        writer.write(head + b'\r\n\r\n')
+        step = max(len(body) // 10, 1)
+        for start in range(0, len(body), step):
+            writer.write(body[start:start + step])
+            await writer.drain()
+            await asyncio.sleep(trickle)
+        status = int((await reader.readline()).split(b' ')[1])
+        await reader.read()
+        writer.close()
+        ok = status < 500
+    except (OSError, asyncio.IncompleteReadError, IndexError, ValueError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def hammer(port, requests, trickle=0.0):
+    """Отправляет все запросы одновременно; пары (секунды, успех).
+
+    Тело запроса с `trickle` > 0 уходит десятью кусками с паузами —
+    так ведёт себя медленная загрузка.
+    """
+    async def run():
+        return await asyncio.gather(*(
+            _request(port, request, trickle) for request in requests
+        ))
+    return asyncio.run(run())
+
+
+def get(path):
+    return (f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+            f'Connection: close\r\n\r\n').encode()
+
+
+def post(path, size):
+    return (f'POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+            f'Content-Type: application/octet-stream\r\n'
+            f'Content-Length: {size}\r\nConnection: close\r\n\r\n'
+            ).encode() + b'x' * size
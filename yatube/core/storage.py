@@ -0,0 +1,86 @@
+"""Хранилище медиафайлов с адресацией по содержимому.
+
+Файл из каталога, перечисленного в `CONTENT_ADDRESSED_DIRS`, получает
+имя `<каталог>/<sha256><расширение>`: одинаковые картинки хранятся
+одним файлом, а содержимое по имени никогда не меняется, поэтому его
+можно кэшировать навсегда. Остальные файлы (например, миниатюры sorl)
+сохраняются как в обычном `FileSystemStorage`.
+
+Сколько постов ссылается на файл, считает `core.files`; удалять файлы
+напрямую через хранилище не нужно.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_NAME = re.compile(r'^(?P<directory>.+/)?[0-9a-f]{64}(\.\w+)?$')
+
+
+def is_content_addressed(name):
+    """Имя создано этим хранилищем по содержимому файла."""
+    match = CONTENT_NAME.match(name or '')
+    return bool(match) and (match.group('directory') or '') in getattr(
+        settings, 'CONTENT_ADDRESSED_DIRS', ()
+    )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def _addressed(self, name):
+        directory = posixpath.dirname(name)
+        return f'{directory}/' in getattr(settings,
+                                          'CONTENT_ADDRESSED_DIRS', ())
+
+    def get_available_name(self, name, max_length=None):
+        if self._addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _digest(self, content):
+        # Потоковая загрузка (posts.uploads) уже посчитала хэш.
+        digest = getattr(content, 'sha256', None)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            for chunk in content.chunks():
+                sha256.update(chunk)
+            digest = sha256.hexdigest()
+        return digest
+
+    def _save(self, name, content):
+        if not self._addressed(name):
+            return super()._save(name, content)
+        extension = os.path.splitext(name)[1].lower()
+        name = posixpath.join(posixpath.dirname(name),
+                              f'{self._digest(content)}{extension}')
+        full_path = self.path(name)
+        try:
+            # Файл уже есть. Свежее время изменения не даёт
+            # core.files.sweep удалить его, пока ссылка не закоммичена.
+            os.utime(full_path)
+            return name
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Запись идемпотентна: одновременные загрузки одного файла
+        # кладут на место одинаковое содержимое.
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(content.temporary_file_path(), full_path,
+                           allow_overwrite=True)
+        else:
+            descriptor, temporary = tempfile.mkstemp(
+                dir=os.path.dirname(full_path), prefix='.upload-'
+            )
+            with os.fdopen(descriptor, 'wb') as output:
+                content.seek(0)
+                for chunk in content.chunks():
+                    output.write(chunk)
+            os.replace(temporary, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
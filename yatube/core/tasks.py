@@ -0,0 +1,221 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача — функция, зарегистрированная декоратором `task` под именем.
+`enqueue(name, *args, key=None, delay=0)` записывает вызов в таблицу
+`core.Task` в той же транзакции, что и изменение, которое его
+породило: откат отменяет и задачу. Аргументы хранятся в JSON, поэтому
+передаются id, а задача сама читает свежее состояние.
+
+Ключ идемпотентности `key` не даёт поставить вторую задачу, пока
+первая ждёт в очереди: десять правок поста подряд — одна
+переиндексация. Взятая в работу задача ключ освобождает, и изменение
+во время её выполнения поставит новую.
+
+Команда `run_tasks` забирает задачи пачками. UPDATE помечает их
+воркером и сроком аренды `TASKS_LEASE`, так что два воркера не возьмут
+одну задачу, а задачи упавшего воркера вернутся в очередь по истечении
+аренды. Выполняет пул потоков или процессов. Упавшая задача
+повторяется через `retry_delay * 2 ** попытка`, а после
+`max_attempts` попыток остаётся в таблице с `failed_at` и текстом
+ошибки.
+
+С `TASKS_EAGER` (в тестах и по YATUBE_TASKS_EAGER=1) задача
+выполняется сразу при постановке, как будто очереди нет; в очередь
+попадает, только если упала.
+"""
+import json
+import time
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import Task
+
+BATCH_SIZE = 100
+TASKS = {}
+
+TaskSpec = namedtuple('TaskSpec', 'func max_attempts retry_delay')
+
+
+class TaskError(Exception):
+    pass
+
+
+def task(name, max_attempts=3, retry_delay=timedelta(seconds=30)):
+    """Регистрирует функцию как задачу `name`."""
+    def decorator(func):
+        TASKS[name] = TaskSpec(func, max_attempts, retry_delay)
+        return func
+    return decorator
+
+
+def enqueue(name, *args, key=None, delay=0):
+    """Ставит задачу; с TASKS_EAGER сразу выполняет её.
+
+    Упавшая при TASKS_EAGER задача не ломает вызывающий код, а остаётся
+    в очереди, как после первой попытки воркера.
+    """
+    if name not in TASKS:
+        raise TaskError(f'Неизвестная задача {name}')
+    payload = json.dumps(args)
+    now = timezone.now()
+    job = Task(name=name, args=payload, key=key,
+               available_at=now + timedelta(seconds=delay))
+    if settings.TASKS_EAGER:
+        error = execute_eager(name, payload)
+        if not error:
+            return
+        job.attempts, job.error = 1, error
+        for field, value in retry_fields(TASKS[name], 1, now).items():
+            setattr(job, field, value)
+    Task.objects.bulk_create([job], ignore_conflicts=True)
+
+
+def pending():
+    return Task.objects.filter(failed_at__isnull=True)
+
+
+def claim(limit=BATCH_SIZE, worker=''):
+    """Берёт в аренду до `limit` доступных задач."""
+    now = timezone.now()
+    free = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    available = pending().filter(free, available_at__lte=now)
+    ids = list(available.order_by('available_at', 'pk')
+               .values_list('pk', flat=True)[:limit])
+    if not ids:
+        return []
+    token = f'{worker}:{uuid.uuid4().hex[:8]}'
+    # Условие повторяется в UPDATE: задачи, которые успел взять другой
+    # воркер, ему и останутся.
+    available.filter(pk__in=ids).update(
+        locked_by=token, key=None,
+        locked_until=now + timedelta(seconds=settings.TASKS_LEASE),
+    )
+    return list(Task.objects.filter(locked_by=token).order_by(
+        'available_at', 'pk'
+    ))
+
+
+def execute(name, args):
+    """Выполняет задачу; пара (текст ошибки или '', секунды)."""
+    started = time.perf_counter()
+    error = ''
+    try:
+        if name not in TASKS:
+            raise TaskError(f'Неизвестная задача {name}')
+        TASKS[name].func(*json.loads(args))
+    except Exception as exception:
+        error = f'{type(exception).__name__}: {exception}'
+    return error, time.perf_counter() - started
+
+
+def execute_eager(name, args):
+    """`execute` в точке сохранения транзакции вызывающего кода."""
+    try:
+        with transaction.atomic():
+            error, _ = execute(name, args)
+            if error:
+                raise TaskError(error)
+    except TaskError as exception:
+        return str(exception)
+    return ''
+
+
+def execute_in_pool(name, args):
+    """`execute` для потока или процесса пула со своим соединением."""
+    try:
+        return execute(name, args)
+    finally:
+        close_old_connections()
+
+
+def finish(job, error, seconds, started):
+    """Удаляет выполненную задачу или планирует повтор."""
+    wait = max((started - job.available_at).total_seconds(), 0)
+    metrics.registry.observe_task(job.name, 'failed' if error else 'done',
+                                  seconds, wait)
+    if not error:
+        job.delete()
+        return
+    update = {'attempts': F('attempts') + 1, 'error': error,
+              'locked_by': '', 'locked_until': None}
+    update.update(retry_fields(TASKS.get(job.name), job.attempts + 1,
+                               timezone.now()))
+    Task.objects.filter(pk=job.pk).update(**update)
+
+
+def retry_fields(spec, attempts, now):
+    """Срок повтора после `attempts` неудачных попыток или провал."""
+    if spec is None or attempts >= spec.max_attempts:
+        return {'failed_at': now}
+    return {'available_at': now + spec.retry_delay * 2 ** (attempts - 1)}
+
+
+def process_pending(limit=BATCH_SIZE, pool=None, worker=''):
+    """Выполняет пачку задач; возвращает число успешных и неудачных.
+
+    `pool` — исполнитель с методом `map` (`ThreadPoolExecutor` или
+    `ProcessPoolExecutor`); без него задачи выполняются в этом потоке.
+    """
+    jobs = claim(limit, worker)
+    if not jobs:
+        return 0, 0
+    started = timezone.now()
+    names = [job.name for job in jobs]
+    args = [job.args for job in jobs]
+    if pool is None:
+        results = list(map(execute, names, args))
+    else:
+        # Дочерние процессы не должны делить соединения с родителем.
+        connections.close_all()
+        results = list(pool.map(execute_in_pool, names, args))
+    failed = 0
+    for job, (error, seconds) in zip(jobs, results):
+        failed += bool(error)
+        finish(job, error, seconds, started)
+    return len(jobs) - failed, failed
+
+
+def queue_stats():
+    """Глубина очереди, возраст старейшей задачи и проваленные по именам."""
+    now = timezone.now()
+    rows = Task.objects.values('name').annotate(
+        depth=Count('pk', filter=Q(failed_at__isnull=True)),
+        failed=Count('pk', filter=Q(failed_at__isnull=False)),
+        oldest=Min('available_at', filter=Q(failed_at__isnull=True,
+                                            available_at__lte=now)),
+    ).order_by('name')
+    return {
+        row['name']: {
+            'depth': row['depth'],
+            'failed': row['failed'],
+            'oldest_seconds': (now - row['oldest']).total_seconds()
+            if row['oldest'] else 0,
+        } for row in rows
+    }
+
+
+QUEUE_GAUGES = (
+    ('depth', 'yatube_task_queue_depth',
+     'Задачи в очереди, включая выполняемые.'),
+    ('oldest_seconds', 'yatube_task_queue_oldest_seconds',
+     'Сколько ждёт старейшая доступная задача.'),
+    ('failed', 'yatube_task_queue_failed', 'Проваленные задачи.'),
+)
+
+
+def render_queue_metrics():
+    """Состояние очереди в формате Prometheus; общее для всех воркеров."""
+    stats = queue_stats()
+    lines = []
+    for key, name, help_text in QUEUE_GAUGES:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+        for task_name, values in stats.items():
+            lines.append(f'{name}{{task="{task_name}"}} {values[key]!r}')
+    return '\n'.join(lines) + '\n'
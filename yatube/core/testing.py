@@ -0,0 +1,112 @@
+"""Помощники для тестов: запуск тестов, адреса приложений, коммит в
+TestCase и планы SQL-запросов.
+"""
+import re
+from contextlib import contextmanager
+from importlib import import_module
+
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Запуск тестов с фоновыми задачами, выполняемыми сразу.
+
+    Тесты проверяют результат задач без воркера; очередь проверяют
+    тесты с `override_settings(TASKS_EAGER=False)`.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.eager_tasks = override_settings(TASKS_EAGER=True)
+        self.eager_tasks.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.eager_tasks.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+def route_names(urlconf):
+    """Имена всех именованных адресов модуля urls с пространством имён."""
+    module = import_module(urlconf) if isinstance(urlconf, str) else urlconf
+    namespace = getattr(module, 'app_name', None)
+    return [
+        f'{namespace}:{pattern.name}' if namespace else pattern.name
+        for pattern in module.urlpatterns if getattr(pattern, 'name', None)
+    ]
+
+
+@contextmanager
+def run_on_commit():
+    """Выполняет функции `transaction.on_commit`, поставленные в блоке.
+
+    TestCase не коммитит транзакцию, и без этого они не выполнятся.
+    """
+    start = len(connection.run_on_commit)
+    try:
+        yield
+    finally:
+        callbacks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+    for _, callback in callbacks:
+        callback()
+
+
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)(?!.* USING )')
+SQLITE_SORT = 'USE TEMP B-TREE'
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (?P<table>\w+)')
+POSTGRES_SORT = re.compile(r'-> +Sort |^Sort ')
+
+
+def explain(sql, using=connection):
+    """Строки плана запроса на SQLite или PostgreSQL.
+
+    На PostgreSQL полный просмотр и сортировка запрещаются: на
+    маленьких тестовых таблицах планировщик выбрал бы их и при наличии
+    подходящего индекса, а так они остаются в плане, только если
+    индекса нет.
+    """
+    with using.cursor() as cursor:
+        if using.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        if using.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+    raise NotImplementedError(f'EXPLAIN для {using.vendor} не поддержан')
+
+
+def plan_problems(plan, vendor):
+    """Полные просмотры таблиц и сортировки во временной структуре."""
+    problems = []
+    for line in plan:
+        step = line.strip()
+        if vendor == 'sqlite':
+            if SQLITE_SORT in step or SQLITE_FULL_SCAN.match(step):
+                problems.append(step)
+        elif POSTGRES_FULL_SCAN.search(step) or POSTGRES_SORT.search(step):
+            problems.append(step)
+    return problems
+
+
+class QueryPlanMixin:
+    """Проверка, что SELECT-запросы страницы идут по индексам."""
+
+    def assertIndexedPlans(self, client, url, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, **kwargs)
+        failures = []
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            problems = plan_problems(explain(sql), connection.vendor)
+            if problems:
+                failures.append(f'{sql}\n    ' + '\n    '.join(problems))
+        if failures:
+            self.fail(f'{method.upper()} {url}: запросы без индекса\n'
+                      + '\n'.join(failures))
+        return response
@@ -0,0 +1,599 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.conf import settings
+from django.db import connections, transaction
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post
+
+from . import metrics, pubsub, replication, routers, tasks
+from .asgi import ASGIHandler, build_environ
+from .cache.base import Serializer
+from .cache.locmem import LocMemCache
+from .cache.redis import RedisCache
+from .cache.server import FakeRedisServer
+from .cache.sqlite import SQLiteCache
+from .middleware import ReplicaMiddleware
+from .models import Task
+from .storage import ContentAddressedStorage
+from .views import IMMUTABLE, media
+
+
+class CacheBackendContract:
+    """Общие проверки для всех бэкендов кэша."""
+
+    def make_cache(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    def test_set_get_delete(self):
+        """Значение сохраняется, читается и удаляется"""
+        self.cache.set('key', {'a': 1})
+        self.assertEqual(self.cache.get('key'), {'a': 1})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_and_incr(self):
+        """add не перезаписывает ключ, incr работает с числами"""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.get('counter'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_get_many_and_expiry(self):
+        """get_many возвращает только живые ключи"""
+        self.cache.set('short', 1, timeout=0.05)
+        self.cache.set('long', 2, timeout=None)
+        time.sleep(0.1)
+        self.assertEqual(self.cache.get_many(['short', 'long', 'none']),
+                         {'long': 2})
+        self.assertFalse(self.cache.has_key('short'))
+
+    def test_large_value_round_trip(self):
+        """Большая страница сохраняется и читается без искажений"""
+        page = '<p>Тестовый пост</p>' * 10000
+        self.cache.set('page', page)
+        self.assertEqual(self.cache.get('page'), page)
+
+    def test_stats(self):
+        """Попадания и промахи считаются"""
+        self.cache.set('key', 1)
+        self.cache.get('key')
+        self.cache.get('missing')
+        self.cache.get_many(['key', 'missing'])
+        self.assertEqual(self.cache.stats(), {'hits': 2, 'misses': 2})
+
+
+class LocMemCacheTest(CacheBackendContract, SimpleTestCase):
+
+    def make_cache(self):
+        return LocMemCache('tests', {})
+
+
+class SQLiteCacheTest(CacheBackendContract, SimpleTestCase):
+
+    def make_cache(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        return SQLiteCache(os.path.join(self.directory, 'cache.sqlite3'),
+                           {'OPTIONS': {'MAX_ENTRIES': 50}})
+
+    def test_cull(self):
+        """Старые записи вытесняются при переполнении"""
+        for number in range(60):
+            self.cache.set(f'key-{number}', number)
+        self.assertIsNone(self.cache.get('key-0'))
+        self.assertEqual(self.cache.get('key-59'), 59)
+
+
+class RedisCacheTest(CacheBackendContract, SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def make_cache(self):
+        return RedisCache(self.server.url, {})
+
+    def test_shared_between_clients(self):
+        """Два клиента видят записи и инвалидации друг друга"""
+        other = self.make_cache()
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+
+class SerializerTest(SimpleTestCase):
+
+    def test_compresses_large_values(self):
+        """Большие значения сжимаются, маленькие нет"""
+        serializer = Serializer(min_length=100)
+        large = serializer.dumps('x' * 1000)
+        self.assertLess(len(large), 100)
+        self.assertEqual(serializer.loads(large), 'x' * 1000)
+        self.assertEqual(serializer.loads(serializer.dumps('x')), 'x')
+        self.assertEqual(serializer.dumps(7), b'7')
+
+
+@override_settings(CONTENT_ADDRESSED_DIRS=('posts/',))
+class ContentAddressedStorageTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.directory)
+
+    def test_same_content_stored_once(self):
+        """Одинаковое содержимое сохраняется одним файлом"""
+        first = self.storage.save('posts/cat.JPG', ContentFile(b'meme'))
+        second = self.storage.save('posts/copy.jpg', ContentFile(b'meme'))
+        other = self.storage.save('posts/cat.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertRegex(first, r'^posts/[0-9a-f]{64}\.jpg$')
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(os.listdir(os.path.join(self.directory,
+                                                     'posts'))), 2)
+
+    def test_other_directories_keep_names(self):
+        """Файлы вне CONTENT_ADDRESSED_DIRS сохраняются как обычно"""
+        name = self.storage.save('cache/thumb.jpg', ContentFile(b'1'))
+        again = self.storage.save('cache/thumb.jpg', ContentFile(b'2'))
+        self.assertEqual(name, 'cache/thumb.jpg')
+        self.assertNotEqual(again, name)
+
+    def test_media_view_marks_immutable(self):
+        """Файлы по хэшу отдаются с вечным Cache-Control"""
+        name = self.storage.save('posts/cat.jpg', ContentFile(b'meme'))
+        self.storage.save('avatars/cat.jpg', ContentFile(b'meme'))
+        request = RequestFactory().get('/media/')
+        with self.settings(MEDIA_ROOT=self.directory):
+            immutable = media(request, name)
+            plain = media(request, 'avatars/cat.jpg')
+        self.assertEqual(immutable['Cache-Control'], IMMUTABLE)
+        self.assertFalse(plain.has_header('Cache-Control'))
+
+
+class MetricsTest(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.client = Client()
+
+    def test_sampled_request_collects_details(self):
+        """Сэмплированный запрос пишет SQL, шаблоны и кэш в лог и реестр"""
+        with self.assertLogs('yatube.metrics', 'INFO') as logs:
+            self.client.get('/')
+            self.client.get('/')
+        first, second = (json.loads(record.getMessage())
+                         for record in logs.records)
+        self.assertEqual(first['view'], 'posts:index')
+        self.assertGreater(first['sql_count'], 0)
+        self.assertGreater(first['template_ms'], 0)
+        # Лента второго запроса берётся из фрагмента кэша, в базу
+        # идёт только подсчёт постов для пагинатора.
+        self.assertEqual(second['sql_count'], 1)
+        self.assertGreater(second['cache_hits'], 0)
+        text = metrics.registry.render()
+        self.assertIn('yatube_requests_total{view="posts:index",'
+                      'status="200"} 2', text)
+        self.assertIn('yatube_sampled_requests_total{view="posts:index"} 2',
+                      text)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request_counts_only_latency(self):
+        """Без сэмплирования считаются только запросы и время"""
+        self.client.get('/about/author/')
+        text = metrics.registry.render()
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="about:author"} 1', text)
+        self.assertIn('yatube_sql_queries_total{view="about:author"} 0',
+                      text)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        """Эндпоинт отдаёт текст Prometheus только с токеном"""
+        response = self.client.get('/metrics/',
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4')
+        self.assertContains(response, '# TYPE yatube_requests_total counter')
+        for header in ('', 'Bearer wrong', 'secret'):
+            with self.subTest(header=header):
+                response = self.client.get('/metrics/',
+                                           HTTP_AUTHORIZATION=header)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_disabled_without_token(self):
+        """Без настроенного токена эндпоинта нет"""
+        self.assertEqual(self.client.get('/metrics/').status_code, 404)
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTest(TransactionTestCase):
+    """Чтение из отстающей реплики и окно чтения своих записей"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        connections.databases['replica1'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(self.directory, 'replica.sqlite3'),
+        }
+        self.author = get_user_model().objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Старый')
+        cache.clear()
+        replication.replicate('replica1')
+        self.client = Client()
+
+    def tearDown(self):
+        connections['replica1'].close()
+        del connections['replica1']
+        del connections.databases['replica1']
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def detail(self, post):
+        return self.client.get(reverse('posts:post_detail', args=(post.pk,)))
+
+    def test_reads_lag_until_replicated(self):
+        """Страницы из REPLICA_VIEWS читают реплику"""
+        # bulk_create не шлёт сигналов и не меняет версий кэша.
+        Post.objects.bulk_create([Post(author=self.author, text='Новый')])
+        fresh = Post.objects.get(text='Новый')
+        self.assertEqual(self.detail(self.post).status_code, 200)
+        self.assertEqual(self.detail(fresh).status_code, 404)
+        replication.replicate('replica1')
+        self.assertEqual(self.detail(fresh).status_code, 200)
+
+    def test_reads_primary_until_replica_has_bumped_version(self):
+        """Пока реплика не догнала смену версий, страницы из основной базы"""
+        self.client.get(reverse('posts:index'))
+        self.post.text = 'Исправленный'
+        self.post.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Исправленный')
+        replication.replicate('replica1')
+        self.assertEqual(replication.fresh_replicas(), ['replica1'])
+        fresh = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(replication.fresh_replicas(), [])
+        self.assertEqual(self.detail(fresh).status_code, 200)
+
+    def test_verify_replica_after_version_change(self):
+        """Смена версий после выбора реплики возвращает чтения в основную"""
+        routers.use_replica()
+        self.assertEqual(Post.objects.db_manager().db, 'replica1')
+        try:
+            Post.objects.create(author=self.author, text='Новый')
+            routers.verify_replica()
+            self.assertEqual(Post.objects.db_manager().db, 'default')
+        finally:
+            routers.reset()
+
+    def test_other_views_read_primary(self):
+        """Страницы не из REPLICA_VIEWS читают основную базу"""
+        fresh = Post.objects.create(author=self.author, text='Новый')
+        self.client.force_login(self.author)
+        response = self.client.get(
+            reverse('posts:post_edit', args=(fresh.pk,))
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_author_reads_own_writes(self):
+        """После записи браузер читает основную базу, пока не истечёт окно"""
+        self.client.force_login(self.author)
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Свой'})
+        self.assertIn(ReplicaMiddleware.cookie_name, response.cookies)
+        fresh = Post.objects.get(text='Свой')
+        self.assertEqual(self.detail(fresh).status_code, 200)
+        with self.settings(REPLICA_STICKY_SECONDS=-1):
+            # Правка меняет версии кэша: без окна реплику отсекает
+            # проверка версий, пока правка не скопирована.
+            self.client.post(reverse('posts:post_edit', args=(fresh.pk,)),
+                             {'text': 'Правка'})
+            self.assertContains(self.detail(fresh), 'Правка')
+
+
+class SQLiteProductionTest(SimpleTestCase):
+    """Профиль SQLITE_PRODUCTION на временной файловой базе"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        connections.databases['tuned'] = {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': os.path.join(self.directory, 'db.sqlite3'),
+            'PRAGMAS': settings.SQLITE_PRAGMAS,
+        }
+        self.connection = connections['tuned']
+
+    def tearDown(self):
+        self.connection.close()
+        del connections['tuned']
+        del connections.databases['tuned']
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        """PRAGMA из настроек базы выполняются при подключении"""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'),
+                         settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'),
+                         settings.SQLITE_PRAGMAS['cache_size'])
+
+    def test_atomic_begins_immediate(self):
+        """Транзакция сразу берёт блокировку на запись"""
+        self.connection.ensure_connection()
+        with CaptureQueriesContext(self.connection) as context:
+            with transaction.atomic(using='tuned'):
+                self.pragma('user_version')
+        self.assertEqual(context.captured_queries[0]['sql'],
+                         'BEGIN IMMEDIATE')
+
+
+class ASGIHandlerTest(SimpleTestCase):
+    """ASGI-вход отдаёт ответы Django и не держит поток на чтение тела"""
+
+    def call(self, scope, messages):
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {
+                'type': 'http.disconnect'
+            }
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(ASGIHandler(max_threads=2)(scope, receive, send))
+        return sent
+
+    def scope(self, path, method='GET', query=b'', headers=()):
+        return {'type': 'http', 'method': method, 'path': path,
+                'query_string': query, 'headers': list(headers),
+                'server': ('testserver', 80), 'client': ('127.0.0.1', 1)}
+
+    def test_get_page(self):
+        """GET проходит через Django, тело приходит в конце ответа"""
+        sent = self.call(self.scope(reverse('about:author')),
+                         [{'type': 'http.request', 'body': b''}])
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('<html'.encode(), body)
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_body_in_parts_and_disconnect(self):
+        """Тело собирается из частей; отключение до конца — без ответа"""
+        sent = self.call(self.scope('/missing/', method='POST'), [
+            {'type': 'http.request', 'body': b'a=1', 'more_body': True},
+            {'type': 'http.request', 'body': b'&b=2'},
+        ])
+        self.assertEqual(sent[0]['status'], 404)
+        sent = self.call(self.scope('/missing/', method='POST'), [
+            {'type': 'http.request', 'body': b'a=1', 'more_body': True},
+        ])
+        self.assertEqual(sent, [])
+
+    def test_environ(self):
+        """Заголовки, адрес и строка запроса попадают в WSGI environ"""
+        scope = self.scope('/профиль/', query=b'page=2', headers=[
+            (b'content-type', b'text/plain'), (b'accept', b'a'),
+            (b'accept', b'b'),
+        ])
+        environ = build_environ(scope, None)
+        self.assertEqual(environ['PATH_INFO'].encode('latin-1').decode(),
+                         '/профиль/')
+        self.assertEqual(environ['QUERY_STRING'], 'page=2')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'a,b')
+        self.assertEqual(environ['SERVER_NAME'], 'testserver')
+
+    def test_lifespan(self):
+        """Запуск и остановка сервера подтверждаются"""
+        sent = self.call({'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'},
+        ])
+        self.assertEqual([message['type'] for message in sent],
+                         ['lifespan.startup.complete',
+                          'lifespan.shutdown.complete'])
+
+
+class PubSubTest(SimpleTestCase):
+    """Сообщения доходят до подписчиков каналов в потоках и корутинах"""
+
+    def test_hub_delivers_to_channel_subscribers(self):
+        """Сообщение получают только подписчики его канала"""
+        broker = pubsub.LocalBroker()
+        with broker.subscribe({'a', 'b'}) as first, \
+                broker.subscribe({'b'}) as second:
+            broker.publish('a', {'n': 1})
+            broker.publish('c', {'n': 2})
+            self.assertEqual(first.get(1), ('a', {'n': 1}))
+            self.assertIsNone(second.get(0.01))
+        self.assertEqual(broker.hub.dispatch('a', {}), 0)
+        self.assertEqual(dict(broker.hub.channels), {})
+
+    def test_overflow_is_dropped(self):
+        """Переполненная очередь теряет сообщения, а не копит их"""
+        broker = pubsub.LocalBroker()
+        with broker.subscribe({'a'}) as subscription:
+            for number in range(pubsub.MAX_PENDING + 5):
+                broker.publish('a', number)
+        self.assertEqual(subscription.dropped, 5)
+
+    def test_async_subscription_from_other_thread(self):
+        """Публикация из другого потока будит корутину"""
+        broker = pubsub.LocalBroker()
+
+        async def listen():
+            with broker.subscribe_async({'a'}) as subscription:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, broker.publish, 'a', 'hi')
+                return await subscription.get(1), await subscription.get(0.01)
+
+        self.assertEqual(asyncio.run(listen()), (('a', 'hi'), None))
+
+    def test_redis_broker_between_processes(self):
+        """Брокеры на общем сервере получают публикации друг друга"""
+        with FakeRedisServer() as server:
+            first = pubsub.RedisBroker(server.url)
+            second = pubsub.RedisBroker(server.url)
+            try:
+                with first.subscribe({'a'}) as subscription:
+                    second.publish('a', {'post': 1})
+                    second.publish('b', {'post': 2})
+                    self.assertEqual(subscription.get(2),
+                                     ('a', {'post': 1}))
+                    self.assertIsNone(subscription.get(0.05))
+            finally:
+                first.close()
+                second.close()
+
+
+CALLS = []
+
+
+@tasks.task('tests.record')
+def record(*args):
+    CALLS.append(args)
+
+
+@tasks.task('tests.fail', max_attempts=2, retry_delay=timedelta(minutes=1))
+def fail():
+    raise ValueError('сломалось')
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTest(TestCase):
+    """Очередь задач: постановка, ключи, аренда, повторы и метрики"""
+
+    def setUp(self):
+        CALLS.clear()
+        metrics.registry.reset()
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager(self):
+        """Без очереди задача выполняется сразу"""
+        tasks.enqueue('tests.record', 1, 'a')
+        self.assertEqual(CALLS, [(1, 'a')])
+        self.assertFalse(Task.objects.exists())
+        with self.assertRaises(tasks.TaskError):
+            tasks.enqueue('tests.missing')
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_failure_is_queued(self):
+        """Упавшая сразу задача остаётся в очереди на повтор"""
+        tasks.enqueue('tests.fail', key='fail')
+        job = Task.objects.get()
+        self.assertEqual((job.attempts, job.error, job.key),
+                         (1, 'ValueError: сломалось', 'fail'))
+        self.assertIsNone(job.failed_at)
+        self.assertGreater(job.available_at,
+                           timezone.now() + timedelta(seconds=50))
+
+    def test_key_deduplicates_pending(self):
+        """Пока задача с ключом ждёт, вторая такая не ставится"""
+        tasks.enqueue('tests.record', 1, key='one')
+        tasks.enqueue('tests.record', 2, key='one')
+        tasks.enqueue('tests.record', 3)
+        self.assertEqual(tasks.process_pending(), (2, 0))
+        self.assertEqual(CALLS, [(1,), (3,)])
+        self.assertFalse(Task.objects.exists())
+
+    def test_claimed_task_frees_key(self):
+        """Взятая задача освобождает ключ и не достаётся другому"""
+        tasks.enqueue('tests.record', 1, key='one')
+        claimed = tasks.claim(worker='first')
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(tasks.claim(worker='second'), [])
+        tasks.enqueue('tests.record', 2, key='one')
+        self.assertEqual(Task.objects.count(), 2)
+        Task.objects.filter(pk=claimed[0].pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(len(tasks.claim(worker='second')), 2)
+
+    def test_retry_with_backoff_then_fail(self):
+        """Упавшая задача повторяется позже, затем остаётся проваленной"""
+        tasks.enqueue('tests.fail')
+        self.assertEqual(tasks.process_pending(), (0, 1))
+        job = Task.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.error, 'ValueError: сломалось')
+        self.assertGreater(job.available_at,
+                           timezone.now() + timedelta(seconds=50))
+        self.assertEqual(tasks.process_pending(), (0, 0))
+        Task.objects.update(available_at=timezone.now())
+        self.assertEqual(tasks.process_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertIsNotNone(job.failed_at)
+        Task.objects.update(available_at=timezone.now())
+        self.assertEqual(tasks.process_pending(), (0, 0))
+
+    def test_metrics(self):
+        """Выполненные задачи и глубина очереди попадают в метрики"""
+        tasks.enqueue('tests.record', 1)
+        tasks.enqueue('tests.fail')
+        tasks.process_pending()
+        tasks.enqueue('tests.record', 2, delay=60)
+        text = metrics.registry.render()
+        self.assertIn('yatube_tasks_total{task="tests.record",'
+                      'status="done"} 1', text)
+        self.assertIn('yatube_task_wait_seconds_count{task="tests.fail"} 1',
+                      text)
+        with self.settings(METRICS_TOKEN='secret'):
+            response = self.client.get('/metrics/',
+                                       HTTP_AUTHORIZATION='Bearer secret')
+        self.assertContains(
+            response, 'yatube_task_queue_depth{task="tests.record"} 1'
+        )
+        self.assertContains(
+            response, 'yatube_task_queue_oldest_seconds{task="tests.record"} 0'
+        )
+
+    def test_command(self):
+        """Команда выполняет всю очередь и завершается"""
+        for number in range(3):
+            tasks.enqueue('tests.record', number)
+        out = StringIO()
+        call_command('run_tasks', threads=1, stdout=out)
+        self.assertIn('Выполнено задач: 3, с ошибками: 0', out.getvalue())
+        self.assertEqual(sorted(CALLS), [(0,), (1,), (2,)])
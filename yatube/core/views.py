@@ -1,6 +1,17 @@
+import hmac
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.views.static import serve
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from . import metrics as request_metrics
+from . import tasks
+from .storage import is_content_addressed
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
 
 
 def page_not_found(request, exception):
@@ -11,3 +22,35 @@ def page_not_found(request, exception):
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html',
                   status=HTTPStatus.FORBIDDEN)
+
+
+def media(request, path):
+    """Отдаёт медиафайл; неизменяемые файлы кэшируются навсегда.
+
+    Содержимое файлов по хэшу и миниатюр sorl по их имени не меняется,
+    поэтому браузеру и CDN не нужно их перепроверять.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_content_addressed(path) or path.startswith(
+            thumbnail_settings.THUMBNAIL_PREFIX):
+        response['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def metrics(request):
+    """Счётчики процесса в текстовом формате Prometheus.
+
+    Отдаются только с заголовком `Authorization: Bearer <METRICS_TOKEN>`;
+    без настроенного токена адреса нет.
+    """
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    if not hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(),
+            expected.encode()):
+        response = HttpResponse(status=HTTPStatus.UNAUTHORIZED)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    text = request_metrics.registry.render() + tasks.render_queue_metrics()
+    return HttpResponse(text, content_type='text/plain; version=0.0.4')
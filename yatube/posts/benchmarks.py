@@ -0,0 +1,723 @@
+"""Сценарии для команды `manage.py benchmark <сценарий>`.
+
+Каждый сценарий получает поток вывода и параметры командной строки,
+сам наполняет временную базу и печатает таблицу с результатами.
+"""
+import asyncio
+import gc
+import io
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import load_handler
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.wsgi import get_wsgi_application
+from django.core.paginator import Paginator
+from django.db import (OperationalError, connection, connections,
+                       transaction)
+from django.db.models import F
+from django.test import Client, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import pubsub, servers, tasks
+from core.asgi import ASGIHandler
+from core.replication import replicate
+
+from . import counters, search, timeline, transfer
+from .forms import PostForm
+from .models import Comment, Follow, Group, Post
+from .utils import CURSOR_ORDERING, NUMBER_OF_OBJECTS, encode_cursor
+
+User = get_user_model()
+SCENARIOS = {}
+BATCH_SIZE = 1000
+
+
+def scenario(name):
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+def best_of(func, repeat):
+    """Лучшее время из `repeat` запусков, в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def seed_posts(size, author, group=None):
+    for start in range(0, size, BATCH_SIZE):
+        Post.objects.bulk_create(
+            Post(text=f'Пост номер {number}', author=author, group=group)
+            for number in range(start, min(start + BATCH_SIZE, size))
+        )
+
+
+@scenario('pagination')
+def pagination(stdout, size=20000, repeat=5):
+    """OFFSET-пагинация против keyset на разной глубине ленты."""
+    author = User.objects.create_user(username='bench_author')
+    reader = User.objects.create_user(username='bench_reader')
+    group = Group.objects.create(title='Бенчмарк', slug='bench')
+    Follow.objects.create(user=reader, author=author)
+    seed_posts(size, author, group)
+    client = Client()
+    client.force_login(reader)
+    routes = {
+        'index': '/',
+        'group_posts': f'/group/{group.slug}/',
+        'profile': f'/profile/{author.username}/',
+        'follow_index': '/follow/',
+    }
+    last_page = max(size // NUMBER_OF_OBJECTS, 1)
+    depths = [page for page in (1, 10, 100, 1000, 10000)
+              if page <= last_page]
+    fields = [field.lstrip('-') for field in CURSOR_ORDERING]
+    keys = Post.objects.order_by(*CURSOR_ORDERING).values_list(*fields)
+
+    def fetch(url):
+        cache.clear()
+        response = client.get(url)
+        assert response.status_code == 200, url
+
+    stdout.write(f'{"route":<14}{"page":>8}{"offset, ms":>14}'
+                 f'{"cursor, ms":>14}')
+    for name, url in routes.items():
+        for page in depths:
+            offset_ms = best_of(lambda: fetch(f'{url}?page={page}'), repeat)
+            query = ''
+            if page > 1:
+                key = keys[(page - 1) * NUMBER_OF_OBJECTS - 1]
+                token = encode_cursor('next', [str(value) for value in key])
+                query = f'?cursor={token}'
+            with override_settings(CURSOR_PAGINATION=True):
+                cursor_ms = best_of(lambda: fetch(f'{url}{query}'), repeat)
+            stdout.write(f'{name:<14}{page:>8}{offset_ms:>14.2f}'
+                         f'{cursor_ms:>14.2f}')
+
+
+@scenario('timeline')
+def timeline_feed(stdout, size=10000, repeat=5):
+    """JOIN через Follow против материализованной ленты подписок."""
+    reader = User.objects.create_user(username='bench_reader')
+    User.objects.bulk_create(
+        User(username=f'bench_author_{number}') for number in range(size)
+    )
+    authors = User.objects.filter(username__startswith='bench_author_')
+    Follow.objects.bulk_create(
+        Follow(user=reader, author=author) for author in authors
+    )
+    for _ in range(3):
+        Post.objects.bulk_create(
+            Post(text='Пост', author=author) for author in authors
+        )
+    timeline.rebuild([reader.pk])
+    variants = {
+        'join': Post.objects.filter(author__following__user=reader),
+        'timeline': timeline.feed(reader),
+    }
+    total = Post.objects.count()
+    depths = [page for page in (1, 100, 1000)
+              if page <= total // NUMBER_OF_OBJECTS]
+    stdout.write(f'{size} подписок, {total} постов')
+    stdout.write(f'{"source":<12}{"page":>8}{"ms":>12}')
+    for name, queryset in variants.items():
+        for page in depths:
+            ms = best_of(
+                lambda: list(Paginator(queryset, NUMBER_OF_OBJECTS)
+                             .page(page).object_list),
+                repeat
+            )
+            stdout.write(f'{name:<12}{page:>8}{ms:>12.2f}')
+
+
+WORDS = (
+    'кот котик котики собака собаки прогулка прогулки парк парке лес '
+    'река реке город города погода дождь солнце весна лето осень зима '
+    'книга книги читать читали музыка песня песни концерт кино фильм '
+    'фильмы путешествие путешествия море горы поезд самолёт работа '
+    'проект проекты код программа программисты кофе чай завтрак ужин '
+    'в и на с'
+).split()
+
+
+@scenario('search')
+def search_posts(stdout, size=1000000, repeat=5):
+    """LIKE '%..%' по всей таблице против полнотекстового индекса."""
+    author = User.objects.create_user(username='bench_author')
+    words = random.Random(0)
+    for start in range(0, size, BATCH_SIZE):
+        Post.objects.bulk_create(
+            Post(text=' '.join(words.choices(WORDS, k=12)), author=author)
+            for _ in range(start, min(start + BATCH_SIZE, size))
+        )
+    backend = search.get_backend()
+    started = time.perf_counter()
+    backend.rebuild()
+    stdout.write(f'{size} постов, индекс построен за '
+                 f'{time.perf_counter() - started:.1f} с')
+    queries = ('котики', 'прогулка в парке', 'программисты и кофе')
+
+    def like(query):
+        found = Post.objects.filter(text__icontains=query)
+        found.count()
+        list(found.order_by('-pub_date')[:NUMBER_OF_OBJECTS])
+
+    def indexed(query):
+        results = search.SearchResults(query, backend)
+        results.count()
+        results[:NUMBER_OF_OBJECTS]
+
+    stdout.write(f'{"query":<26}{"like, ms":>12}{"index, ms":>12}'
+                 f'{"found":>10}')
+    for query in queries:
+        like_ms = best_of(lambda: like(query), repeat)
+        index_ms = best_of(lambda: indexed(query), repeat)
+        found = search.SearchResults(query, backend).count()
+        stdout.write(f'{query:<26}{like_ms:>12.2f}{index_ms:>12.2f}'
+                     f'{found:>10}')
+
+
+DEFAULT_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+
+class MultipartBody:
+    """Тело multipart-запроса, которое читается с диска кусками."""
+
+    def __init__(self, *parts):
+        self.parts = list(parts)
+
+    def read(self, size=-1):
+        chunks = []
+        while self.parts and size != 0:
+            chunk = self.parts[0].read(size)
+            if not chunk:
+                self.parts.pop(0).close()
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b''.join(chunks)
+
+
+def rss():
+    """Текущий резидентный размер процесса в байтах (Linux)."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class PeakRSS(threading.Thread):
+    """Замеряет пиковый RSS, пока работает блок `with`."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.running = threading.Event()
+        self.peak = 0
+
+    def run(self):
+        while self.running.is_set():
+            self.peak = max(self.peak, rss())
+            time.sleep(0.005)
+
+    def __enter__(self):
+        self.running.set()
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.running.clear()
+        self.join()
+
+
+class ThreadCount(threading.Thread):
+    """Пиковое число потоков процесса, пока работает блок `with`."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.running = threading.Event()
+        self.peak = 0
+
+    def run(self):
+        while self.running.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(0.005)
+
+    def __enter__(self):
+        self.running.set()
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.running.clear()
+        self.join()
+
+
+@scenario('uploads')
+def uploads(stdout, size=8, repeat=3):
+    """`size` одновременных загрузок BMP по 20 МБ: время и пиковый RSS."""
+    media = tempfile.mkdtemp()
+    source = os.path.join(media, 'source.bmp')
+    Image.new('RGB', (2560, 2731), 'skyblue').save(source)
+    length = os.path.getsize(source)
+    boundary = 'BenchmarkBoundary'
+    head = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="text"'
+        f'\r\n\r\nПост с картинкой\r\n--{boundary}\r\n'
+        'Content-Disposition: form-data; name="image"; '
+        'filename="big.bmp"\r\nContent-Type: image/bmp\r\n\r\n'
+    ).encode()
+    counter = iter(range(10 ** 9))
+    field = Post._meta.get_field('image')
+
+    def upload(handlers):
+        # Хвост после картинки делает каждый файл уникальным, чтобы
+        # дедупликация не пропускала запись.
+        tail = f'{next(counter):016d}\r\n--{boundary}--\r\n'.encode()
+        environ = {
+            'REQUEST_METHOD': 'POST', 'PATH_INFO': '/create/',
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80',
+            'wsgi.url_scheme': 'http',
+            'CONTENT_TYPE': f'multipart/form-data; boundary={boundary}',
+            'CONTENT_LENGTH': str(len(head) + length + len(tail)),
+            'wsgi.input': MultipartBody(io.BytesIO(head), open(source, 'rb'),
+                                        io.BytesIO(tail)),
+        }
+        request = WSGIRequest(environ)
+        request.upload_handlers = [load_handler(path, request)
+                                   for path in handlers]
+        try:
+            form = PostForm(request.POST, request.FILES)
+            assert form.is_valid(), form.errors
+            image = form.cleaned_data['image']
+            default_storage.save(field.generate_filename(None, image.name),
+                                 image)
+        finally:
+            request.close()
+
+    variants = {
+        'default': DEFAULT_UPLOAD_HANDLERS,
+        'streaming': settings.FILE_UPLOAD_HANDLERS,
+    }
+    stdout.write(f'{size} параллельных загрузок по {length / 2 ** 20:.1f} МБ')
+    stdout.write(f'{"handlers":<12}{"round, s":>10}{"peak RSS +MB":>15}')
+    try:
+        with override_settings(MEDIA_ROOT=media):
+            for name, handlers in variants.items():
+                gc.collect()
+                baseline = rss()
+                with PeakRSS() as peak, ThreadPoolExecutor(size) as pool:
+                    seconds = best_of(
+                        lambda: list(pool.map(upload, [handlers] * size)),
+                        repeat
+                    ) / 1000
+                growth = (peak.peak - baseline) / 2 ** 20
+                stdout.write(f'{name:<12}{seconds:>10.2f}{growth:>15.1f}')
+    finally:
+        shutil.rmtree(media, ignore_errors=True)
+
+
+class SQLiteFile:
+    """Временная файловая база SQLite с копией тестовой базы."""
+
+    def __init__(self, alias, **options):
+        self.alias = alias
+        self.directory = tempfile.mkdtemp()
+        self.settings = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(self.directory, 'db.sqlite3'),
+            **options,
+        }
+
+    def __enter__(self):
+        connections.databases[self.alias] = self.settings
+        replicate(self.alias)
+        # Копия перезаписывает заголовок файла, включая режим журнала:
+        # PRAGMA применятся заново при следующем подключении.
+        connections[self.alias].close()
+        return self.alias
+
+    def __exit__(self, *exc_info):
+        connections[self.alias].close()
+        del connections[self.alias]
+        del connections.databases[self.alias]
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def count_locked(operation, alias, size):
+    """Повторяет операцию; число успешных и «database is locked»."""
+    done = locked = 0
+    try:
+        for _ in range(size):
+            try:
+                operation(alias)
+                done += 1
+            except OperationalError as error:
+                if 'locked' not in str(error):
+                    raise
+                locked += 1
+    finally:
+        connections[alias].close()
+    return done, locked
+
+
+@scenario('sqlite')
+def sqlite_concurrency(stdout, size=200, repeat=1, writers=4, readers=8):
+    """Писатели комментариев и читатели ленты на одной базе SQLite.
+
+    `size` — операций на поток. Сравнивает настройки Django по
+    умолчанию, одни `SQLITE_PRAGMAS` и весь профиль
+    `SQLITE_PRODUCTION` с транзакциями BEGIN IMMEDIATE.
+    """
+    author = User.objects.create_user(username='bench_author')
+    seed_posts(BATCH_SIZE, author)
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+
+    def write(alias):
+        post_id = random.choice(post_ids)
+        # Чтение перед записью в той же транзакции, как у get_or_create:
+        # без WAL читатели держат блокировку и мешают писателю.
+        with transaction.atomic(using=alias):
+            Post.objects.using(alias).filter(pk=post_id).exists()
+            Comment.objects.using(alias).bulk_create([Comment(
+                post_id=post_id, author=author, text='Комментарий'
+            )])
+            Post.objects.using(alias).filter(pk=post_id).update(
+                comments_count=F('comments_count') + 1
+            )
+
+    def read(alias):
+        posts = Post.objects.using(alias).for_feed()
+        posts.count()
+        list(posts[:NUMBER_OF_OBJECTS])
+
+    def worker(alias, operation):
+        return (operation, *count_locked(operation, alias, size))
+
+    variants = {
+        'default': {},
+        'pragmas': {'PRAGMAS': settings.SQLITE_PRAGMAS},
+        'production': {'ENGINE': 'core.backends.sqlite3',
+                       'PRAGMAS': settings.SQLITE_PRAGMAS},
+    }
+    stdout.write(f'{writers} писателей и {readers} читателей, '
+                 f'по {size} операций')
+    stdout.write(f'{"profile":<12}{"writes/s":>10}{"reads/s":>10}'
+                 f'{"locked":>8}')
+    for name, options in variants.items():
+        with SQLiteFile(f'bench_{name}', **options) as alias:
+            for _ in range(repeat):
+                jobs = [write] * writers + [read] * readers
+                started = time.perf_counter()
+                with ThreadPoolExecutor(len(jobs)) as pool:
+                    results = list(pool.map(worker, [alias] * len(jobs),
+                                            jobs))
+                seconds = time.perf_counter() - started
+                writes = sum(done for job, done, _ in results if job is write)
+                reads = sum(done for job, done, _ in results if job is read)
+                locked = sum(errors for *_, errors in results)
+                stdout.write(f'{name:<12}{writes / seconds:>10.0f}'
+                             f'{reads / seconds:>10.0f}{locked:>8}')
+
+
+@scenario('transfer')
+def transfer_posts(stdout, size=100000, repeat=1):
+    """Выгрузка и загрузка `size` постов и стольких же комментариев."""
+    author = User.objects.create_user(username='bench_author')
+    group = Group.objects.create(title='Бенчмарк', slug='bench')
+    seed_posts(size, author, group)
+    post_ids = Post.objects.values_list('pk', flat=True)
+    for start in range(0, size, BATCH_SIZE):
+        Comment.objects.bulk_create(
+            Comment(post_id=post_id, author=author, text='Комментарий')
+            for post_id in post_ids[start:start + BATCH_SIZE]
+        )
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'dump.ndjson')
+    stdout.write(f'{size} постов и {size} комментариев')
+    stdout.write(f'{"step":<12}{"s":>10}{"rows/s":>12}{"peak RSS +MB":>15}')
+
+    def step(name, func, rows):
+        gc.collect()
+        baseline = rss()
+        with PeakRSS() as peak:
+            started = time.perf_counter()
+            func()
+            seconds = time.perf_counter() - started
+        growth = (peak.peak - baseline) / 2 ** 20
+        stdout.write(f'{name:<12}{seconds:>10.1f}{rows / seconds:>12.0f}'
+                     f'{growth:>15.1f}')
+
+    def export():
+        with open(path, 'w') as output:
+            transfer.export(transfer.KINDS, output)
+
+    def load():
+        # Без сигналов удаления: счётчики после bulk_create не заполнены.
+        with connection.cursor() as cursor:
+            for model in (Comment, Post):
+                cursor.execute(f'DELETE FROM {model._meta.db_table}')
+        with open(path) as source:
+            transfer.load(transfer.read_ndjson(source), rebuild=False)
+
+    try:
+        for _ in range(repeat):
+            step('export', export, size * 2)
+            step('import', load, size * 2)
+            step('rebuild', transfer.rebuild_derived, size)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@scenario('api')
+def api_vs_html(stdout, size=5000, repeat=5, requests=50):
+    """Пропускная способность JSON API и HTML-страниц на одних данных.
+
+    Кэш сбрасывается перед каждым запросом: сравнивается работа
+    представлений, а не попадания в кэш фрагментов.
+    """
+    author = User.objects.create_user(username='bench_author')
+    reader = User.objects.create_user(username='bench_reader')
+    group = Group.objects.create(title='Бенчмарк', slug='bench')
+    Follow.objects.create(user=reader, author=author)
+    seed_posts(size, author, group)
+    post = Post.objects.order_by('-pk')[0]
+    Comment.objects.bulk_create(
+        Comment(post=post, author=reader, text='Комментарий')
+        for _ in range(min(size, BATCH_SIZE))
+    )
+    counters.recount()
+    client = Client()
+    client.force_login(reader)
+    routes = {
+        'index': ('/', '/api/v1/posts/'),
+        'group': (f'/group/{group.slug}/',
+                  f'/api/v1/posts/?group={group.slug}'),
+        'profile': (f'/profile/{author.username}/',
+                    f'/api/v1/posts/?author={author.username}'),
+        'post_detail': (f'/posts/{post.pk}/', f'/api/v1/posts/{post.pk}/'),
+        'comments': (f'/posts/{post.pk}/comments/',
+                     f'/api/v1/posts/{post.pk}/comments/'),
+        'follow': ('/follow/', '/api/v1/follow/'),
+    }
+    fields = {'fields': 'id,author'}
+
+    def throughput(url, data=None):
+        def burst():
+            for _ in range(requests):
+                cache.clear()
+                response = client.get(url, data)
+                assert response.status_code == 200, url
+        return requests / best_of(burst, repeat) * 1000
+
+    stdout.write(f'{size} постов, {requests} запросов в замере, '
+                 f'лучший из {repeat}')
+    stdout.write(f'{"route":<14}{"html, r/s":>12}{"api, r/s":>12}'
+                 f'{"api fields, r/s":>18}')
+    for name, (html, api) in routes.items():
+        stdout.write(f'{name:<14}{throughput(html):>12.0f}'
+                     f'{throughput(api):>12.0f}'
+                     f'{throughput(api, fields):>18.0f}')
+
+
+@scenario('asgi')
+def asgi_vs_wsgi(stdout, size=1000, repeat=1, slow=0.1):
+    """`size` одновременных соединений к WSGI- и ASGI-серверу.
+
+    Доля `slow` соединений — медленные загрузки: тело в 64 КБ уходит
+    десятью кусками с паузой 0,1 с. Остальные читают ленты, группу и
+    пост. Считаются время, перцентили, ошибки и пик потоков процесса.
+    """
+    author = User.objects.create_user(username='bench_author')
+    group = Group.objects.create(title='Бенчмарк', slug='bench')
+    seed_posts(1000, author, group)
+    counters.recount()
+    post = Post.objects.order_by('-pk')[0]
+    paths = ['/', f'/group/{group.slug}/', f'/profile/{author.username}/',
+             f'/posts/{post.pk}/']
+    slow_count = int(size * slow)
+    requests = [servers.post('/api/v1/posts/', 64 * 1024)
+                for _ in range(slow_count)]
+    requests += [servers.get(paths[number % len(paths)])
+                 for number in range(size - slow_count)]
+    application = get_wsgi_application()
+    variants = {
+        'wsgi': lambda: servers.LocalWSGIServer(application),
+        'asgi': lambda: servers.LocalASGIServer(ASGIHandler(application)),
+    }
+    stdout.write(f'{size} соединений, из них {slow_count} медленных '
+                 f'загрузок; потоков ASGI: {settings.ASGI_THREADS}')
+    stdout.write(f'{"server":<8}{"s":>8}{"r/s":>8}{"p50, ms":>10}'
+                 f'{"p99, ms":>10}{"errors":>8}{"threads":>9}'
+                 f'{"RSS +MB":>9}')
+    # Медленные загрузки без CSRF-токена получают 403 — это ожидаемо.
+    logging.disable(logging.WARNING)
+    try:
+        for name, make in variants.items():
+            for _ in range(repeat):
+                measure_server(stdout, name, make, requests)
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def measure_server(stdout, name, make, requests):
+    """Один прогон `requests` против сервера из `make`, строка таблицы."""
+    cache.clear()
+    gc.collect()
+    baseline = rss()
+    with make() as server, PeakRSS() as peak, ThreadCount() as threads:
+        started = time.perf_counter()
+        results = servers.hammer(server.port, requests, trickle=0.1)
+        seconds = time.perf_counter() - started
+    durations = sorted(duration for duration, _ in results)
+    errors = sum(not ok for _, ok in results)
+    growth = (peak.peak - baseline) / 2 ** 20
+    stdout.write(
+        f'{name:<8}{seconds:>8.2f}{len(requests) / seconds:>8.0f}'
+        f'{durations[len(durations) // 2] * 1000:>10.0f}'
+        f'{durations[int(len(durations) * 0.99)] * 1000:>10.0f}'
+        f'{errors:>8}{threads.peak:>9}{growth:>9.1f}'
+    )
+
+
+async def open_stream(port, request):
+    """Соединение с потоком событий, прочитанное до первого события."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await reader.readuntil(b'\r\n\r\n')
+    await reader.readuntil(b'\n\n')
+    return reader, writer
+
+
+async def next_event(reader):
+    """Момент прихода следующего события; пинги пропускаются."""
+    while not (await reader.readuntil(b'\n\n')).startswith(b'event:'):
+        pass
+    return time.perf_counter()
+
+
+async def fan_out(port, request, size, repeat, author):
+    """Открывает `size` потоков, `repeat` раз публикует пост и ждёт,
+    пока событие дойдёт до всех; время подключения и задержки."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    streams = await asyncio.gather(*(open_stream(port, request)
+                                     for _ in range(size)))
+    connected = time.perf_counter() - started
+    delays = []
+    for number in range(repeat):
+        published = time.perf_counter()
+        await loop.run_in_executor(None, lambda: Post.objects.create(
+            author=author, text=f'Новый пост {number}'
+        ))
+        arrived = await asyncio.gather(*(next_event(reader)
+                                         for reader, _ in streams))
+        delays.append(sorted(moment - published for moment in arrived))
+    for _, writer in streams:
+        writer.close()
+    return connected, delays
+
+
+@scenario('sse')
+def sse_fan_out(stdout, size=2000, repeat=3):
+    """`size` открытых потоков событий ленты в одном ASGI-процессе.
+
+    Все потоки — вкладки одного читателя, подписанного на автора.
+    Замеряются время подключения, пик потоков и прирост памяти на
+    соединение и задержка от сохранения поста до события во всех
+    потоках.
+    """
+    author = User.objects.create_user(username='bench_author')
+    reader = User.objects.create_user(username='bench_reader')
+    Follow.objects.create(user=reader, author=author)
+    client = Client()
+    client.force_login(reader)
+    name = settings.SESSION_COOKIE_NAME
+    request = (f'GET {reverse("posts:follow_events")}?after=0 HTTP/1.1\r\n'
+               f'Host: 127.0.0.1\r\n'
+               f'Cookie: {name}={client.cookies[name].value}\r\n\r\n'
+               ).encode()
+    gc.collect()
+    baseline = rss()
+    with servers.LocalASGIServer(ASGIHandler()) as server, \
+            PeakRSS() as peak, ThreadCount() as threads:
+        connected, delays = asyncio.run(
+            fan_out(server.port, request, size, repeat, author)
+        )
+        # Сервер замечает отключения и снимает подписки.
+        hub = pubsub.get_broker().hub
+        deadline = time.monotonic() + 10
+        while hub.channels and time.monotonic() < deadline:
+            time.sleep(0.01)
+    growth = peak.peak - baseline
+    stdout.write(f'{size} потоков подключились за {connected:.2f} с; '
+                 f'потоков процесса: {threads.peak}, память: '
+                 f'+{growth / 2 ** 20:.1f} МБ '
+                 f'({growth / size / 1024:.1f} КБ на соединение)')
+    stdout.write(f'{"post":<6}{"p50, ms":>10}{"p99, ms":>10}'
+                 f'{"max, ms":>10}')
+    for number, delay in enumerate(delays, 1):
+        stdout.write(f'{number:<6}{delay[len(delay) // 2] * 1000:>10.1f}'
+                     f'{delay[int(len(delay) * 0.99)] * 1000:>10.1f}'
+                     f'{delay[-1] * 1000:>10.1f}')
+
+
+@scenario('tasks')
+def tasks_off_request(stdout, size=2000, repeat=5, posts=20):
+    """`post_create` с побочными эффектами в запросе и в очереди.
+
+    У автора `size` подписчиков, так что раскладка по лентам — самая
+    дорогая часть записи. Затем воркер в этом процессе разбирает
+    накопленную очередь.
+    """
+    author = User.objects.create_user(username='bench_author')
+    User.objects.bulk_create(User(username=f'bench_reader{number}')
+                             for number in range(size))
+    Follow.objects.bulk_create(
+        Follow(user=user, author=author)
+        for user in User.objects.exclude(pk=author.pk)
+    )
+    client = Client()
+    client.force_login(author)
+    url = reverse('posts:post_create')
+
+    def burst():
+        for number in range(posts):
+            response = client.post(url, {'text': f'Пост номер {number}'})
+            assert response.status_code == 302, response.status_code
+
+    stdout.write(f'{size} подписчиков, {posts} постов в замере, '
+                 f'лучший из {repeat}')
+    stdout.write(f'{"mode":<8}{"ms / post":>12}')
+    for name, eager in (('inline', True), ('queue', False)):
+        with override_settings(TASKS_EAGER=eager):
+            stdout.write(f'{name:<8}{best_of(burst, repeat) / posts:>12.2f}')
+    queued = tasks.pending().count()
+    started = time.perf_counter()
+    done = failed = 0
+    while True:
+        ok, errors = tasks.process_pending()
+        if not ok + errors:
+            break
+        done, failed = done + ok, failed + errors
+    seconds = time.perf_counter() - started
+    stdout.write(f'воркер: {queued} задач за {seconds:.2f} с '
+                 f'({done / seconds:.0f} задач/с), ошибок: {failed}')
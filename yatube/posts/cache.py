@@ -0,0 +1,67 @@
+"""Версионные ключи для кэша фрагментов шаблонов и ETag.
+
+Вместо удаления закэшированных фрагментов при изменении данных меняется
+версия области (`index`, `group:<id>`, `profile:<id>`, `post:<id>`),
+которая входит в ключ кэша. Старые записи просто перестают читаться и
+вытесняются по таймауту, поэтому кэш может жить долго и при этом
+сразу показывать изменения.
+
+Смена версий отмечается и в счётчике изменений для реплик
+(core.replication): пока реплика не догнала смену версий, чтения идут
+в основную базу, и устаревшая страница не попадает в кэш под новой
+версией.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core import replication, routers
+
+CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_KEY = 'version:{}'
+
+
+def _initial_version():
+    # Версия, созданная заново после вытеснения ключа, не должна
+    # совпасть ни с одной из выданных раньше.
+    return time.time_ns() // 1000
+
+
+def get_versions(*scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    # Версии могли смениться после выбора реплики в начале запроса.
+    routers.verify_replica()
+    return [versions[key] for key in keys]
+
+
+def version_tag(*scopes):
+    """Строка с текущими версиями областей для ключа кэша."""
+    return '.'.join(str(version) for version in get_versions(*scopes))
+
+
+def bump(*scopes):
+    """Делает устаревшими все кэши, зависящие от областей `scopes`."""
+    # Счётчик растёт раньше версий: запрос, увидевший новую версию,
+    # увидит и то, что реплики её ещё не догнали.
+    replication.changed()
+    for scope in set(scopes):
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def bump_on_commit(*scopes):
+    """`bump` после коммита текущей транзакции.
+
+    Запрос, прочитавший данные между сменой версии и коммитом, увидел
+    бы старое состояние и закэшировал его уже под новой версией.
+    """
+    transaction.on_commit(lambda: bump(*scopes))
@@ -0,0 +1,81 @@
+"""Валидаторы условных запросов для лент и страницы поста.
+
+ETag собирается без рендера из версий областей кэша (posts.cache), от
+которых зависит страница: версия меняется при каждом изменении поста,
+комментария или группы, которое видно на странице, и только при нём.
+В ETag входят ещё адрес с параметрами и ключ сессии — у вошедшего
+пользователя своя шапка, кнопки подписки и формы, а ключ сессии
+меняется при входе и выходе и читается без запросов к базе, — и версия
+подписок пользователя на странице профиля. Валидаторы подключаются декоратором
+`django.views.decorators.http.etag`, так что повторный запрос с
+`If-None-Match` получает `304 Not Modified` без обращения к view.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from users.cache import get_user_or_404
+
+from .cache import CACHE_TIMEOUT, version_tag
+from .groups import SCOPE as GROUPS_SCOPE, get_group_or_404
+from .models import Post
+
+POST_AUTHOR_KEY = 'post-author:{}'
+
+
+def follows_scope(user_id):
+    return f'follows:{user_id}'
+
+
+def _etag(request, *scopes):
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME, '')
+    raw = f'{version_tag(*scopes)}:{session}:{request.get_full_path()}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def post_author_id(post_id):
+    """Автор поста; автор не меняется, поэтому кэшируется надолго."""
+    key = POST_AUTHOR_KEY.format(post_id)
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = (Post.objects.filter(pk=post_id)
+                     .values_list('author_id', flat=True).first())
+        if author_id is not None:
+            cache.set(key, author_id, CACHE_TIMEOUT)
+    return author_id
+
+
+def forget_post(post_id):
+    cache.delete(POST_AUTHOR_KEY.format(post_id))
+
+
+def index_etag(request):
+    return _etag(request, 'index')
+
+
+def group_etag(request, slug):
+    group = get_group_or_404(slug)
+    return _etag(request, f'group:{group.pk}')
+
+
+def profile_etag(request, username):
+    author = get_user_or_404(username)
+    scopes = [f'profile:{author.pk}', GROUPS_SCOPE]
+    if request.user.is_authenticated:
+        scopes.append(follows_scope(request.user.pk))
+    return _etag(request, *scopes)
+
+
+def post_etag(request, post_id):
+    # На странице поста есть и счётчик постов автора, и название
+    # группы поста.
+    author_id = post_author_id(post_id)
+    if author_id is None:
+        return None
+    return _etag(request, f'post:{post_id}', f'profile:{author_id}',
+                 GROUPS_SCOPE)
+
+
+def comments_etag(request, post_id):
+    return _etag(request, f'post:{post_id}')
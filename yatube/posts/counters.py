@@ -0,0 +1,80 @@
+"""Денормализованные счётчики постов и комментариев.
+
+Счётчики меняются атомарным `UPDATE ... SET n = n + 1` в той же
+транзакции, что и сама запись (см. `Post.save`, `Comment.save` и
+posts.signals). Расхождения после массовых операций в обход ORM
+исправляет `manage.py recount`. Там же поддерживается время последнего
+поста группы для каталога групп.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorCounter, Comment, Group, Post
+
+
+def shift_author(author_id, delta):
+    updated = AuthorCounter.objects.filter(author_id=author_id).update(
+        posts_count=F('posts_count') + delta
+    )
+    if not updated and delta > 0:
+        AuthorCounter.objects.get_or_create(author_id=author_id)
+        shift_author(author_id, delta)
+
+
+def shift_group(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+def touch_group(group_id, pub_date):
+    """Сдвигает время последнего поста группы вперёд до `pub_date`."""
+    if group_id is not None:
+        Group.objects.filter(
+            Q(last_post_at__isnull=True) | Q(last_post_at__lt=pub_date),
+            pk=group_id,
+        ).update(last_post_at=pub_date)
+
+
+def _latest_post():
+    return Subquery(
+        Post.objects.filter(group=OuterRef('pk'))
+        .order_by('-pub_date').values('pub_date')[:1]
+    )
+
+
+def refresh_group_activity(group_id):
+    """Время последнего поста группы по таблице постов."""
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(last_post_at=_latest_post())
+
+
+def shift_comments(post_id, delta):
+    if post_id is not None:
+        Post.objects.filter(pk=post_id).update(
+            comments_count=F('comments_count') + delta
+        )
+
+
+def _count_of(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def recount():
+    """Пересчитывает все счётчики по данным таблиц."""
+    Group.objects.update(posts_count=_count_of(Post.objects, 'group'),
+                         last_post_at=_latest_post())
+    Post.objects.update(comments_count=_count_of(Comment.objects, 'post'))
+    AuthorCounter.objects.all().delete()
+    AuthorCounter.objects.bulk_create(
+        AuthorCounter(author_id=row['author'], posts_count=row['total'])
+        for row in Post.objects.order_by().values('author')
+        .annotate(total=Count('pk'))
+    )
@@ -0,0 +1,193 @@
+"""Поток событий ленты подписок: «N новых постов от ваших авторов».
+
+Страница ленты открывает EventSource на `follow/events/?after=<id>`,
+где id — самый новый пост на странице. При подключении поток считает
+посты подписок новее него, а дальше прибавляет по одному на каждое
+сообщение канала `author:<id>` из core.pubsub; его публикует сигнал
+после создания поста. Браузер получает события `posts` с полями
+`count` и `post` и пинг-комментарий раз в EVENTS_HEARTBEAT секунд.
+
+Под ASGI поток обслуживает `FollowEvents`: база читается один раз при
+подключении в пуле обработчика, а ожидание событий — корутина, так что
+тысячи открытых соединений не занимают ни потоков, ни соединений с
+базой. Под WSGI поток держал бы воркер на всё время соединения,
+поэтому там страница ленты не выводит плашку, а `follow_events`
+отвечает 204.
+
+Подписка на автора или отписка публикует `follows:<id>`: поток на это
+закрывается, и браузер переподключается с новым списком авторов.
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Max
+
+from core import pubsub
+from core.asgi import request_from_scope
+
+from .models import Follow, Post
+
+RETRY_MS = 3000
+PING = b': ping\n\n'
+HEADERS = (
+    ('Content-Type', 'text/event-stream; charset=utf-8'),
+    ('Cache-Control', 'no-cache'),
+    ('X-Accel-Buffering', 'no'),
+)
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+def follows_channel(user_id):
+    return f'follows:{user_id}'
+
+
+def publish_post(post):
+    pubsub.publish(author_channel(post.author_id),
+                   {'post': post.pk, 'author': post.author_id})
+
+
+def publish_follows(user_id):
+    pubsub.publish(follows_channel(user_id), {'user': user_id})
+
+
+def encode(**fields):
+    """Событие SSE из полей в порядке аргументов."""
+    lines = [f'{name}: {value}' for name, value in fields.items()]
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def parse_after(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class NewPosts:
+    """Счётчик новых постов подписок для одного потока."""
+
+    def __init__(self, user_id, after=None):
+        self.user_id = user_id
+        self.after = after or 0
+        self.latest = self.after
+        self.follows = follows_channel(user_id)
+        self.authors = set(Follow.objects.filter(user_id=user_id)
+                           .values_list('author_id', flat=True))
+        self.count = 0
+        if after is not None and self.authors:
+            found = Post.objects.filter(
+                author_id__in=self.authors, pk__gt=after
+            ).aggregate(count=Count('pk'), latest=Max('pk'))
+            self.count = found['count']
+            self.latest = found['latest'] or self.latest
+
+    @property
+    def channels(self):
+        return {author_channel(author) for author in self.authors} | {
+            self.follows
+        }
+
+    def head(self):
+        """Начало потока: пауза переподключения и уже известные посты."""
+        head = encode(retry=RETRY_MS)
+        return head + self.event() if self.count else head
+
+    def event(self):
+        data = json.dumps({'count': self.count, 'post': self.latest})
+        return encode(event='posts', id=self.latest, data=data)
+
+    def update(self, message):
+        """Событие на сообщение о новом посте; None — слать нечего."""
+        post = message.get('post')
+        if not isinstance(post, int) or post <= self.after:
+            return None
+        self.count += 1
+        self.latest = max(self.latest, post)
+        return self.event()
+
+
+def open_stream(request):
+    """Счётчик для запроса; None, если пользователь не вошёл."""
+    if not request.user.is_authenticated:
+        return None
+    return NewPosts(request.user.pk, parse_after(request.GET.get('after')))
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class FollowEvents:
+    """ASGI-приложение потока событий, см. core.asgi.ASGI_ROUTES."""
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        new_posts = await loop.run_in_executor(self.executor, self.open,
+                                               scope)
+        if new_posts is None:
+            await send({'type': 'http.response.start', 'status': 403,
+                        'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        subscription = pubsub.get_broker().subscribe_async(
+            new_posts.channels
+        )
+        with subscription:
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(name.lower().encode(), value.encode())
+                                    for name, value in HEADERS]})
+            await self.body(send, new_posts.head())
+            connected = await self.pump(new_posts, subscription, receive,
+                                        send)
+        if connected:
+            await send({'type': 'http.response.body', 'body': b''})
+
+    def open(self, scope):
+        try:
+            return open_stream(request_from_scope(scope))
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    async def body(send, chunk):
+        await send({'type': 'http.response.body', 'body': chunk,
+                    'more_body': True})
+
+    async def pump(self, new_posts, subscription, receive, send):
+        """Шлёт события, пока клиент на связи; False — клиент ушёл."""
+        loop = asyncio.get_running_loop()
+        disconnected = loop.create_task(wait_disconnect(receive))
+        message = None
+        try:
+            while True:
+                if message is None:
+                    message = loop.create_task(subscription.get())
+                done, _ = await asyncio.wait(
+                    {message, disconnected}, timeout=settings.EVENTS_HEARTBEAT,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    return False
+                if message not in done:
+                    await self.body(send, PING)
+                    continue
+                channel, data = message.result()
+                message = None
+                if channel == new_posts.follows:
+                    return True
+                chunk = new_posts.update(data)
+                if chunk:
+                    await self.body(send, chunk)
+        finally:
+            disconnected.cancel()
+            if message is not None:
+                message.cancel()
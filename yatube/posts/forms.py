@@ -2,10 +2,15 @@ from django.core.exceptions import ValidationError
 from django import forms
 
 from .models import Post, Comment
+from .uploads import validate_streamed_image
 
 
 class PostForm(forms.ModelForm):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['image'].validators.append(validate_streamed_image)
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
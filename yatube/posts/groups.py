@@ -0,0 +1,79 @@
+"""Поиск групп по slug через LRU-кэш процесса.
+
+Каждый воркер держит последние `MAX_SIZE` групп в памяти и отдаёт их
+без запроса к базе. Согласованность между воркерами держит версия
+области `SCOPE` в общем кэше (posts.cache): сохранение или удаление
+группы меняет её, и воркер, заметив новую версию при следующем поиске,
+сбрасывает свою копию целиком. Проверка версии — одно чтение из
+общего кэша вместо запроса к базе.
+
+В памяти лежат только значения полей из `FIELDS`; на каждое попадание
+собирается новый экземпляр `Group`, остальные поля (счётчик постов,
+время последнего поста) отложены и читаются из базы при обращении.
+Промах читает группу целиком.
+"""
+import threading
+from collections import OrderedDict
+
+from django.db import router
+from django.http import Http404
+
+from .cache import get_versions
+from .models import Group
+
+SCOPE = 'group-meta'
+# В порядке полей модели: так их ждёт `Model.from_db`.
+FIELDS = ('id', 'title', 'slug', 'description')
+MAX_SIZE = 256
+
+
+class LRUCache:
+    """Словарь на `max_size` записей, вытесняющий самые давние."""
+
+    def __init__(self, max_size=MAX_SIZE):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            if version != self.version:
+                self.items.clear()
+                self.version = version
+                return None
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value, version):
+        with self.lock:
+            if version != self.version:
+                return
+            self.items[key] = value
+            self.items.move_to_end(key)
+            if len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.version = None
+
+
+groups = LRUCache()
+
+
+def get_group_or_404(slug):
+    """Группа по slug; из кэша процесса — без запроса к базе."""
+    version, = get_versions(SCOPE)
+    values = groups.get(slug, version)
+    if values is not None:
+        return Group.from_db(router.db_for_read(Group), FIELDS, values)
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        raise Http404('Группа не найдена')
+    groups.set(slug, tuple(getattr(group, field) for field in FIELDS),
+               version)
+    return group
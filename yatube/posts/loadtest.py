@@ -0,0 +1,251 @@
+"""Нагрузочный прогон: смесь запросов к запущенному серверу Yatube.
+
+`seed` наполняет базу: пользователей и группы создаёт mixer, посты и
+комментарии пишутся пачками с текстом из Faker. `run` запускает потоки
+посетителей; у каждого анонимная сессия и сессия вошедшего
+пользователя, действие выбирается случайно с весами из `mix`. Ответ
+4xx/5xx считается ошибкой, редирект после записи — успехом.
+"""
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import mixer
+
+from . import counters, search, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+PASSWORD = 'load-test-password'
+USER_PREFIX = 'load_user_'
+BATCH_SIZE = 1000
+PAGES = 5
+MIX = {
+    'index': 40,
+    'group': 20,
+    'follow_index': 15,
+    'comment': 10,
+    'post': 5,
+    'follow': 10,
+}
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def parse_mix(value):
+    """Строка вида `index=40,group=20` в словарь весов."""
+    mix = {}
+    for item in filter(None, value.split(',')):
+        action, _, weight = item.partition('=')
+        if action not in MIX:
+            raise LoadTestError(f'Неизвестное действие: {action}')
+        try:
+            mix[action] = float(weight)
+        except ValueError:
+            raise LoadTestError(f'Вес действия {action}: {weight!r}')
+    return mix
+
+
+def seed(users=50, groups=5, posts=5000, comments=10000, follows=10):
+    """Пользователи `load_user_N` с паролем `PASSWORD` и их записи."""
+    fake = Faker('ru_RU')
+    fake.seed_instance(0)
+    rng = random.Random(0)
+    authors = mixer.cycle(users).blend(
+        User, username=mixer.sequence(USER_PREFIX + '{0}'),
+        password=make_password(PASSWORD)
+    )
+    groups = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('load-group-{0}')
+    )
+    for start in range(0, posts, BATCH_SIZE):
+        Post.objects.bulk_create(
+            Post(author=rng.choice(authors),
+                 group=rng.choice(groups + [None]),
+                 text=fake.text(rng.randint(50, 2000)))
+            for _ in range(start, min(start + BATCH_SIZE, posts))
+        )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    for start in range(0, comments, BATCH_SIZE):
+        Comment.objects.bulk_create(
+            Comment(post_id=rng.choice(post_ids), author=rng.choice(authors),
+                    text=fake.sentence())
+            for _ in range(start, min(start + BATCH_SIZE, comments))
+        )
+    Follow.objects.bulk_create(
+        Follow(user=user, author=author) for user in authors
+        for author in rng.sample(authors, min(follows, users))
+        if author != user
+    )
+    counters.recount()
+    timeline.rebuild()
+    search.get_backend().rebuild()
+
+
+def targets():
+    """Адресаты действий: группы, свежие посты и пользователи прогона."""
+    usernames = list(
+        User.objects.filter(username__startswith=USER_PREFIX)
+        .order_by('pk').values_list('username', flat=True)
+    )
+    if not usernames:
+        raise LoadTestError('Нет пользователей прогона; запустите с --seed')
+    return {
+        'usernames': usernames,
+        'groups': list(Group.objects.values_list('slug', flat=True)),
+        'posts': list(Post.objects.values_list('pk', flat=True)[:1000]),
+    }
+
+
+class Visitor:
+    """Посетитель: анонимная сессия и сессия пользователя `username`."""
+
+    def __init__(self, base_url, username, targets, rng):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.targets = targets
+        self.rng = rng
+        self.anonymous = requests.Session()
+        self.session = requests.Session()
+        self.following = set()
+        self.login()
+
+    def url(self, name, *args):
+        return self.base_url + reverse(name, args=args)
+
+    def submit(self, url, data):
+        data['csrfmiddlewaretoken'] = self.session.cookies.get('csrftoken')
+        return self.session.post(url, data, headers={'Referer': url},
+                                 allow_redirects=False)
+
+    def login(self):
+        url = self.url('users:login')
+        self.session.get(url)
+        response = self.submit(url, {'username': self.username,
+                                     'password': PASSWORD})
+        if response.status_code != 302:
+            raise LoadTestError(f'{self.username}: вход не удался, '
+                                f'ответ {response.status_code}')
+
+    def index(self):
+        page = self.rng.randint(1, PAGES)
+        return 'posts:index', self.anonymous.get(
+            self.url('posts:index'), params={'page': page}
+        )
+
+    def group(self):
+        slug = self.rng.choice(self.targets['groups'])
+        return 'posts:group', self.anonymous.get(self.url('posts:group',
+                                                          slug))
+
+    def follow_index(self):
+        return 'posts:follow_index', self.session.get(
+            self.url('posts:follow_index')
+        )
+
+    def comment(self):
+        post_id = self.rng.choice(self.targets['posts'])
+        return 'posts:add_comment', self.submit(
+            self.url('posts:add_comment', post_id),
+            {'text': 'Комментарий нагрузочного прогона'}
+        )
+
+    def post(self):
+        return 'posts:post_create', self.submit(
+            self.url('posts:post_create'),
+            {'text': 'Пост нагрузочного прогона'}
+        )
+
+    def follow(self):
+        author = self.rng.choice(self.targets['usernames'])
+        name = ('posts:profile_unfollow' if author in self.following
+                else 'posts:profile_follow')
+        self.following ^= {author}
+        return name, self.session.get(self.url(name, author),
+                                      allow_redirects=False)
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank - 1, 0)]
+
+
+def summarize(samples, seconds):
+    """Статистика по маршрутам из пар (маршрут, секунды, успех)."""
+    routes = defaultdict(list)
+    errors = defaultdict(int)
+    for route, duration, ok in samples:
+        routes[route].append(duration)
+        routes['total'].append(duration)
+        if not ok:
+            errors[route] += 1
+            errors['total'] += 1
+    report = {}
+    for route, durations in sorted(routes.items()):
+        durations.sort()
+        report[route] = {
+            'requests': len(durations),
+            'errors': errors[route],
+            'rps': round(len(durations) / seconds, 2),
+            'mean_ms': round(sum(durations) / len(durations) * 1000, 2),
+            **{f'p{percent}_ms': round(percentile(durations, percent)
+                                       * 1000, 2)
+               for percent in (50, 95, 99)},
+        }
+    return report
+
+
+def run(base_url, concurrency=8, duration=30, mix=None, seed=0):
+    """Гоняет смесь запросов `duration` секунд; возвращает отчёт."""
+    mix = mix or MIX
+    aims = targets()
+    usernames = aims['usernames']
+    visitors = [
+        Visitor(base_url, usernames[number % len(usernames)], aims,
+                random.Random(seed + number))
+        for number in range(concurrency)
+    ]
+    samples = []
+    lock = threading.Lock()
+    actions, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    def visit(visitor):
+        local = []
+        while time.perf_counter() < deadline:
+            action = visitor.rng.choices(actions, weights)[0]
+            started = time.perf_counter()
+            try:
+                route, response = getattr(visitor, action)()
+                ok = response.status_code < 400
+            except requests.RequestException:
+                route, ok = action, False
+            local.append((route, time.perf_counter() - started, ok))
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=visit, args=(visitor,))
+               for visitor in visitors]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    return {
+        'url': base_url,
+        'concurrency': concurrency,
+        'duration': round(seconds, 2),
+        'mix': mix,
+        'routes': summarize(samples, seconds),
+    }
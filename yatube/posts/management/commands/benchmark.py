@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Запускает сценарий замера производительности на временной базе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(benchmarks.SCENARIOS))
+        parser.add_argument(
+            '--size', type=int, default=None,
+            help='Объём тестовых данных; по умолчанию свой у сценария'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз повторять каждый замер'
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            kwargs = {'repeat': options['repeat']}
+            if options['size'] is not None:
+                kwargs['size'] = options['size']
+            benchmarks.SCENARIOS[options['scenario']](self.stdout, **kwargs)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-',
+                            help='Файл; «-» — стандартный вывод')
+        parser.add_argument('--format', choices=('ndjson', 'csv'),
+                            default='ndjson')
+        parser.add_argument(
+            '--kind', action='append', choices=transfer.KINDS,
+            help='Что выгружать; можно повторить. По умолчанию всё, '
+                 'для CSV нужен ровно один вид'
+        )
+        parser.add_argument('--batch-size', type=int,
+                            default=transfer.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        kinds = options['kind'] or list(transfer.KINDS)
+        path = options['output']
+        output = (sys.stdout if path == '-'
+                  else open(path, 'w', encoding='utf-8', newline=''))
+        try:
+            totals = transfer.export(kinds, output, options['format'],
+                                     options['batch_size'])
+        except transfer.TransferError as error:
+            raise CommandError(error)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(
+            'Выгружено: ' + ', '.join(f'{kind} {totals[kind]}'
+                                      for kind in kinds)
+        ))
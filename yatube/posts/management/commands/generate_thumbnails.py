@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = ('Ставит задачи на миниатюры для всех картинок постов без них; '
+            'выполняет их run_tasks')
+
+    def handle(self, *args, **options):
+        thumbnails.backfill()
+        self.stdout.write(self.style.SUCCESS('Задачи на миниатюры поставлены'))
@@ -0,0 +1,52 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии и подписки из NDJSON '
+            'или CSV пачками через bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-',
+                            help='Файл; «-» — стандартный ввод')
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'), default=None,
+            help='По умолчанию — по расширению файла, иначе NDJSON'
+        )
+        parser.add_argument('--kind', choices=transfer.KINDS,
+                            help='Вид записей в CSV-файле')
+        parser.add_argument('--batch-size', type=int,
+                            default=transfer.BATCH_SIZE)
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ленты, поиск и не сбрасывать '
+                 'кэш — для загрузки нескольких файлов подряд'
+        )
+
+    def handle(self, *args, **options):
+        path = options['input']
+        format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        if format == 'csv' and not options['kind']:
+            raise CommandError('Для CSV укажите --kind')
+        source = (sys.stdin if path == '-'
+                  else open(path, encoding='utf-8', newline=''))
+        try:
+            records = (transfer.read_csv(source, options['kind'])
+                       if format == 'csv' else transfer.read_ndjson(source))
+            totals = transfer.load(records, options['batch_size'],
+                                   rebuild=not options['no_rebuild'])
+        except transfer.TransferError as error:
+            raise CommandError(error)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: ' + ', '.join(f'{kind} {totals[kind]}'
+                                      for kind in transfer.KINDS
+                                      if totals[kind])
+        ))
@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.reports import write_report
+from posts import loadtest
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон смеси запросов против запущенного сервера; '
+            'база команды должна совпадать с базой сервера')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Адрес сервера')
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Сначала наполнить базу пользователями load_user_N и постами'
+        )
+        parser.add_argument('--posts', type=int, default=5000,
+                            help='Сколько постов создать при --seed')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Число одновременных посетителей')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность прогона, секунды')
+        parser.add_argument(
+            '--mix', default='',
+            help='Веса действий, например index=40,group=20,post=5; '
+                 f'действия: {", ".join(loadtest.MIX)}'
+        )
+        parser.add_argument('--compare', metavar='REPORT',
+                            help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        try:
+            if options['seed']:
+                loadtest.seed(posts=options['posts'],
+                              comments=options['posts'] * 2)
+            report = loadtest.run(
+                options['url'], options['concurrency'], options['duration'],
+                loadtest.parse_mix(options['mix']) or None
+            )
+        except loadtest.LoadTestError as error:
+            raise CommandError(error)
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as source:
+                previous = json.load(source)['routes']
+        self.print_routes(report['routes'], previous)
+        stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+        path = write_report(f'loadtest-{stamp}.json', report)
+        self.stdout.write(self.style.SUCCESS(f'Отчёт: {path}'))
+
+    def print_routes(self, routes, previous):
+        self.stdout.write(
+            f'{"route":<26}{"requests":>9}{"errors":>8}{"rps":>8}'
+            f'{"p50, ms":>9}{"p95, ms":>9}{"p99, ms":>9}'
+            + (f'{"Δrps":>8}{"Δp95":>8}' if previous else '')
+        )
+        for route, stats in routes.items():
+            line = (f'{route:<26}{stats["requests"]:>9}{stats["errors"]:>8}'
+                    f'{stats["rps"]:>8.1f}{stats["p50_ms"]:>9.1f}'
+                    f'{stats["p95_ms"]:>9.1f}{stats["p99_ms"]:>9.1f}')
+            before = previous.get(route)
+            if before:
+                line += (f'{stats["rps"] - before["rps"]:>+8.1f}'
+                         f'{stats["p95_ms"] - before["p95_ms"]:>+8.1f}')
+            self.stdout.write(line)
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    AuthorCounter = apps.get_model('posts', 'AuthorCounter')
+    for row in Post.objects.order_by().values('group').annotate(total=Count('pk')):
+        Group.objects.filter(pk=row['group']).update(posts_count=row['total'])
+    for row in Post.objects.order_by().values('author').annotate(total=Count('pk')):
+        AuthorCounter.objects.create(author_id=row['author'],
+                                     posts_count=row['total'])
+    for row in Post.objects.order_by().values('pk').annotate(total=Count('comments')):
+        if row['total']:
+            Post.objects.filter(pk=row['pk']).update(
+                comments_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0005_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorCounter',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+            ],
+            options={
+                'verbose_name': 'Счётчик постов автора',
+                'verbose_name_plural': 'Счётчики постов авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
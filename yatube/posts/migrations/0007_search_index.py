@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# Стеммер — чистая функция без моделей и настроек, поэтому миграция
+# может его импортировать; индекс со старыми основами пересобирает
+# rebuild_search_index.
+from posts.stemmer import tokenize
+
+SQLITE_TABLE = 'posts_post_fts'
+POSTGRES_INDEX = 'posts_post_text_fts_idx'
+BATCH_SIZE = 1000
+
+
+def fill_sqlite_index(Post, cursor):
+    sql = f'INSERT INTO {SQLITE_TABLE} (rowid, body) VALUES (%s, %s)'
+    rows = Post.objects.order_by().values_list('pk', 'text')
+    batch = []
+    for pk, text in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append((pk, ' '.join(tokenize(text))))
+        if len(batch) == BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch = []
+    cursor.executemany(sql, batch)
+
+
+def install(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {SQLITE_TABLE} USING fts5(body)'
+        )
+        with schema_editor.connection.cursor() as cursor:
+            fill_sqlite_index(apps.get_model('posts', 'Post'), cursor)
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {POSTGRES_INDEX} ON posts_post '
+            f"USING GIN (to_tsvector('russian', text))"
+        )
+
+
+def uninstall(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {POSTGRES_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
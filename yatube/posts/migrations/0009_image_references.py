@@ -0,0 +1,26 @@
+from django.db import migrations
+from django.db.models import Count
+
+from core.storage import is_content_addressed
+
+
+def count_references(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    StoredFile = apps.get_model('core', 'StoredFile')
+    rows = Post.objects.order_by().values('image').annotate(total=Count('pk'))
+    StoredFile.objects.bulk_create(
+        StoredFile(name=row['image'], refcount=row['total'])
+        for row in rows if is_content_addressed(row['image'])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('posts', '0008_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:24
+
+import json
+
+from django.db import migrations
+
+
+def move_jobs_to_tasks(apps, schema_editor):
+    ThumbnailJob = apps.get_model('posts', 'ThumbnailJob')
+    Task = apps.get_model('core', 'Task')
+    post_ids = ThumbnailJob.objects.order_by().values_list(
+        'post_id', flat=True).distinct()
+    Task.objects.bulk_create(
+        (Task(name='posts.thumbnails', args=json.dumps([post_id]),
+              key=f'posts.thumbnails:{post_id}')
+         for post_id in post_ids.iterator()),
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_task'),
+        ('posts', '0013_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_jobs_to_tasks, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='ThumbnailJob',
+        ),
+    ]
@@ -1,10 +1,17 @@
 from django.contrib.auth import get_user_model
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils.text import Truncator
 from core.models import CreatedModel
 
 
 User = get_user_model()
+PREVIEW_LENGTH = 500
+FEED_FIELDS = (
+    'pub_date', 'image', 'comments_count', 'thumbnail_source',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__title', 'group__slug',
+)
 
 
 class Group(models.Model):
@@ -12,11 +19,45 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов', default=0, editable=False
+    )
+    last_post_at = models.DateTimeField(
+        'Последний пост', null=True, editable=False
+    )
 
     def __str__(self) -> str:
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """Готовые выборки постов для страниц сайта."""
+
+    def for_feed(self):
+        """Посты для лент: автор и группа одним JOIN, без полного текста.
+
+        Из базы читается только начало текста (`text_start`), его
+        показывает `Post.preview`. Число запросов на страницу не
+        зависит от её размера.
+        """
+        # extra(), а не annotate(): аннотация заставила бы COUNT(*)
+        # пагинатора группировать по тексту всех постов.
+        return self.select_related('author', 'group').only(
+            *FEED_FIELDS
+        ).extra(
+            select={'text_start': 'SUBSTR("posts_post"."text", 1, %s)'},
+            select_params=(PREVIEW_LENGTH + 1,)
+        )
+
+    def for_detail(self):
+        """Пост со счётчиком постов автора и группой.
+
+        Комментарии читаются отдельно по страницам, см.
+        `utils.get_comments_page`.
+        """
+        return self.select_related('author__post_counter', 'group')
+
+
 class Post(models.Model):
     """класс Post наследник класса Model с описанием моделей и их типов """
     text = models.TextField(
@@ -25,8 +66,7 @@ class Post(models.Model):
     )
     pub_date = models.DateTimeField(
         'Дата публикации',
-        auto_now_add=True,
-        db_index=True
+        auto_now_add=True
     )
     author = models.ForeignKey(
         User,
@@ -46,14 +86,59 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев', default=0, editable=False
+    )
+    thumbnail_source = models.CharField(
+        'Картинка с готовыми миниатюрами', max_length=100, blank=True,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.text[:settings.NUMBER]
 
+    @property
+    def preview(self):
+        """Начало текста для лент с многоточием, если текст длиннее."""
+        text = getattr(self, 'text_start', None)
+        if text is None:
+            text = self.text
+        return Truncator(text).chars(PREVIEW_LENGTH)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает группу и картинку из базы для счётчиков."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ('-pub_date', 'author')
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Фильтр и сортировка лент по одному индексу: страницы
+        # Paginator идут в порядке Meta.ordering, keyset-страницы — в
+        # порядке utils.CURSOR_ORDERING. В профиле автор один, и обоим
+        # хватает post_author_date_idx.
+        indexes = [
+            models.Index(fields=['-pub_date', 'author'],
+                         name='post_date_author_idx'),
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date', 'author'],
+                         name='post_group_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_id_idx'),
+        ]
 
 
 class Comment(CreatedModel):
@@ -71,10 +156,18 @@ class Comment(CreatedModel):
     text = models.TextField(verbose_name='Комментарий',
                             help_text='Напишите комментарий')
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        # Страницы комментариев идут по ключу (created, pk), см.
+        # utils.COMMENT_ORDERING.
+        indexes = [models.Index(fields=['post', '-created', '-id'],
+                                name='comment_post_created_idx')]
 
 
 class Follow(models.Model):
@@ -88,3 +181,40 @@ class Follow(models.Model):
         verbose_name_plural = 'Лента авторов'
         constraints = [models.UniqueConstraint(
             fields=['user', 'author'], name='unique_members')]
+
+
+class AuthorCounter(models.Model):
+    """Денормализованное число постов автора."""
+    author = models.OneToOneField(User, primary_key=True,
+                                  related_name='post_counter',
+                                  on_delete=models.CASCADE)
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик постов автора'
+        verbose_name_plural = 'Счётчики постов авторов'
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок: пост автора у подписчика.
+
+    Строки появляются при публикации поста (fan-out on write) и при
+    подписке, удаляются при отписке. Посты популярных авторов сюда не
+    попадают и читаются из `Post` напрямую, см. posts.timeline.
+    """
+    user = models.ForeignKey(User, related_name='timeline',
+                             on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, related_name='timeline',
+                             on_delete=models.CASCADE)
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'post'], name='unique_timeline_post')]
+        indexes = [models.Index(
+            fields=['user', '-pub_date', '-post'],
+            name='timeline_user_date_idx'
+        )]
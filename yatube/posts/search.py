@@ -0,0 +1,212 @@
+"""Полнотекстовый поиск по тексту постов.
+
+Индекс зависит от базы: в SQLite это виртуальная таблица FTS5 со
+стеммированными словами (см. `stemmer`), в PostgreSQL — GIN-индекс по
+`to_tsvector('russian', text)`. Снаружи оба варианта выглядят
+одинаково: `get_backend()` возвращает объект с методами `count`,
+`ids` и `filter`, а `SearchResults` отдаёт найденные посты
+пагинатору в порядке релевантности. Таблицу и индекс создаёт миграция
+0007_search_index.
+"""
+from django.db import connection as default_connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .stemmer import tokenize
+
+BATCH_SIZE = 1000
+
+
+class SearchBackend:
+    """Общий интерфейс поискового индекса."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, post):
+        """Обновляет запись поста после сохранения."""
+
+    def remove(self, post_id):
+        """Убирает пост из индекса после удаления."""
+
+    def rebuild(self, posts=None):
+        """Заново индексирует все посты (или переданный queryset)."""
+
+    def matches(self, query):
+        """SQL с параметрами: id постов, подходящих под запрос."""
+        raise NotImplementedError
+
+    def ranked(self, query):
+        """То же, что `matches`, но по убыванию релевантности."""
+        raise NotImplementedError
+
+    def _fetch(self, sql, params):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, query):
+        sql, params = self.matches(query)
+        return self._fetch(f'SELECT COUNT(*) FROM ({sql}) AS found',
+                           params)[0]
+
+    def ids(self, query, offset, limit):
+        sql, params = self.ranked(query)
+        return self._fetch(f'{sql} LIMIT %s OFFSET %s',
+                           [*params, limit, offset])
+
+    def filter(self, queryset, query):
+        return queryset.filter(pk__in=RawSQL(*self.matches(query)))
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 с внешним стеммингом: в таблицу пишутся основы слов."""
+
+    table = 'posts_post_fts'
+
+    def _write(self, cursor, rows):
+        rows = [(pk, ' '.join(tokenize(text))) for pk, text in rows]
+        cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s',
+                           [(pk,) for pk, _ in rows])
+        cursor.executemany(
+            f'INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)', rows
+        )
+
+    def index(self, post):
+        with self.connection.cursor() as cursor:
+            self._write(cursor, [(post.pk, post.text)])
+
+    def remove(self, post_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s',
+                           [post_id])
+
+    def rebuild(self, posts=None):
+        if posts is None:
+            posts = Post.objects.all()
+        rows = posts.order_by().values_list('pk', 'text')
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            batch = []
+            for row in rows.iterator(chunk_size=BATCH_SIZE):
+                batch.append(row)
+                if len(batch) == BATCH_SIZE:
+                    self._write(cursor, batch)
+                    batch = []
+            self._write(cursor, batch)
+
+    def _expression(self, query):
+        """Все основы слов запроса, каждая в кавычках — как фраза FTS5."""
+        return ' '.join(f'"{term}"' for term in tokenize(query))
+
+    def _select(self, query, order=''):
+        expression = self._expression(query)
+        if not expression:
+            return 'SELECT id FROM posts_post WHERE 0 = 1', []
+        # JOIN отсекает строки индекса, пост которых удалён в обход
+        # сигналов (bulk-удаление, очистка таблиц в тестах).
+        return (
+            f'SELECT {self.table}.rowid FROM {self.table} '
+            f'INNER JOIN posts_post ON posts_post.id = {self.table}.rowid '
+            f'WHERE {self.table} MATCH %s{order}', [expression]
+        )
+
+    def matches(self, query):
+        return self._select(query)
+
+    def ranked(self, query):
+        return self._select(
+            query, f' ORDER BY {self.table}.rank, {self.table}.rowid DESC'
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector/tsquery с русской конфигурацией PostgreSQL.
+
+    Индекс строится по выражению и обновляется самой базой, поэтому
+    `index` и `remove` ничего не делают.
+    """
+
+    config = 'russian'
+
+    @property
+    def vector(self):
+        return f"to_tsvector('{self.config}', posts_post.text)"
+
+    @property
+    def tsquery(self):
+        return f"plainto_tsquery('{self.config}', %s)"
+
+    def matches(self, query):
+        return (f'SELECT id FROM posts_post '
+                f'WHERE {self.vector} @@ {self.tsquery}', [query])
+
+    def ranked(self, query):
+        sql, params = self.matches(query)
+        return (f'{sql} ORDER BY ts_rank({self.vector}, {self.tsquery}) '
+                f'DESC, id DESC', [*params, query])
+
+
+class LikeSearchBackend(SearchBackend):
+    """Запасной вариант без индекса для остальных баз."""
+
+    def _queryset(self, query):
+        return Post.objects.filter(text__icontains=query.strip())
+
+    def matches(self, query):
+        return self._queryset(query).values('pk').query.sql_with_params()
+
+    def ranked(self, query):
+        return (self._queryset(query).order_by('-pub_date', '-pk')
+                .values('pk').query.sql_with_params())
+
+    def count(self, query):
+        return self._queryset(query).count()
+
+    def ids(self, query, offset, limit):
+        ranked = self._queryset(query).order_by('-pub_date', '-pk')
+        return list(ranked.values_list('pk', flat=True)
+                    [offset:offset + limit])
+
+    def filter(self, queryset, query):
+        return queryset.filter(text__icontains=query.strip())
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(connection=default_connection):
+    return BACKENDS.get(connection.vendor, LikeSearchBackend)(connection)
+
+
+class SearchResults:
+    """Ленивый список найденных постов для `Paginator`.
+
+    `count()` считает совпадения в индексе, срез выбирает нужные id по
+    релевантности и загружает посты одним запросом.
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.backend = backend or get_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        ids = self.backend.ids(self.query, start, max(stop - start, 0))
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,152 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import files
+from core.tasks import enqueue
+
+from . import (cache, conditional, counters, events, groups, thumbnails,
+               timeline)
+from .models import Comment, Follow, Group, Post
+
+
+def post_scopes(post):
+    scopes = ['index', f'profile:{post.author_id}', f'post:{post.pk}']
+    for group_id in (post.group_id, getattr(post, '_loaded_group_id', None)):
+        if group_id is not None:
+            scopes += [f'group:{group_id}', 'groups']
+    return scopes
+
+
+# Подключается раньше count_saved_post, пока _loaded_group_id ещё
+# указывает на прежнюю группу поста.
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    cache.bump_on_commit(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    cache.bump_on_commit(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    cache.bump_on_commit('index', f'group:{instance.pk}', 'groups',
+                         groups.SCOPE)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    cache.bump_on_commit(conditional.follows_scope(instance.user_id))
+
+
+@receiver(post_delete, sender=Post)
+def forget_post_author(sender, instance, **kwargs):
+    conditional.forget_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Новый пост попадает в ленты подписчиков задачей очереди."""
+    if created:
+        enqueue('posts.fan_out', instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def announce_post(sender, instance, created, **kwargs):
+    """Открытые потоки событий ленты узнают о посте после коммита."""
+    if created:
+        transaction.on_commit(lambda: events.publish_post(instance))
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_author(instance.author_id, 1)
+        counters.shift_group(instance.group_id, 1)
+        counters.touch_group(instance.group_id, instance.pub_date)
+    elif hasattr(instance, '_loaded_group_id'):
+        if instance._loaded_group_id != instance.group_id:
+            counters.shift_group(instance._loaded_group_id, -1)
+            counters.shift_group(instance.group_id, 1)
+            counters.refresh_group_activity(instance._loaded_group_id)
+            counters.touch_group(instance.group_id, instance.pub_date)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.shift_author(instance.author_id, -1)
+    counters.shift_group(instance.group_id, -1)
+    counters.refresh_group_activity(instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.shift_comments(instance.post_id, 1)
+
+
+@receiver(post_save, sender=Comment)
+def notify_post_author(sender, instance, created, **kwargs):
+    if created:
+        enqueue('posts.notify_comment', instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.shift_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    timeline.trim(instance.user_id, instance.author_id)
+    author_id = instance.author_id
+    if timeline.needs_materialize(author_id):
+        enqueue('posts.materialize_author', author_id,
+                key=f'posts.materialize_author:{author_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def announce_follows(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: events.publish_follows(user_id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def index_post(sender, instance, **kwargs):
+    enqueue('posts.index', instance.pk, key=f'posts.index:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+def enqueue_thumbnails(sender, instance, **kwargs):
+    thumbnails.enqueue(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, **kwargs):
+    """Картинка поста держит ссылку на файл в хранилище."""
+    name = instance.image.name or ''
+    loaded = '' if created else getattr(instance, '_loaded_image', None)
+    if loaded is not None and loaded != name:
+        files.retain(name)
+        files.release(loaded)
+    instance._loaded_image = name
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    files.release(instance.image.name)
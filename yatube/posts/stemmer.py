@@ -0,0 +1,129 @@
+"""Стеммер Портера (Snowball) для русского языка.
+
+Отрезает окончания и суффиксы, чтобы «постами», «постов» и «пост»
+попадали в поисковый индекс одним термином. Реализация следует
+описанию алгоритма на snowballstem.org.
+"""
+import functools
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (('в', 'вши', 'вшись'),
+                     ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+ADJECTIVE = ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой',
+             'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых',
+             'ую', 'юю', 'ая', 'яя', 'ою', 'ею')
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+REFLEXIVE = ('ся', 'сь')
+VERB = (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+         'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'),
+        ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+         'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+         'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+NOUN = ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я')
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+CYRILLIC = re.compile('^[а-я]+$')
+STOP_WORDS = frozenset(
+    'а без в во да для до же за и из или к ко ли на над не ни но о об '
+    'от по под при с со то у что это'.split()
+)
+
+
+def _endings(groups):
+    """Окончания группы от длинных к коротким с признаком «после а/я»."""
+    if isinstance(groups[0], str):
+        groups = ((), groups)
+    pairs = [(ending, True) for ending in groups[0]]
+    pairs += [(ending, False) for ending in groups[1]]
+    return sorted(pairs, key=lambda pair: -len(pair[0]))
+
+
+PERFECTIVE_GERUND = _endings(PERFECTIVE_GERUND)
+ADJECTIVE = _endings(ADJECTIVE)
+PARTICIPLE = _endings(PARTICIPLE)
+REFLEXIVE = _endings(REFLEXIVE)
+VERB = _endings(VERB)
+NOUN = _endings(NOUN)
+
+
+def _strip(rv, endings):
+    """Удаляет самое длинное подходящее окончание; иначе None."""
+    for ending, after_a in endings:
+        if rv.endswith(ending):
+            base = rv[:-len(ending)]
+            if after_a and not base.endswith(('а', 'я')):
+                return None
+            return base
+    return None
+
+
+def _region(word, start=0):
+    """Начало области после первой согласной, следующей за гласной."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _step1(rv):
+    """Окончания деепричастий, прилагательных, глаголов и существительных."""
+    base = _strip(rv, PERFECTIVE_GERUND)
+    if base is not None:
+        return base
+    reflexive = _strip(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    base = _strip(rv, ADJECTIVE)
+    if base is not None:
+        participle = _strip(base, PARTICIPLE)
+        return base if participle is None else participle
+    for endings in (VERB, NOUN):
+        base = _strip(rv, endings)
+        if base is not None:
+            return base
+    return rv
+
+
+def _step4(rv):
+    """Превосходная степень, удвоенная «н» и мягкий знак."""
+    for ending in SUPERLATIVE:
+        if rv.endswith(ending):
+            rv = rv[:-len(ending)]
+            return rv[:-1] if rv.endswith('нн') else rv
+    if rv.endswith('нн') or rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+@functools.lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.match(word):
+        return word
+    for index, letter in enumerate(word):
+        if letter in VOWELS:
+            break
+    else:
+        return word
+    prefix, rv = word[:index + 1], word[index + 1:]
+    r2 = _region(word, _region(word)) - len(prefix)
+    rv = _step1(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(rv) - len(ending) >= r2:
+            rv = rv[:-len(ending)]
+            break
+    return prefix + _step4(rv)
+
+
+def tokenize(text):
+    """Слова текста в нормальной форме для поискового индекса."""
+    return [stem(word) for word in re.findall(r'\w+', text.lower())
+            if word not in STOP_WORDS]
@@ -0,0 +1,76 @@
+"""Фоновые задачи постов, см. core.tasks.
+
+Задачи получают id и читают свежее состояние: к выполнению пост могли
+отредактировать или удалить.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from core.tasks import task
+
+from . import search, thumbnails, timeline
+from .models import Comment, Post
+
+
+@task('posts.fan_out')
+def fan_out(post_id):
+    """Раскладывает новый пост по лентам подписчиков."""
+    post = Post.objects.filter(pk=post_id).only('author', 'pub_date').first()
+    if post is not None:
+        timeline.fan_out(post)
+
+
+@task('posts.materialize_author')
+def materialize_author(author_id):
+    """Раскладывает посты бывшего популярного автора по лентам."""
+    timeline.materialize(author_id)
+
+
+@task('posts.index')
+def index(post_id):
+    """Приводит запись поста в поисковом индексе к состоянию в базе."""
+    backend = search.get_backend()
+    text = Post.objects.filter(pk=post_id).values_list(
+        'text', flat=True
+    ).first()
+    if text is None:
+        backend.remove(post_id)
+    else:
+        backend.index(Post(pk=post_id, text=text))
+
+
+@task(thumbnails.TASK, retry_delay=timedelta(minutes=1))
+def make_thumbnails(post_id):
+    """Режет миниатюры текущей картинки поста."""
+    post = Post.objects.filter(pk=post_id).values(
+        'image', 'thumbnail_source'
+    ).first()
+    if post is None or post['image'] in ('', post['thumbnail_source']):
+        return
+    thumbnails.render(post['image'])
+    Post.objects.filter(pk=post_id, image=post['image']).update(
+        thumbnail_source=post['image']
+    )
+
+
+@task('posts.notify_comment', max_attempts=5)
+def notify_comment(comment_id):
+    """Письмо автору поста о новом комментарии."""
+    comment = Comment.objects.select_related('author', 'post__author').filter(
+        pk=comment_id
+    ).first()
+    if comment is None:
+        return
+    recipient = comment.post.author
+    if not recipient.email or recipient.pk == comment.author_id:
+        return
+    context = {'comment': comment,
+               'url': reverse('posts:post_detail', args=[comment.post_id])}
+    subject = render_to_string('posts/email/comment_subject.txt', context)
+    send_mail(' '.join(subject.split()),
+              render_to_string('posts/email/comment.txt', context),
+              settings.DEFAULT_FROM_EMAIL, [recipient.email])
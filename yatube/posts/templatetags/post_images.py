@@ -0,0 +1,21 @@
+from django import template
+from django.conf import settings
+
+from ..thumbnails import thumbnail_file
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, geometry):
+    """Адрес готовой миниатюры картинки поста или самой картинки.
+
+    Картинка в запросе не режется: миниатюры готовит задача очереди,
+    которую выполняет `run_tasks`, а до тех пор показывается исходник.
+    """
+    if not post.image:
+        return ''
+    options = settings.THUMBNAIL_GEOMETRIES.get(geometry)
+    if options is None or post.thumbnail_source != post.image.name:
+        return post.image.url
+    return thumbnail_file(post.image.name, geometry, options).url
@@ -0,0 +1,155 @@
+"""Бюджеты SQL-запросов и времени для всех адресов posts.urls.
+
+База наполняется объёмами, похожими на живой сайт. Бюджеты лежат в
+budgets.json рядом с тестом; отчёт с замерами пишется в
+`reports/budgets.json`, а строка с тем же содержимым добавляется в
+`reports/budgets-history.jsonl`, чтобы видеть динамику по коммитам.
+Каталог отчётов — настройка `REPORTS_DIR`, см. core.reports.
+"""
+import json
+import os
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.reports import write_report
+from core.testing import route_names
+
+from .. import counters, search, timeline
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'budgets.json')
+USERS = 40
+GROUPS = 8
+POSTS = 1500
+COMMENTS = 4000
+FOLLOWS_PER_USER = 10
+REPEAT = 3
+
+
+def seed():
+    """Пользователи, группы, посты, комментарии и подписки."""
+    words = random.Random(0)
+    User.objects.bulk_create(
+        User(username=f'user{number}') for number in range(USERS)
+    )
+    users = list(User.objects.order_by('pk'))
+    Group.objects.bulk_create(
+        Group(title=f'Группа {number}', slug=f'group-{number}',
+              description='Описание') for number in range(GROUPS)
+    )
+    groups = list(Group.objects.order_by('pk'))
+    Post.objects.bulk_create(
+        Post(author=words.choice(users),
+             group=words.choice(groups + [None]),
+             text='Пост о прогулках и котиках ' * words.randint(1, 40))
+        for _ in range(POSTS)
+    )
+    posts = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        Comment(post_id=words.choice(posts), author=words.choice(users),
+                text='Комментарий') for _ in range(COMMENTS)
+    )
+    Follow.objects.bulk_create(
+        Follow(user=user, author=author) for user in users
+        for author in words.sample(users, FOLLOWS_PER_USER)
+        if author != user
+    )
+    counters.recount()
+    timeline.rebuild()
+    search.get_backend().rebuild()
+    return users, groups
+
+
+class BudgetTest(TestCase):
+    """Адреса posts.urls укладываются в бюджеты запросов и времени"""
+
+    @classmethod
+    def setUpTestData(cls):
+        users, groups = seed()
+        cls.reader = users[0]
+        cls.author = Post.objects.order_by('-pub_date', '-pk')[0].author
+        cls.group = groups[0]
+        cls.post = cls.author.posts.order_by('-comments_count')[0]
+        cls.other = next(user for user in users[1:]
+                         if not Follow.objects.filter(
+                             user=cls.reader, author=user).exists())
+
+    def routes(self):
+        """Ключ отчёта → (имя адреса, аргументы, метод, данные)."""
+        post, group = self.post.pk, self.group.slug
+        author, other = self.author.username, self.other.username
+        return {
+            'posts:index': ('posts:index', (), 'get', {}),
+            'posts:index?page=5': ('posts:index', (), 'get', {'page': 5}),
+            'posts:group_index': ('posts:group_index', (), 'get', {}),
+            'posts:group': ('posts:group', (group,), 'get', {}),
+            'posts:profile': ('posts:profile', (author,), 'get', {}),
+            'posts:post_detail': ('posts:post_detail', (post,), 'get', {}),
+            'posts:post_comments': ('posts:post_comments', (post,), 'get',
+                                    {}),
+            'posts:post_create': ('posts:post_create', (), 'get', {}),
+            'posts:post_edit': ('posts:post_edit', (post,), 'get', {}),
+            'posts:add_comment': ('posts:add_comment', (post,), 'post',
+                                  {'text': 'Новый комментарий'}),
+            'posts:search': ('posts:search', (), 'get', {'q': 'котики'}),
+            'posts:follow_index': ('posts:follow_index', (), 'get', {}),
+            'posts:follow_events': ('posts:follow_events', (), 'get',
+                                    {'after': post}),
+            'posts:profile_follow': ('posts:profile_follow', (other,),
+                                     'get', {}),
+            'posts:profile_unfollow': ('posts:profile_unfollow', (other,),
+                                       'get', {}),
+        }
+
+    def measure(self, client, method, url, data):
+        """Число запросов первого вызова и лучшее время из REPEAT."""
+        timings, queries = [], None
+        for _ in range(REPEAT):
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                timings.append(time.perf_counter() - started)
+            self.assertLess(response.status_code, 400, url)
+            if queries is None:
+                queries = len(context.captured_queries)
+        return queries, round(min(timings) * 1000, 2)
+
+    def test_every_route_has_budget(self):
+        """У каждого адреса posts.urls есть бюджет"""
+        with open(BUDGETS_PATH) as budgets:
+            keys = json.load(budgets)
+        routes = self.routes()
+        self.assertEqual(set(routes), set(keys))
+        self.assertEqual({name for name, *_ in routes.values()},
+                         set(route_names('posts.urls')))
+
+    def test_routes_within_budgets(self):
+        """Запросы и время не превышают закоммиченных бюджетов"""
+        with open(BUDGETS_PATH) as budgets:
+            budgets = json.load(budgets)
+        client = Client()
+        client.force_login(self.reader)
+        measured = {}
+        for key, (name, args, method, data) in self.routes().items():
+            url = reverse(name, args=args)
+            queries, ms = self.measure(client, method, url, data)
+            measured[key] = {'url': url, 'queries': queries, 'ms': ms,
+                             **budgets[key]}
+        write_report('budgets.json', {
+            'volumes': {'users': USERS, 'groups': GROUPS, 'posts': POSTS,
+                        'comments': COMMENTS},
+            'routes': measured,
+        }, history='budgets-history.jsonl')
+        for key, result in measured.items():
+            with self.subTest(route=key):
+                self.assertLessEqual(result['queries'], result['max_queries'])
+                self.assertLessEqual(result['ms'], result['max_ms'])
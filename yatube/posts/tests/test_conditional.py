@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import run_on_commit
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalViewsTest(TestCase):
+    """ETag лент и страницы поста меняется вместе с содержимым"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def urls(self):
+        return {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group', args=(self.group.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+            'post': reverse('posts:post_detail', args=(self.post.pk,)),
+        }
+
+    def etags(self, client=None):
+        client = client or self.client
+        return {name: client.get(url)['ETag']
+                for name, url in self.urls().items()}
+
+    def assertChanged(self, before, *names, client=None):
+        after = self.etags(client)
+        for name in before:
+            with self.subTest(page=name):
+                if name in names:
+                    self.assertNotEqual(before[name], after[name])
+                else:
+                    self.assertEqual(before[name], after[name])
+
+    def test_repeat_request_is_not_modified(self):
+        """Запрос с прежним ETag получает 304 без запросов к базе"""
+        for name, url in self.urls().items():
+            with self.subTest(page=name):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_etags_differ_between_pages_and_sessions(self):
+        """ETag зависит от адреса с параметрами и от сессии"""
+        etags = self.etags()
+        self.assertEqual(len(set(etags.values())), len(etags))
+        index = self.client.get(self.urls()['index'], {'page': 2})['ETag']
+        self.assertNotEqual(index, etags['index'])
+        reader = Client()
+        reader.force_login(self.reader)
+        self.assertNotEqual(self.etags(reader)['index'], etags['index'])
+
+    def test_new_post_changes_its_pages_only(self):
+        """Новый пост меняет ленты, где он виден, и счётчик автора"""
+        before = self.etags()
+        with run_on_commit():
+            Post.objects.create(author=self.author, group=self.other_group,
+                                text='Новый пост')
+        self.assertChanged(before, 'index', 'profile', 'post')
+
+    def test_edit_changes_feeds_and_post(self):
+        """Правка текста меняет все страницы поста"""
+        before = self.etags()
+        self.post.text = 'Исправленный пост'
+        with run_on_commit():
+            self.post.save()
+        self.assertChanged(before, 'index', 'group', 'profile', 'post')
+
+    def test_group_rename_changes_pages_with_group(self):
+        """Новое название группы меняет все страницы с её постами"""
+        before = self.etags()
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        with run_on_commit():
+            group.save()
+        self.assertChanged(before, 'index', 'group', 'profile', 'post')
+        response = self.client.get(self.urls()['post'])
+        self.assertContains(response, 'Новое название')
+
+    def test_comment_changes_post_page_only(self):
+        """Комментарий меняет только страницу поста"""
+        before = self.etags()
+        with run_on_commit():
+            Comment.objects.create(post=self.post, author=self.reader,
+                                   text='Комментарий')
+        self.assertChanged(before, 'post')
+
+    def test_follow_changes_profile_for_follower(self):
+        """Подписка меняет ETag профиля у подписчика"""
+        reader = Client()
+        reader.force_login(self.reader)
+        before = self.etags(reader)
+        with run_on_commit():
+            Follow.objects.create(user=self.reader, author=self.author)
+        self.assertChanged(before, 'profile', client=reader)
+
+    def test_missing_pages_are_not_found(self):
+        """Несуществующие группа, профиль и пост отдают 404"""
+        for url in (reverse('posts:group', args=('missing',)),
+                    reverse('posts:profile', args=('missing',)),
+                    reverse('posts:post_detail', args=(10 ** 6,))):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorCounter, Comment, Group, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def assertCounters(self, author, group, other_group):
+        self.assertEqual(
+            AuthorCounter.objects.get(author=self.user).posts_count, author
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, group)
+        self.assertEqual(self.other_group.posts_count, other_group)
+
+    def test_post_counters_follow_create_edit_delete(self):
+        """Счётчики постов меняются при создании, переносе и удалении"""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   group=self.group)
+        self.assertCounters(1, 1, 0)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'Пост', 'group': self.other_group.pk}
+        )
+        self.assertCounters(1, 0, 1)
+        post.refresh_from_db()
+        post.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_group_activity_follows_posts(self):
+        """Время последнего поста группы следует за постами"""
+        first = Post.objects.create(author=self.user, text='Первый',
+                                    group=self.group)
+        second = Post.objects.create(author=self.user, text='Второй',
+                                     group=self.group)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.last_post_at, second.pub_date)
+        second.group = self.other_group
+        second.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.last_post_at, first.pub_date)
+        self.assertEqual(self.other_group.last_post_at, second.pub_date)
+        first.delete()
+        self.group.refresh_from_db()
+        self.assertIsNone(self.group.last_post_at)
+
+    def test_comments_count(self):
+        """Счётчик комментариев поста меняется вместе с комментариями"""
+        post = Post.objects.create(author=self.user, text='Пост')
+        comment = Comment.objects.create(post=post, author=self.user,
+                                         text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """recount исправляет счётчики после bulk_create"""
+        posts = Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}', group=self.group)
+            for i in range(3)
+        )
+        post = Post.objects.filter(text='Пост 0').get()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.user, text='Комментарий')
+            for _ in range(2)
+        )
+        call_command('recount', stdout=StringIO())
+        self.assertCounters(len(posts), len(posts), 0)
+        self.assertEqual(self.group.last_post_at,
+                         Post.objects.latest('pub_date').pub_date)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core import pubsub
+from core.asgi import ENVIRON_KEY, ASGIHandler
+
+from .. import events
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+def parse(chunk):
+    """Поля события SSE словарём."""
+    return dict(line.split(': ', 1)
+                for line in chunk.decode().strip().split('\n'))
+
+
+class NewPostsTest(TestCase):
+    """Счётчик новых постов считает только посты подписок"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.seen = Post.objects.create(author=cls.author, text='Старый')
+        cls.new = Post.objects.create(author=cls.author, text='Новый')
+        Post.objects.create(author=cls.stranger, text='Чужой')
+
+    def test_counts_posts_after_page(self):
+        """При подключении учтены посты подписок новее страницы"""
+        new_posts = events.NewPosts(self.reader.pk, self.seen.pk)
+        self.assertEqual(new_posts.count, 1)
+        self.assertEqual(new_posts.channels,
+                         {f'author:{self.author.pk}',
+                          f'follows:{self.reader.pk}'})
+        head = new_posts.head().split(b'\n\n')
+        self.assertEqual(head[0], b'retry: %d' % events.RETRY_MS)
+        self.assertEqual(json.loads(parse(head[1])['data']),
+                         {'count': 1, 'post': self.new.pk})
+
+    def test_update(self):
+        """Каждое сообщение о новом посте прибавляет единицу"""
+        new_posts = events.NewPosts(self.reader.pk, self.new.pk)
+        self.assertEqual(new_posts.head(), b'retry: %d\n\n' % events.RETRY_MS)
+        self.assertIsNone(new_posts.update({'post': self.seen.pk}))
+        event = parse(new_posts.update({'post': self.new.pk + 5}))
+        self.assertEqual(event['event'], 'posts')
+        self.assertEqual(event['id'], str(self.new.pk + 5))
+        self.assertEqual(json.loads(event['data'])['count'], 1)
+
+    def test_no_stream_under_wsgi(self):
+        """Под WSGI поток не держит воркер: ответ 204 без переподключений"""
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_events'),
+                              {'after': self.new.pk})
+        self.assertEqual(response.status_code, 204)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertNotIn('events_after', response.context)
+        self.assertNotContains(response, 'js-new-posts')
+
+    def test_banner_on_first_page(self):
+        """Под ASGI первая страница ленты подключает поток после поста"""
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'),
+                              **{ENVIRON_KEY: True})
+        self.assertEqual(response.context['events_after'], self.new.pk)
+        self.assertContains(response, f'?after={self.new.pk}')
+
+
+class PublishTest(TransactionTestCase):
+    """Сигналы публикуют посты и смену подписок после коммита"""
+
+    def test_publish_after_commit(self):
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        channels = {events.author_channel(author.pk),
+                    events.follows_channel(reader.pk)}
+        with pubsub.get_broker().subscribe(channels) as subscription:
+            Follow.objects.create(user=reader, author=author)
+            post = Post.objects.create(author=author, text='Текст')
+            self.assertEqual(subscription.get(1),
+                             (f'follows:{reader.pk}', {'user': reader.pk}))
+            self.assertEqual(subscription.get(1),
+                             (f'author:{author.pk}',
+                              {'post': post.pk, 'author': author.pk}))
+
+
+class FollowEventsTest(TransactionTestCase):
+    """Под ASGI поток событий обслуживает корутина, а не поток пула"""
+
+    def stream(self, cookie, on_body):
+        """Сообщения ответа; `on_body(sent)` решает, закрыть ли поток."""
+        sent, closed = [], asyncio.Event()
+
+        async def receive():
+            if not sent:
+                return {'type': 'http.request', 'body': b''}
+            await closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if message.get('body') and on_body(sent):
+                closed.set()
+
+        scope = {'type': 'http', 'method': 'GET',
+                 'path': reverse('posts:follow_events'), 'query_string': b'',
+                 'headers': [(b'cookie', cookie.encode())]}
+        asyncio.run(asyncio.wait_for(
+            ASGIHandler(max_threads=1)(scope, receive, send), 5
+        ))
+        return sent
+
+    def test_anonymous_forbidden(self):
+        sent = self.stream('', lambda sent: True)
+        self.assertEqual(sent[0]['status'], 403)
+
+    def test_new_post_event(self):
+        """Публикация поста подписки доходит до открытого потока"""
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=reader, author=author)
+        client = Client()
+        client.force_login(reader)
+        cookie = (f'{settings.SESSION_COOKIE_NAME}='
+                  f'{client.cookies[settings.SESSION_COOKIE_NAME].value}')
+
+        def on_body(sent):
+            if len(sent) == 2:
+                events.publish_post(Post(pk=1, author=author))
+                return False
+            return True
+
+        sent = self.stream(cookie, on_body)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'),
+                      sent[0]['headers'])
+        event = parse(sent[2]['body'])
+        self.assertEqual(json.loads(event['data']), {'count': 1, 'post': 1})
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import run_on_commit
+
+from ..groups import LRUCache, get_group_or_404, groups
+from ..models import Group
+
+
+class GroupLookupTest(TestCase):
+    """Поиск групп по slug через кэш процесса"""
+
+    def setUp(self):
+        cache.clear()
+        groups.clear()
+        self.group = Group.objects.create(title='Котики', slug='cats',
+                                          description='Про котиков')
+
+    def test_second_lookup_skips_database(self):
+        """Повторный поиск отдаёт группу без запросов"""
+        get_group_or_404('cats')
+        with self.assertNumQueries(0):
+            group = get_group_or_404('cats')
+            self.assertEqual(group, self.group)
+            self.assertEqual(group.title, 'Котики')
+
+    def test_counters_are_read_fresh(self):
+        """Счётчик постов не берётся из кэша процесса"""
+        get_group_or_404('cats')
+        Group.objects.filter(pk=self.group.pk).update(posts_count=7)
+        self.assertEqual(get_group_or_404('cats').posts_count, 7)
+
+    def test_save_invalidates_other_workers(self):
+        """Сохранение группы меняет общую версию и сбрасывает кэш"""
+        get_group_or_404('cats')
+        self.group.title = 'Кошки'
+        with run_on_commit():
+            self.group.save()
+        self.assertEqual(get_group_or_404('cats').title, 'Кошки')
+        with run_on_commit():
+            self.group.delete()
+        with self.assertRaises(Http404):
+            get_group_or_404('cats')
+
+    def test_page_counts_with_equal_versions(self):
+        """Счётчики постов разных групп на страницах не смешиваются"""
+        other = Group.objects.create(title='Собаки', slug='dogs')
+        Group.objects.filter(pk=other.pk).update(posts_count=5)
+        for group in (self.group, other):
+            cache.set(f'version:group:{group.pk}', 1000, None)
+        self.assertContains(self.client.get(reverse('posts:group',
+                                                    args=['dogs'])),
+                            'Всего постов: 5')
+        self.assertContains(self.client.get(reverse('posts:group',
+                                                    args=['cats'])),
+                            'Всего постов: 0')
+
+    def test_lru_evicts_oldest(self):
+        """LRU вытесняет запись, к которой дольше всего не обращались"""
+        lru = LRUCache(max_size=2)
+        lru.get('a', 1)
+        lru.set('a', 'A', 1)
+        lru.set('b', 'B', 1)
+        lru.get('a', 1)
+        lru.set('c', 'C', 1)
+        self.assertEqual(lru.get('a', 1), 'A')
+        self.assertIsNone(lru.get('b', 1))
+        self.assertIsNone(lru.get('a', 2))
+
+
+class GroupIndexTest(TestCase):
+    """Каталог групп"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lists_groups_with_counters(self):
+        """Каталог показывает группы с числом постов и обновляется"""
+        Group.objects.create(title='Котики', slug='cats')
+        response = self.client.get(reverse('posts:group_index'))
+        self.assertTemplateUsed(response, 'posts/groups.html')
+        self.assertEqual([group.slug for group in response.context[
+            'page_obj']], ['cats'])
+        with run_on_commit():
+            Group.objects.create(title='Собаки', slug='dogs')
+        response = self.client.get(reverse('posts:group_index'))
+        self.assertContains(response, reverse('posts:group', args=('dogs',)))
+
+    def test_header_not_shared_by_users(self):
+        """Кэшируется список групп, а не страница с шапкой пользователя"""
+        Group.objects.create(title='Котики', slug='cats')
+        user = get_user_model().objects.create_user(username='reader')
+        self.client.force_login(user)
+        self.client.get(reverse('posts:group_index'))
+        response = Client().get(reverse('posts:group_index'))
+        self.assertNotContains(response, 'Пользователь: reader')
+        self.assertContains(response, reverse('posts:group', args=('cats',)))
@@ -0,0 +1,44 @@
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from .. import loadtest
+
+
+class SummaryTest(SimpleTestCase):
+
+    def test_percentiles_and_errors(self):
+        """Перцентили по ближайшему рангу, ошибки и RPS по маршрутам"""
+        samples = [('posts:index', number / 1000, number != 100)
+                   for number in range(1, 101)]
+        samples.append(('posts:group', 0.5, True))
+        report = loadtest.summarize(samples, seconds=10)
+        index = report['posts:index']
+        self.assertEqual(index['requests'], 100)
+        self.assertEqual(index['errors'], 1)
+        self.assertEqual(index['rps'], 10)
+        self.assertEqual(
+            (index['p50_ms'], index['p95_ms'], index['p99_ms']),
+            (50, 95, 99)
+        )
+        self.assertEqual(report['total']['requests'], 101)
+        self.assertEqual(report['posts:group']['p99_ms'], 500)
+
+    def test_parse_mix(self):
+        """Веса действий разбираются из строки, неизвестные отклоняются"""
+        self.assertEqual(loadtest.parse_mix('index=3,post=1'),
+                         {'index': 3, 'post': 1})
+        self.assertEqual(loadtest.parse_mix(''), {})
+        with self.assertRaises(loadtest.LoadTestError):
+            loadtest.parse_mix('unknown=1')
+
+
+class LoadTestRunTest(LiveServerTestCase):
+
+    def test_run_against_live_server(self):
+        """Короткий прогон всех действий проходит без ошибок"""
+        loadtest.seed(users=3, groups=2, posts=30, comments=30, follows=2)
+        report = loadtest.run(self.live_server_url, concurrency=1,
+                              duration=1)
+        routes = report['routes']
+        self.assertGreater(routes['total']['requests'], 0)
+        self.assertEqual(routes['total']['errors'], 0, routes)
+        self.assertIn('posts:index', routes)
@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.conf import settings
-from ..models import Group, Post
+from ..models import PREVIEW_LENGTH, Group, Post
 
 User = get_user_model()
 
@@ -35,3 +35,39 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     str(field), expected_value)
+
+
+class PostQuerySetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='Слово ' * PREVIEW_LENGTH)
+
+    def test_for_feed_reads_only_text_start(self):
+        """Лента не читает полный текст, автор и группа уже загружены"""
+        with self.assertNumQueries(1):
+            post = Post.objects.for_feed().get(pk=self.post.pk)
+            self.assertEqual(post.author.username, 'auth')
+            self.assertEqual(post.group.slug, 'group')
+            preview = post.preview
+        self.assertIn('text', post.get_deferred_fields())
+        self.assertEqual(len(preview), PREVIEW_LENGTH)
+        self.assertTrue(preview.endswith('…'))
+        self.assertTrue(self.post.text.startswith(preview[:-1]))
+
+    def test_preview_of_short_text(self):
+        """Короткий текст показывается целиком"""
+        post = Post.objects.create(author=self.user, text='Коротко')
+        self.assertEqual(Post.objects.for_feed().get(pk=post.pk).preview,
+                         'Коротко')
+        self.assertEqual(post.preview, 'Коротко')
+
+    def test_for_detail_loads_author_counter(self):
+        """Пост для страницы загружается со счётчиком автора и группой"""
+        with self.assertNumQueries(1):
+            post = Post.objects.for_detail().get(pk=self.post.pk)
+            self.assertEqual(post.author.post_counter.posts_count, 1)
+            self.assertEqual(post.group.slug, 'group')
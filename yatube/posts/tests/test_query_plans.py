@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import QueryPlanMixin, explain, plan_problems
+
+from .. import timeline
+from ..models import Comment, Follow, Group, Post
+from ..utils import (COMMENTS_PER_PAGE, NUMBER_OF_OBJECTS,
+                     get_comments_page)
+
+User = get_user_model()
+
+
+class QueryPlanTest(QueryPlanMixin, TestCase):
+    """Ленты фильтруют и сортируют посты по индексам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {number}')
+            for number in range(25)
+        )
+        timeline.rebuild()
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Пост с комментариями')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.reader, text='Комментарий')
+            for _ in range(COMMENTS_PER_PAGE + 5)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feeds_use_indexes(self):
+        """В планах лент нет полного просмотра таблиц и сортировок"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:follow_index'),
+            reverse('posts:post_comments', args=(self.post.pk,)),
+        ]
+        page = get_comments_page(self.post.pk)
+        urls.append(reverse('posts:post_comments', args=(self.post.pk,))
+                    + f'?cursor={page.next_cursor}')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIndexedPlans(self.client, url)
+
+    @override_settings(CURSOR_PAGINATION=True)
+    def test_cursor_feeds_use_indexes(self):
+        """С keyset-пагинацией первая и следующая страницы идут по индексам"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.assertIndexedPlans(self.client, url)
+                page = response.context['page_obj']
+                self.assertEqual(len(page), NUMBER_OF_OBJECTS)
+                self.assertIndexedPlans(
+                    self.client, f'{url}?cursor={page.next_cursor}'
+                )
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_feed_with_popular_authors_uses_indexes(self):
+        """Лента с постами популярного автора идёт по индексам"""
+        popular = User.objects.create_user(username='popular')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.bulk_create([Follow(user=self.reader, author=popular),
+                                    Follow(user=fan, author=popular)])
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}')
+            for author in (self.author, popular) for number in range(200)
+        )
+        timeline.rebuild()
+        self.assertEqual(timeline.popular_author_ids(), {popular.pk})
+        if connection.vendor == 'sqlite':
+            # Без статистики SQLite на маленьких таблицах сортирует
+            # найденные по спискам посты, а не идёт по индексу даты.
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE posts_post')
+                cursor.execute('ANALYZE posts_timeline')
+        url = reverse('posts:follow_index')
+        self.assertIndexedPlans(self.client, url)
+        self.assertIndexedPlans(self.client, url + '?page=2')
+        with self.settings(CURSOR_PAGINATION=True):
+            response = self.assertIndexedPlans(self.client, url)
+            page = response.context['page_obj']
+            self.assertEqual(len(page), NUMBER_OF_OBJECTS)
+            self.assertIndexedPlans(
+                self.client, f'{url}?cursor={page.next_cursor}'
+            )
+
+    def test_plan_without_index_is_reported(self):
+        """Сортировка по полю без индекса попадает в список проблем"""
+        sql = str(Post.objects.order_by('text').values('pk').query)
+        self.assertTrue(plan_problems(explain(sql), connection.vendor))
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..admin import PostAdmin
+from ..models import Post
+from ..search import SearchResults, get_backend
+from ..stemmer import stem, tokenize
+
+User = get_user_model()
+
+
+class StemmerTest(SimpleTestCase):
+
+    def test_word_forms_share_stem(self):
+        """Разные формы слова сводятся к одной основе"""
+        self.assertEqual(stem('постами'), stem('постов'))
+        self.assertEqual(stem('пост'), stem('постов'))
+        self.assertEqual(stem('красивая'), stem('красивейший'))
+        self.assertEqual(stem('Котёнок'), 'котенок')
+
+    def test_tokenize_skips_stop_words(self):
+        """Служебные слова не попадают в индекс"""
+        self.assertEqual(tokenize('Прогулка в парке и Django'),
+                         ['прогулк', 'парк', 'django'])
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.cats = Post.objects.create(
+            author=cls.author, text='Котики и котики, снова котики')
+        cls.walk = Post.objects.create(
+            author=cls.author, text='Прогулка с котиком в парке')
+        cls.other = Post.objects.create(
+            author=cls.author, text='Совсем другая история')
+
+    def search(self, query):
+        return list(SearchResults(query))
+
+    def test_morphology_and_ranking(self):
+        """Находятся формы слова, более релевантный пост выше"""
+        self.assertEqual(self.search('котик'), [self.cats, self.walk])
+        self.assertEqual(self.search('прогулки парк'), [self.walk])
+        self.assertEqual(self.search('в и на'), [])
+
+    def test_index_follows_edits(self):
+        """Изменение и удаление поста обновляют индекс"""
+        self.other.text = 'История про котов'
+        self.other.save()
+        self.assertIn(self.other, self.search('коты'))
+        self.other.delete()
+        self.assertNotIn(self.other, self.search('коты'))
+        self.assertEqual(SearchResults('история').count(), 0)
+
+    def test_search_view_paginates(self):
+        """Страница поиска листается и сохраняет запрос в ссылках"""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Котики номер {number}')
+            for number in range(12)
+        )
+        get_backend().rebuild()
+        response = Client().get(reverse('posts:search'), {'q': 'котики'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 14)
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA'
+                                      '%D0%B8&amp;page=2')
+        response = Client().get(reverse('posts:search'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт через тот же индекс"""
+        admin = PostAdmin(Post, None)
+        queryset, distinct = admin.get_search_results(
+            None, Post.objects.all(), 'парков')
+        self.assertEqual(list(queryset), [self.walk])
+        self.assertFalse(distinct)
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from core.models import Task
+from core.tasks import process_pending
+
+from .. import search
+from ..models import Comment, Follow, Post, Timeline
+
+User = get_user_model()
+
+
+@override_settings(TASKS_EAGER=False)
+class PostTasksTest(TestCase):
+    """Лента, поиск и письма обновляются задачами очереди"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author',
+                                              email='author@yatube.ru')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def found(self, query):
+        return search.get_backend().count(query)
+
+    def test_new_post_waits_for_worker(self):
+        """До воркера пост не в ленте и не в поиске, после — на месте"""
+        post = Post.objects.create(author=self.author, text='Котики гуляют')
+        self.assertEqual(sorted(Task.objects.values_list('name', flat=True)),
+                         ['posts.fan_out', 'posts.index'])
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(self.found('котики'), 0)
+        self.assertEqual(process_pending(), (2, 0))
+        self.assertTrue(Timeline.objects.filter(user=self.reader,
+                                                post=post).exists())
+        self.assertEqual(self.found('котики'), 1)
+
+    def test_edits_and_delete_reindex_once(self):
+        """Правки подряд — одна переиндексация; удаление убирает пост"""
+        post = Post.objects.create(author=self.author, text='Котики')
+        for text in ('Собаки', 'Попугаи'):
+            post.text = text
+            post.save()
+        self.assertEqual(Task.objects.filter(name='posts.index').count(), 1)
+        process_pending()
+        self.assertEqual(self.found('попугаи'), 1)
+        self.assertEqual(self.found('котики'), 0)
+        post.delete()
+        process_pending()
+        self.assertEqual(self.found('попугаи'), 0)
+
+    def test_comment_notifies_author(self):
+        """Автор поста получает письмо о чужом комментарии"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.author, text='Свой')
+        Comment.objects.create(post=post, author=self.reader,
+                               text='Отличный пост')
+        process_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['author@yatube.ru'])
+        self.assertEqual(mail.outbox[0].subject,
+                         'reader прокомментировал ваш пост')
+        self.assertIn('Отличный пост', mail.outbox[0].body)
+        self.assertIn(f'/posts/{post.pk}/', mail.outbox[0].body)
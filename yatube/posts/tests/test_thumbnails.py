@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Task
+
+from ..models import Post
+from ..thumbnails import TASK, thumbnail_file
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+GEOMETRY = '960x339'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, TASKS_EAGER=False)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def detail_image(self, post):
+        response = Client().get(reverse('posts:post_detail', args=[post.pk]))
+        return response.content.decode()
+
+    def run_tasks(self):
+        call_command('run_tasks', threads=1, stdout=open(os.devnull, 'w'))
+
+    def test_worker_pregenerates_thumbnails(self):
+        """Воркер режет миниатюры, страница поста переключается на них"""
+        post = Post.objects.create(
+            author=self.author, text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        post.save()
+        self.assertEqual(Task.objects.get(name=TASK).key, f'{TASK}:{post.pk}')
+        self.assertIn(post.image.url, self.detail_image(post))
+
+        self.run_tasks()
+        post.refresh_from_db()
+        self.assertFalse(Task.objects.filter(name=TASK).exists())
+        self.assertEqual(post.thumbnail_source, post.image.name)
+        thumbnail = thumbnail_file(post.image.name, GEOMETRY,
+                                   settings.THUMBNAIL_GEOMETRIES[GEOMETRY])
+        self.assertTrue(thumbnail.exists())
+        self.assertIn(thumbnail.url, self.detail_image(post))
+
+        post.text = 'Картинка та же'
+        post.save()
+        self.assertFalse(Task.objects.filter(name=TASK).exists())
+
+    def test_missing_source_is_retried(self):
+        """Задача с отсутствующим файлом повторяется позже с ошибкой"""
+        post = Post.objects.create(author=self.author, text='Без файла',
+                                   image='posts/missing.gif')
+        with self.assertLogs('sorl.thumbnail', 'ERROR'):
+            self.run_tasks()
+        task = Task.objects.get(name=TASK)
+        self.assertEqual(task.attempts, 1)
+        self.assertIn('ThumbnailError', task.error)
+        self.assertGreater(task.available_at, task.created)
+        self.assertIn(post.image.url, self.detail_image(post))
+
+    def test_backfill(self):
+        """Команда ставит задачи для картинок без миниатюр"""
+        post = Post.objects.create(author=self.author, text='Без файла',
+                                   image='posts/missing.gif')
+        Task.objects.all().delete()
+        Post.objects.create(author=self.author, text='Без картинки')
+        call_command('generate_thumbnails', stdout=open(os.devnull, 'w'))
+        self.assertEqual(
+            list(Task.objects.filter(name=TASK).values_list('key', flat=True)),
+            [f'{TASK}:{post.pk}']
+        )
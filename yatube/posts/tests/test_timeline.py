@@ -0,0 +1,79 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, Timeline
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка дописывает старые посты, отписка их убирает"""
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), [post])
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': self.author}))
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост автора попадает в ленту подписчика"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.feed(), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_author_read_on_fan_out(self):
+        """Посты популярного автора подмешиваются при чтении"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Популярный')
+        self.assertFalse(Timeline.objects.exists())
+        self.assertEqual(self.feed(), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_below_limit_is_materialized(self):
+        """Посты, опубликованные у популярного автора, остаются в ленте"""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Популярный')
+        self.assertFalse(Timeline.objects.exists())
+        Follow.objects.filter(user=other).delete()
+        self.assertTrue(Timeline.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertNotIn(self.author.pk, timeline.popular_author_ids())
+        self.assertEqual(self.feed(), [post])
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}') for i in range(3)
+        )
+        self.assertEqual(len(timeline.feed(self.reader)), 0)
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(len(timeline.feed(self.reader)), 3)
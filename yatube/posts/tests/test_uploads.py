@@ -0,0 +1,146 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import files
+from core.models import StoredFile
+
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class StreamingUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def upload(self, name='small.gif', url=None):
+        image = SimpleUploadedFile(name, SMALL_GIF, 'image/gif')
+        return self.client.post(url or reverse('posts:post_create'),
+                                {'text': 'С картинкой', 'image': image})
+
+    def stored_files(self):
+        return sorted(os.listdir(os.path.join(TEMP_MEDIA_ROOT, 'posts')))
+
+    def test_upload_is_named_by_content(self):
+        """Картинка сохраняется под хэшем содержимого без копий"""
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        self.upload()
+        self.upload('another_name.gif')
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(names, {f'posts/{digest}.gif'})
+        self.assertEqual(self.stored_files(), [f'{digest}.gif'])
+        path = os.path.join(TEMP_MEDIA_ROOT, 'posts', f'{digest}.gif')
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+
+    def test_edit_accepts_image(self):
+        """Картинку можно добавить при редактировании поста"""
+        post = Post.objects.create(author=self.user, text='Без картинки')
+        self.upload(url=reverse('posts:post_edit', args=[post.pk]))
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.startswith('posts/'))
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIDE=1)
+    def test_dimensions_checked_by_header(self):
+        """Слишком большая по сторонам картинка отклоняется"""
+        response = self.upload()
+        self.assertFormError(response, 'form', 'image',
+                             'Сторона изображения больше 1 пикселей.')
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=16)
+    def test_size_limit(self):
+        """Файл больше лимита отклоняется"""
+        response = self.upload()
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageReferenceTest(TransactionTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+
+    def create(self, content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user, text='Мем',
+            image=SimpleUploadedFile('meme.gif', content, 'image/gif')
+        )
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл живёт, пока на него ссылается хотя бы один пост"""
+        first, second = self.create(), self.create()
+        name = first.image.name
+        path = first.image.path
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 2)
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.image = SimpleUploadedFile('new.gif', SMALL_GIF + b'!',
+                                          'image/gif')
+        second.save()
+        self.assertEqual(StoredFile.objects.get(name=name).refcount, 0)
+        self.assertEqual(files.sweep(), 0)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(files.sweep(min_age=0), 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertEqual(
+            StoredFile.objects.get(name=second.image.name).refcount, 1)
+
+    def test_reupload_survives_sweep(self):
+        """Повторная загрузка файла без ссылок спасает его от сборки"""
+        post = self.create()
+        path = post.image.path
+        post.delete()
+        os.utime(path, (0, 0))
+        again = self.create()
+        self.assertEqual(again.image.path, path)
+        self.assertGreater(os.path.getmtime(path), 0)
+        with override_settings(FILES_ORPHAN_MIN_AGE=60):
+            self.assertEqual(files.sweep(), 0)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(StoredFile.objects.get(name=again.image.name)
+                         .refcount, 1)
+
+    def test_foreign_names_untouched(self):
+        """Файлы, созданные не хранилищем, не учитываются"""
+        post = Post.objects.create(author=self.user, text='Старый',
+                                   image='posts/legacy.gif')
+        post.delete()
+        self.assertFalse(StoredFile.objects.exists())
@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from ..utils import CursorPage, CursorPaginator, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {i}', author=cls.user, group=cls.group)
+            for i in range(25)
+        )
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_cursor_round_trip(self):
+        """Токен курсора кодируется и раскодируется без потерь"""
+        fields = [Post._meta.get_field('pub_date'), Post._meta.pk]
+        token = encode_cursor('next', ['2023-01-01 00:00:00+00:00', '5'])
+        self.assertEqual(
+            decode_cursor(token, fields),
+            ('next', [datetime(2023, 1, 1, tzinfo=timezone.utc), 5])
+        )
+        self.assertIsNone(decode_cursor('испорчен', fields))
+
+    def test_malformed_cursor_serves_first_page(self):
+        """Ключ не тех типов в токене даёт первую страницу, а не ошибку"""
+        post = self.expected[0]
+        Comment.objects.create(post=post, author=self.user, text='Первый')
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:follow_index'),
+            reverse('posts:post_comments', args=(post.pk,)),
+            reverse('api:posts'),
+            reverse('api:comments', args=(post.pk,)),
+            reverse('api:follow_feed'),
+        )
+        keys = (
+            ['garbage', '1'],
+            ['2023-01-01 00:00:00+00:00', 'abc'],
+            [None, None],
+            [[1], {}],
+            ['2023-01-01 00:00:00+00:00', str(2 ** 70)],
+        )
+        self.client.force_login(self.user)
+        with override_settings(CURSOR_PAGINATION=True):
+            for url in urls:
+                first = self.client.get(url).content
+                for key in keys:
+                    with self.subTest(url=url, key=key):
+                        cache.clear()
+                        response = self.client.get(
+                            url, {'cursor': encode_cursor('next', key)}
+                        )
+                        self.assertEqual(response.status_code, 200)
+                        self.assertEqual(response.content, first)
+
+    def test_pages_cover_feed_forward_and_back(self):
+        """Листание вперёд и назад возвращает те же записи без пропусков"""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(
+            [post for page in pages for post in page], self.expected
+        )
+        self.assertFalse(pages[0].has_previous())
+        back = paginator.get_page(pages[2].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        self.assertTrue(back.has_next())
+
+    def test_views_use_cursor_page(self):
+        """С CURSOR_PAGINATION ленты отдают CursorPage"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        with override_settings(CURSOR_PAGINATION=True):
+            for url in urls:
+                with self.subTest(url=url):
+                    cache.clear()
+                    response = self.client.get(url)
+                    page_obj = response.context['page_obj']
+                    self.assertIsInstance(page_obj, CursorPage)
+                    self.assertEqual(list(page_obj), self.expected[:10])
+                    response = self.client.get(
+                        url, {'cursor': page_obj.next_cursor}
+                    )
+                    self.assertEqual(list(response.context['page_obj']),
+                                     self.expected[10:20])
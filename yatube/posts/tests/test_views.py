@@ -1,13 +1,20 @@
 import tempfile
 import shutil
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection, transaction
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from posts.models import Group, Post, User, Comment, Follow
 from posts.forms import PostForm
+from posts.cache import version_tag
+from posts import utils
+from core.testing import run_on_commit
 
 
 User = get_user_model()
@@ -68,20 +75,106 @@ class PostPagesTests(TestCase):
                 self.assertTemplateUsed(response, template)
 
     def test_cache_context(self):
-        '''Проверка кэширования страницы index'''
+        '''Кэш index сбрасывается при изменении постов'''
         before_create_post = self.authorized_client.get(
             reverse('posts:index'))
-        first_item_before = before_create_post.content
-        Post.objects.create(
-            author=self.user,
-            text='Проверка кэша',
-            group=self.group)
+        # Посты берутся из фрагмента; из базы читаются только сессия,
+        # пользователь и число постов для пагинатора.
+        with self.assertNumQueries(3):
+            cached = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(cached.content, before_create_post.content)
+        with run_on_commit():
+            Post.objects.create(
+                author=self.user,
+                text='Проверка кэша',
+                group=self.group)
         after_create_post = self.authorized_client.get(reverse('posts:index'))
-        first_item_after = after_create_post.content
-        self.assertEqual(first_item_after, first_item_before)
-        cache.clear()
-        after_clear = self.authorized_client.get(reverse('posts:index'))
-        self.assertNotEqual(first_item_after, after_clear)
+        self.assertNotEqual(after_create_post.content,
+                            before_create_post.content)
+        self.assertContains(after_create_post, 'Проверка кэша')
+
+    def test_versions_bumped_after_commit(self):
+        '''Версии кэша меняются после коммита, а не внутри транзакции'''
+        before = version_tag('index')
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Post.objects.create(author=self.user, text='Откат')
+                raise RuntimeError
+        with run_on_commit():
+            Post.objects.create(author=self.user, text='Коммит')
+            self.assertEqual(version_tag('index'), before)
+        self.assertNotEqual(version_tag('index'), before)
+
+    def test_index_fragment_shared_by_users(self):
+        '''Гость и пользователь получают один фрагмент ленты'''
+        self.client.get(reverse('posts:index'))
+        key = make_template_fragment_key(
+            'index_feed', [version_tag('index'), reverse('posts:index')])
+        self.assertIsNotNone(cache.get(key))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIn(cache.get(key), response.content.decode())
+
+    def test_index_header_not_shared_by_users(self):
+        '''Шапка главной страницы не достаётся из кэша другому пользователю'''
+        self.authorized_client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, f'Пользователь: {self.user.username}')
+        self.assertContains(response, reverse('users:login'))
+
+    def test_group_rename_invalidates_profile(self):
+        '''Новый slug группы сразу виден в закэшированной ленте профиля'''
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        before = self.client.get(url)
+        self.assertContains(before, reverse('posts:group',
+                                            args=(self.group.slug,)))
+        group = Group.objects.get(pk=self.group.pk)
+        with run_on_commit():
+            group.slug = 'renamed'
+            group.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('posts:group',
+                                              args=('renamed',)))
+
+    def test_comment_invalidates_post_fragment(self):
+        '''Новый комментарий сразу виден на закэшированной странице'''
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        with run_on_commit():
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text='Свежий комментарий')
+        self.assertContains(self.client.get(url), 'Свежий комментарий')
+
+    def test_comment_fragments_of_posts_with_equal_versions(self):
+        '''Фрагменты комментариев разных постов не смешиваются'''
+        other = Post.objects.create(author=self.user, text='Другой пост')
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий первого')
+        Comment.objects.create(post=other, author=self.user,
+                               text='Комментарий второго')
+        for post in (self.post, other):
+            cache.set(f'version:post:{post.pk}', 1000, None)
+        first = reverse('posts:post_detail', kwargs={'post_id': other.pk})
+        second = reverse('posts:post_detail',
+                         kwargs={'post_id': self.post.pk})
+        self.assertContains(self.client.get(first), 'Комментарий второго')
+        response = self.client.get(second)
+        self.assertContains(response, 'Комментарий первого')
+        self.assertNotContains(response, 'Комментарий второго')
+
+    def test_profile_counts_with_equal_versions(self):
+        '''Счётчики постов разных авторов не смешиваются'''
+        other = User.objects.create_user(username='other')
+        for author in (self.user, other):
+            cache.set(f'version:profile:{author.pk}', 1000, None)
+        self.assertContains(
+            self.client.get(reverse('posts:profile', args=[other])),
+            'Всего постов: 0'
+        )
+        self.assertContains(
+            self.client.get(reverse('posts:profile', args=[self.user])),
+            'Всего постов: 1'
+        )
 
     def test_profile_page_show_correct_context(self):
         """Шаблон profile сформирован с правильным контекстом."""
@@ -152,6 +245,33 @@ class PostPagesTests(TestCase):
                     'Количество постов на первой странице не равно десяти'
                 )
 
+    def test_queries_do_not_depend_on_page_size(self):
+        """Число запросов ленты не зависит от размера страницы"""
+        author = User.objects.create_user(username='feed_author')
+        group = Group.objects.create(title='Лента', slug='feed',
+                                     description='Описание')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=author, group=group)
+            for i in range(12)
+        )
+        Follow.objects.create(user=self.user, author=author)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': group.slug}),
+            reverse('posts:profile', kwargs={'username': author.username}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            counts = []
+            for size in (2, 10):
+                cache.clear()
+                with mock.patch.object(utils, 'NUMBER_OF_OBJECTS', size), \
+                        CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(url)
+                counts.append(len(queries))
+            with self.subTest(url=url):
+                self.assertEqual(counts[0], counts[1])
+
 
 class CommentTest(TestCase):
     @classmethod
@@ -185,6 +305,56 @@ class CommentTest(TestCase):
             self.assertEqual(comments[value], expected)
             self.assertTrue(response.context['form'], 'форма получена')
 
+    def test_comments_are_paginated(self):
+        """Пост показывает первую страницу комментариев, остальные
+           подгружаются по токену до последнего"""
+        total = utils.COMMENTS_PER_PAGE * 2 + 3
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user2, text=f'Коммент {i}')
+            for i in range(total)
+        )
+        cache.clear()
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        page = response.context['comments']
+        self.assertEqual(len(page), utils.COMMENTS_PER_PAGE)
+        seen = [comment.pk for comment in page]
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        while page.has_next():
+            response = self.guest_client.get(url,
+                                             {'cursor': page.next_cursor})
+            self.assertTemplateUsed(response,
+                                    'posts/includes/comment_list.html')
+            page = response.context['comments']
+            seen += [comment.pk for comment in page]
+        expected = list(Comment.objects.filter(post=self.post)
+                        .order_by('-created', '-pk')
+                        .values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_post_detail_queries_do_not_depend_on_comments(self):
+        """Число запросов post_detail не зависит от числа комментариев"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        counts = []
+        for batch in (1, utils.COMMENTS_PER_PAGE * 3):
+            Comment.objects.bulk_create(
+                Comment(post=self.post, author=self.user2, text='Коммент')
+                for _ in range(batch)
+            )
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.guest_client.get(url)
+            counts.append(len(queries))
+            self.assertLessEqual(len(response.context['comments']),
+                                 utils.COMMENTS_PER_PAGE)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_comments_of_missing_post_are_not_found(self):
+        """Комментарии несуществующего поста отдают 404"""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6}))
+        self.assertEqual(response.status_code, 404)
+
 
 class FollowViewsTest(TestCase):
     @classmethod
@@ -0,0 +1,75 @@
+"""Предрасчёт миниатюр картинок постов вне запроса.
+
+При сохранении поста с новой картинкой ставится задача
+`posts.thumbnails` очереди core.tasks, одна на пост. Воркер `run_tasks`
+режет все размеры из `THUMBNAIL_GEOMETRIES` (для них подойдёт пул
+процессов, `--processes`) и отмечает в `Post.thumbnail_source`, для
+какой картинки миниатюры готовы. Задача читает картинку из базы, так
+что после нескольких правок поста режется только последняя.
+
+Шаблонный тег `post_thumbnail` по этому полю вычисляет адрес миниатюры
+без обращения к хранилищу и никогда не режет картинку сам: пока
+миниатюр нет, отдаётся исходник.
+"""
+from django.conf import settings
+from django.db.models import F
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import tasks
+
+from .models import Post
+
+TASK = 'posts.thumbnails'
+
+
+class ThumbnailError(Exception):
+    pass
+
+
+def thumbnail_file(name, geometry, options):
+    """Файл миниатюры, который создаст sorl, без чтения исходника.
+
+    Повторяет подготовку опций из `ThumbnailBackend.get_thumbnail`,
+    имя файла зависит только от имени исходника, размера и опций.
+    """
+    backend = default.backend
+    source = ImageFile(name)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, geometry, options),
+        default.storage
+    )
+
+
+def enqueue(post):
+    """Ставит задачу, если у картинки поста ещё нет миниатюр."""
+    if post.image and post.image.name != post.thumbnail_source:
+        tasks.enqueue(TASK, post.pk, key=f'{TASK}:{post.pk}')
+
+
+def render(name):
+    """Режет все размеры для картинки."""
+    for geometry, options in settings.THUMBNAIL_GEOMETRIES.items():
+        get_thumbnail(name, geometry, **options)
+        if not thumbnail_file(name, geometry, options).exists():
+            raise ThumbnailError(f'{geometry}: миниатюра не создана')
+
+
+def backfill():
+    """Ставит задачи для всех картинок, у которых нет миниатюр."""
+    posts = Post.objects.exclude(image='').exclude(
+        thumbnail_source=F('image')
+    )
+    for pk in posts.values_list('pk', flat=True).iterator():
+        tasks.enqueue(TASK, pk, key=f'{TASK}:{pk}')
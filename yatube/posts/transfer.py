@@ -0,0 +1,328 @@
+"""Выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Форматы: NDJSON (строка — объект с полем `kind`, в одном файле может
+быть всё) и CSV (один вид записей на файл, заголовок — имена полей).
+Авторы и группы записываются по `username` и `slug`; id постов и
+комментариев сохраняются, так что загружать нужно в пустую базу или
+в базу без пересечений по id.
+
+Выгрузка читает таблицы через `iterator()` и держит в памяти одну
+пачку. Загрузка пишет пачками через `bulk_create`, поэтому сигналы не
+срабатывают: счётчики, ленты, поисковый индекс, ссылки на картинки и
+очередь миниатюр пересчитываются один раз в конце, и кэш сбрасывается
+целиком. Без этого шага (`rebuild=False`) можно загрузить несколько
+файлов подряд и пересчитать всё после последнего. Картинки переносятся
+только по имени — файлы копируются отдельно.
+
+Записи проверяются до записи в базу: без обязательных полей из
+REQUIRED, с числом или датой не того вида, с комментарием к
+неизвестному посту загрузка останавливается с `TransferError` и
+номером строки. Повторы групп и подписок пропускаются.
+"""
+import csv
+import json
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import StoredFile
+from core.storage import is_content_addressed
+
+from . import counters, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+BATCH_SIZE = 1000
+KINDS = ('groups', 'posts', 'comments', 'follows')
+FIELDS = {
+    'groups': ('slug', 'title', 'description'),
+    'posts': ('id', 'author', 'group', 'pub_date', 'text', 'image'),
+    'comments': ('id', 'post', 'author', 'created', 'text'),
+    'follows': ('user', 'author'),
+}
+REQUIRED = {
+    'groups': ('slug', 'title'),
+    'posts': ('author', 'text'),
+    'comments': ('post', 'author', 'text'),
+    'follows': ('user', 'author'),
+}
+INTEGER_FIELDS = ('id', 'post')
+DATE_FIELDS = ('pub_date', 'created')
+MODELS = {'groups': Group, 'posts': Post, 'comments': Comment,
+          'follows': Follow}
+EXPORT_COLUMNS = {
+    'groups': ('slug', 'title', 'description'),
+    'posts': ('id', 'author__username', 'group__slug', 'pub_date', 'text',
+              'image'),
+    'comments': ('id', 'post_id', 'author__username', 'created', 'text'),
+    'follows': ('user__username', 'author__username'),
+}
+
+
+class TransferError(Exception):
+    pass
+
+
+def rows(kind, batch_size=BATCH_SIZE):
+    """Записи вида `kind` словарями с полями из FIELDS."""
+    queryset = MODELS[kind].objects.order_by('pk').values_list(
+        *EXPORT_COLUMNS[kind]
+    )
+    for values in queryset.iterator(chunk_size=batch_size):
+        row = dict(zip(FIELDS[kind], values))
+        for field in ('pub_date', 'created'):
+            if row.get(field) is not None:
+                row[field] = row[field].isoformat()
+        yield row
+
+
+def export(kinds, output, format='ndjson', batch_size=BATCH_SIZE):
+    """Пишет записи в поток; возвращает число записей по видам."""
+    if format == 'csv' and len(kinds) != 1:
+        raise TransferError('В CSV выгружается один вид записей на файл')
+    totals = Counter()
+    for kind in kinds:
+        if format == 'csv':
+            writer = csv.DictWriter(output, FIELDS[kind])
+            writer.writeheader()
+        for row in rows(kind, batch_size):
+            if format == 'csv':
+                writer.writerow(row)
+            else:
+                output.write(json.dumps({'kind': kind, **row},
+                                        ensure_ascii=False) + '\n')
+            totals[kind] += 1
+    return totals
+
+
+def read_ndjson(source):
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            raise TransferError(f'Строка {number}: {error}')
+        if not isinstance(row, dict):
+            raise TransferError(f'Строка {number}: ожидался объект')
+        kind = row.pop('kind', None)
+        if kind not in KINDS:
+            raise TransferError(f'Строка {number}: неизвестный вид {kind!r}')
+        yield number, kind, row
+
+
+def read_csv(source, kind):
+    reader = csv.DictReader(source)
+    for row in reader:
+        yield reader.line_num, kind, {
+            field: value if value != '' else None
+            for field, value in row.items()
+        }
+
+
+def _integer(number, field, value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise TransferError(f'Строка {number}: {field} должно быть '
+                            f'числом, а не {value!r}')
+
+
+def _date(number, field, value):
+    try:
+        date = parse_datetime(value)
+    except (TypeError, ValueError):
+        date = None
+    if date is None:
+        raise TransferError(f'Строка {number}: {field} должно быть '
+                            f'датой ISO 8601, а не {value!r}')
+    return date
+
+
+def clean(number, kind, row):
+    """Проверяет запись и приводит числа и даты; ошибка — TransferError."""
+    for field in REQUIRED[kind]:
+        if row.get(field) in (None, ''):
+            raise TransferError(f'Строка {number}: нет поля {field!r}')
+    row = dict(row)
+    for field in INTEGER_FIELDS:
+        if row.get(field) is not None:
+            row[field] = _integer(number, field, row[field])
+    for field in DATE_FIELDS:
+        if row.get(field):
+            row[field] = _date(number, field, row[field])
+    return row
+
+
+def parse_date(value):
+    """Дата из файла; без даты запись считается созданной сейчас."""
+    return value or timezone.now()
+
+
+@contextmanager
+def keep_dates():
+    """Не даёт auto_now_add затереть даты из файла при bulk_create."""
+    fields = [Post._meta.get_field('pub_date'),
+              Comment._meta.get_field('created')]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Копит записи пачками и пишет их в порядке KINDS.
+
+    Пользователи и группы ищутся по таблицам в памяти; неизвестных
+    пользователей загрузка создаёт без пароля, группы — с `slug` в
+    качестве названия.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.pending = defaultdict(list)
+        self.totals = Counter()
+
+    def add(self, number, kind, row):
+        # Записи, на которые может ссылаться новая, пишутся раньше неё.
+        for earlier in KINDS[:KINDS.index(kind)]:
+            self.flush(earlier)
+        self.pending[kind].append((number, clean(number, kind, row)))
+        if len(self.pending[kind]) >= self.batch_size:
+            self.flush(kind)
+
+    def finish(self):
+        for kind in KINDS:
+            self.flush(kind)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), list(MODELS.values())):
+                cursor.execute(sql)
+
+    def flush(self, kind):
+        batch, self.pending[kind] = self.pending[kind], []
+        if not batch:
+            return
+        try:
+            with transaction.atomic(), keep_dates():
+                objects = getattr(self, f'build_{kind}')(batch)
+                # Подписка, которая уже есть, пропускается.
+                MODELS[kind].objects.bulk_create(
+                    objects, ignore_conflicts=kind == 'follows'
+                )
+        except IntegrityError as error:
+            raise TransferError(f'Строки {batch[0][0]}–{batch[-1][0]}: '
+                                f'{error}')
+        if kind == 'groups':
+            # bulk_create на SQLite не возвращает id новых групп.
+            self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.totals[kind] += len(batch)
+
+    def user_ids(self, usernames):
+        missing = set(filter(None, usernames)) - self.users.keys()
+        if missing:
+            User.objects.bulk_create(User(username=name, password='!')
+                                     for name in missing)
+            self.users.update(User.objects.filter(username__in=missing)
+                              .values_list('username', 'pk'))
+        return self.users
+
+    def group_ids(self, slugs):
+        missing = set(filter(None, slugs)) - self.groups.keys()
+        if missing:
+            Group.objects.bulk_create(Group(slug=slug, title=slug)
+                                      for slug in missing)
+            self.groups.update(Group.objects.filter(slug__in=missing)
+                               .values_list('slug', 'pk'))
+        return self.groups
+
+    def build_groups(self, batch):
+        groups = {}
+        for _, row in batch:
+            if row['slug'] not in self.groups:
+                groups.setdefault(row['slug'], Group(
+                    slug=row['slug'], title=row['title'],
+                    description=row.get('description') or ''
+                ))
+        return list(groups.values())
+
+    def build_posts(self, batch):
+        users = self.user_ids(row['author'] for _, row in batch)
+        groups = self.group_ids(row.get('group') for _, row in batch)
+        return [Post(id=row.get('id'), author_id=users[row['author']],
+                     group_id=groups.get(row.get('group')),
+                     pub_date=parse_date(row.get('pub_date')),
+                     text=row['text'], image=row.get('image') or '')
+                for _, row in batch]
+
+    def build_comments(self, batch):
+        post_ids = {row['post'] for _, row in batch}
+        known = set(Post.objects.filter(pk__in=post_ids)
+                    .values_list('pk', flat=True))
+        for number, row in batch:
+            if row['post'] not in known:
+                raise TransferError(f'Строка {number}: нет поста '
+                                    f'{row["post"]}')
+        users = self.user_ids(row['author'] for _, row in batch)
+        return [Comment(id=row.get('id'), post_id=row['post'],
+                        author_id=users[row['author']],
+                        created=parse_date(row.get('created')),
+                        text=row['text'])
+                for _, row in batch]
+
+    def build_follows(self, batch):
+        users = self.user_ids(
+            name for _, row in batch for name in (row['user'], row['author'])
+        )
+        pairs = {(users[row['user']], users[row['author']])
+                 for _, row in batch}
+        return [Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in pairs]
+
+
+def load(records, batch_size=BATCH_SIZE, rebuild=True):
+    """Загружает записи (номер строки, вид, запись) из `read_*`.
+
+    Возвращает число записей по видам.
+    """
+    importer = Importer(batch_size)
+    for number, kind, row in records:
+        importer.add(number, kind, row)
+    importer.finish()
+    if rebuild:
+        rebuild_derived()
+    return importer.totals
+
+
+def count_image_references():
+    """Пересчитывает StoredFile по картинкам постов."""
+    StoredFile.objects.all().delete()
+    StoredFile.objects.bulk_create(
+        StoredFile(name=row['image'], refcount=row['total'])
+        for row in Post.objects.order_by().values('image')
+        .annotate(total=Count('pk'))
+        if is_content_addressed(row['image'])
+    )
+
+
+def rebuild_derived():
+    """Всё, что при обычной записи поддерживают сигналы."""
+    counters.recount()
+    timeline.rebuild()
+    search.get_backend().rebuild()
+    count_image_references()
+    thumbnails.backfill()
+    # Затронуты почти все области кэша, проще сбросить его целиком.
+    cache.clear()
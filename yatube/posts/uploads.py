@@ -0,0 +1,124 @@
+"""Потоковый приём картинок постов.
+
+`StreamingImageUploadHandler` пишет картинку кусками сразу во
+временный файл в `MEDIA_ROOT/posts/`, по пути считает sha256 и
+проверяет размеры по заголовку — Pillow читает только его и пиксели не
+декодирует. Хэш достаётся хранилищу (core.storage), которое по нему
+называет файл и переносит его на место переименованием, без
+копирования, или не пишет вовсе, если такой файл уже есть. Остальные
+загрузки (не картинки) проходят к стандартным обработчикам.
+
+Незавершённые загрузки оставляют в `MEDIA_ROOT/posts/` файлы
+`.upload-*.part` только при аварийной остановке процесса.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (FileUploadHandler,
+                                             StopFutureHandlers)
+from PIL import Image
+
+UPLOAD_DIR = 'posts'
+HEADER_SIZE = 64 * 1024
+
+
+class StreamedImageFile(UploadedFile):
+    """Загруженная картинка во временном файле рядом с итоговым местом."""
+
+    def __init__(self, file, name, content_type, size, charset, sha256,
+                 upload_error=None):
+        super().__init__(file, name, content_type, size, charset)
+        self.sha256 = sha256
+        self.upload_error = upload_error
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # Хранилище уже переименовало файл в итоговый.
+            pass
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """Обработчик загрузки картинок с ограниченным расходом памяти."""
+
+    def new_file(self, field_name, file_name, content_type, *args,
+                 **kwargs):
+        super().new_file(field_name, file_name, content_type, *args,
+                         **kwargs)
+        self.active = content_type.startswith('image/')
+        if not self.active:
+            return
+        directory = os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR)
+        os.makedirs(directory, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(
+            dir=directory, prefix='.upload-', suffix='.part'
+        )
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.header_checked = False
+        self.dimensions = None
+        self.error = None
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        self.size += len(raw_data)
+        if self.error is None and self.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+            limit = settings.IMAGE_UPLOAD_MAX_SIZE // 1024 // 1024
+            self.error = f'Файл больше {limit} МБ.'
+        if self.error is None:
+            self.sha256.update(raw_data)
+            self.file.write(raw_data)
+            if not self.header_checked and self.size >= HEADER_SIZE:
+                self.header_checked = True
+                self.inspect()
+        return None
+
+    def inspect(self):
+        """Проверяет размеры картинки по уже записанному заголовку."""
+        self.file.flush()
+        try:
+            with Image.open(self.file.name) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.error = 'Слишком большое изображение.'
+            return
+        except (OSError, SyntaxError, ValueError):
+            # Заголовок ещё не дописан или файл не картинка; второе
+            # сообщит поле формы.
+            return
+        self.dimensions = width, height
+        if max(width, height) > settings.IMAGE_UPLOAD_MAX_SIDE:
+            self.error = (f'Сторона изображения больше '
+                          f'{settings.IMAGE_UPLOAD_MAX_SIDE} пикселей.')
+        elif width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self.error = 'Слишком большое изображение.'
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        if self.dimensions is None and self.error is None:
+            self.inspect()
+        self.file.seek(0)
+        digest = self.sha256.hexdigest()
+        extension = os.path.splitext(self.file_name)[1].lower()
+        return StreamedImageFile(
+            self.file, f'{digest}{extension}', self.content_type, self.size,
+            self.charset, digest, self.error
+        )
+
+
+def validate_streamed_image(image):
+    """Валидатор поля формы: ошибки, найденные при приёме файла."""
+    error = getattr(image, 'upload_error', None)
+    if error:
+        raise ValidationError(error, code='upload_limits')
@@ -5,19 +5,25 @@ from . import views
 app_name = "posts"
 
 urlpatterns = [path('', views.index, name="index"),
+               path('groups/', views.group_index, name='group_index'),
                path('group/<slug:slug>/',
                     views.group_posts, name="group"),
                path('profile/<str:username>/',
                     views.profile, name='profile'),
                path('posts/<int:post_id>/',
                     views.post_detail, name='post_detail'),
+               path('posts/<int:post_id>/comments/',
+                    views.post_comments, name='post_comments'),
                path('create/', views.post_create,
                     name='post_create'),
                path('posts/<int:post_id>/edit/',
                     views.post_edit, name='post_edit'),
                path('posts/<int:post_id>/comment/',
                     views.add_comment, name='add_comment'),
+               path('search/', views.search, name='search'),
                path('follow/', views.follow_index, name='follow_index'),
+               path('follow/events/', views.follow_events,
+                    name='follow_events'),
                path('profile/<str:username>/follow/',
                     views.profile_follow, name='profile_follow'),
                path('profile/<str:username>/unfollow/',
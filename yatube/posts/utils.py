@@ -1,10 +1,194 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+from .models import Comment
 
 NUMBER_OF_OBJECTS = 10
+CURSOR_ORDERING = ('-pub_date', '-pk')
+# Порядок Comment.Meta.ordering с pk для однозначного ключа.
+COMMENT_ORDERING = ('-created', '-pk')
+COMMENTS_PER_PAGE = 20
+
+
+def encode_cursor(direction, values):
+    """Упаковывает направление и ключ записи в непрозрачный токен."""
+    raw = json.dumps([direction, *values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _clean_key(field, value):
+    if not isinstance(value, str):
+        raise ValidationError('Ключ курсора должен быть строкой')
+    value = field.to_python(value)
+    field.run_validators(value)
+    # У AutoField нет проверки диапазона, а база падает на числе
+    # больше 64 бит.
+    if isinstance(value, int) and value.bit_length() > 63:
+        raise ValidationError('Ключ курсора вне диапазона')
+    return value
+
+
+def decode_cursor(token, fields):
+    """Распаковывает токен с ключом по полям модели `fields`.
+
+    Для испорченного токена или ключа, который не приводится к типам
+    полей, возвращает None: тогда отдаётся первая страница.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, *values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if direction not in ('next', 'prev') or len(values) != len(fields):
+        return None
+    try:
+        values = [_clean_key(field, value)
+                  for field, value in zip(fields, values)]
+    except ValidationError:
+        return None
+    return direction, values
+
+
+class CursorPage(Page):
+    """Страница keyset-пагинации.
+
+    Совместима с `includes/paginator.html`: вместо номеров страниц
+    шаблон получает токены `next_cursor` и `previous_cursor`.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
 
+    def has_previous(self):
+        return self.previous_cursor is not None
 
-def get_page_context(post_list, request):
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу `ordering` без COUNT(*) и OFFSET.
+
+    Последнее поле `ordering` должно быть уникальным (обычно `pk`),
+    иначе записи с одинаковым ключом могут потеряться на границе
+    страниц.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, ordering=CURSOR_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.fields = [field.lstrip('-') for field in ordering]
+
+    def _key(self, obj):
+        return [str(getattr(obj, field)) for field in self.fields]
+
+    def _key_fields(self):
+        """Поля модели или аннотации, по которым проверяется ключ."""
+        query = self.object_list.query
+        opts = self.object_list.model._meta
+        fields = []
+        for name in self.fields:
+            if name in query.annotations:
+                fields.append(query.annotations[name].output_field)
+            elif name == 'pk':
+                fields.append(opts.pk)
+            else:
+                fields.append(opts.get_field(name))
+        return fields
+
+    def _after(self, values, reverse=False):
+        """Условие «запись стоит после ключа `values`» в порядке выдачи."""
+        condition = Q()
+        for index in range(len(self.fields) - 1, -1, -1):
+            field = self.fields[index]
+            descending = self.ordering[index].startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[index]})
+            if index < len(self.fields) - 1:
+                step |= Q(**{field: values[index]}) & condition
+            condition = step
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        ]
+
+    def get_page(self, cursor):
+        decoded = None
+        if cursor:
+            decoded = decode_cursor(cursor, self._key_fields())
+        queryset = self.object_list
+        if decoded is None:
+            rows = list(
+                queryset.order_by(*self.ordering)[:self.per_page + 1]
+            )
+            has_more, rows = len(rows) > self.per_page, rows[:self.per_page]
+            return self._page(rows, has_next=has_more, has_previous=False)
+        direction, values = decoded
+        if direction == 'next':
+            rows = list(
+                queryset.filter(self._after(values))
+                .order_by(*self.ordering)[:self.per_page + 1]
+            )
+            has_more, rows = len(rows) > self.per_page, rows[:self.per_page]
+            return self._page(rows, has_next=has_more, has_previous=True)
+        rows = list(
+            queryset.filter(self._after(values, reverse=True))
+            .order_by(*self._reversed_ordering())[:self.per_page + 1]
+        )
+        has_more, rows = len(rows) > self.per_page, rows[:self.per_page]
+        rows.reverse()
+        return self._page(rows, has_next=True, has_previous=has_more)
+
+    def _page(self, rows, has_next, has_previous):
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor('next', self._key(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor('prev', self._key(rows[0]))
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+def get_page_context(post_list, request, cursor=None,
+                     ordering=CURSOR_ORDERING):
+    """Возвращает страницу ленты.
+
+    Keyset-пагинация по ключу `ordering` включается параметром `cursor`
+    или настройкой `CURSOR_PAGINATION`; по умолчанию используется
+    обычный `Paginator`.
+    """
+    if cursor is None:
+        cursor = getattr(settings, 'CURSOR_PAGINATION', False)
+    if cursor:
+        paginator = CursorPaginator(post_list, NUMBER_OF_OBJECTS, ordering)
+        return paginator.get_page(request.GET.get('cursor'))
     paginator = Paginator(post_list, NUMBER_OF_OBJECTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def get_comments_page(post_id, cursor=None):
+    """Страница комментариев поста; следующие — по токену `cursor`."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    paginator = CursorPaginator(comments, COMMENTS_PER_PAGE,
+                                COMMENT_ORDERING)
+    return paginator.get_page(cursor)
@@ -1,42 +1,73 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import redirect, render, get_object_or_404
-from django.views.decorators.cache import cache_page
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import etag
+from core.asgi import is_asgi
+from users.cache import get_user_or_404
 from .models import Group, Post, Follow
 from .forms import CommentForm, PostForm
-from .utils import get_page_context
+from .cache import version_tag
+from .conditional import (comments_etag, group_etag, index_etag, post_etag,
+                          profile_etag)
+from .groups import SCOPE as GROUPS_SCOPE, get_group_or_404
+from .search import SearchResults
+from .utils import get_comments_page, get_page_context
+from . import timeline
 
 User = get_user_model()
 NUMBER_OF_OBJECTS = 10
 
 
-@cache_page(60 * 15)
+@etag(index_etag)
 def index(request):
-    posts = Post.objects.select_related('group', 'author')
+    posts = Post.objects.for_feed()
     page_obj = get_page_context(posts, request)
     context = {
         'page_obj': page_obj,
+        'cache_version': version_tag('index'),
     }
     return render(request, 'posts/index.html', context)
 
 
+def group_index(request):
+    """Каталог групп с числом постов и временем последнего поста"""
+    groups = Group.objects.only(
+        'slug', 'title', 'posts_count', 'last_post_at'
+    ).order_by('title', 'pk')
+    page_obj = get_page_context(groups, request, cursor=False)
+    context = {
+        'page_obj': page_obj,
+        'cache_version': version_tag('groups'),
+    }
+    return render(request, 'posts/groups.html', context)
+
+
+@etag(group_etag)
 def group_posts(request, slug):
     template = "posts/group_list.html"
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    group = get_group_or_404(slug)
+    post_list = group.posts.for_feed()
     page_obj = get_page_context(post_list, request)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_version': version_tag(f'group:{group.pk}'),
     }
     return render(request, template, context)
 
 
+@etag(profile_etag)
 def profile(request, username):
     """Страница профайла пользователя"""
     """на ней будет отображаться информация об авторе и его посты"""
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_user_or_404(
+        username, User.objects.select_related('post_counter')
+    )
+    post_list = author.posts.for_feed()
     page_obj = get_page_context(post_list, request)
     following = False
     if request.user.is_authenticated:
@@ -48,36 +79,59 @@ def profile(request, username):
         'page_obj': page_obj,
         'username': username,
         'following': following,
+        # В ленте профиля есть ссылки на группы постов.
+        'cache_version': version_tag(f'profile:{author.pk}', GROUPS_SCOPE),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@etag(post_etag)
 def post_detail(request, post_id):
     """Страница для просмотра отдельного поста"""
     """код запроса к модели и создание словаря контекста"""
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.select_related('author')
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    comments = get_comments_page(post.pk)
     form = CommentForm()
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments,
+        'cache_version': version_tag(f'post:{post.pk}'),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@etag(comments_etag)
+def post_comments(request, post_id):
+    """Следующая страница комментариев фрагментом HTML для подгрузки"""
+    comments = get_comments_page(post_id, request.GET.get('cursor'))
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Пост не найден')
+    context = {'post_id': post_id, 'comments': comments}
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def search(request):
+    """Поиск по тексту постов с сортировкой по релевантности"""
+    query = request.GET.get('q', '').strip()
+    results = SearchResults(query) if query else []
+    page_obj = get_page_context(results, request, cursor=False)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&' if query else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
-    if request.method == 'POST':
-        form = PostForm(request.POST)
-        if form.is_valid():
-            post = form.save(commit=False)
-            post.author = request.user
-            form.save()
-            return redirect('posts:profile', request.user)
-        return render(request, 'posts/create_post.html',
-                      {'form': form})
-    form = PostForm()
+    form = PostForm(request.POST or None, files=request.FILES or None)
+    if form.is_valid():
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        return redirect('posts:profile', request.user)
     return render(request, 'posts/create_post.html',
                   {'form': form})
 
@@ -86,7 +140,11 @@ def post_create(request):
 def post_edit(request, post_id):
     """Страница редактирования постов"""
     post = get_object_or_404(Post, pk=post_id)
-    form = PostForm(request.POST or None, instance=post)
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        instance=post
+    )
     if post.author == request.user:
         if form.is_valid():
             form.save()
@@ -96,11 +154,6 @@ def post_edit(request, post_id):
         'is_edit': True,
         'post': post,
     }
-    form = PostForm(
-        request.POST or None,
-        files=request.FILES or None,
-        instance=post
-    )
     return render(request, 'posts/create_post.html', context)
 
 
@@ -119,18 +172,33 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     template = 'posts/posts_follow.html'
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_context(posts_list, request)
+    keyset = settings.CURSOR_PAGINATION
+    posts_list = timeline.feed(request.user, keyset).for_feed()
+    page_obj = get_page_context(posts_list, request, cursor=keyset,
+                                ordering=timeline.CURSOR_ORDERING)
     context = {'page_obj': page_obj}
+    if not page_obj.has_previous() and is_asgi(request):
+        # На первой странице ленты — плашка о новых постах, см. events.
+        # Поток событий есть только под ASGI.
+        newest = next(iter(page_obj), None)
+        context['events_after'] = newest.pk if newest else 0
     return render(request, template, context)
 
 
+def follow_events(request):
+    """Под WSGI потока событий нет, см. posts.events.
+
+    Ответ 204 говорит EventSource больше не переподключаться.
+    """
+    return HttpResponse(status=204)
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(username)
     user = request.user
     if author != user:
-        Follow.objects.get_or_create(user=user, author=author)
+        Follow.objects.get_or_create(user=user, author_id=author.pk)
     return redirect("posts:profile", username=username)
 
 
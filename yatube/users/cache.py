@@ -0,0 +1,50 @@
+"""Кэш пользователей по username для страниц профиля.
+
+В кэше лежит только сводка (id, username, имя и фамилия); из неё
+собирается экземпляр `User`, у которого остальные поля отложены и
+читаются из базы при первом обращении. Сводку сбрасывают сигналы
+сохранения и удаления пользователя, см. users.signals. Несуществующий
+username кэшируется ненадолго, чтобы перебор адресов не ходил в базу.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.http import Http404
+
+User = get_user_model()
+SUMMARY_FIELDS = ('id', 'username', 'first_name', 'last_name')
+SUMMARY_KEY = 'user:{}'
+SUMMARY_TIMEOUT = 60 * 60 * 24
+MISSING = 'missing'
+MISSING_TIMEOUT = 60
+
+
+def summary_key(username):
+    return SUMMARY_KEY.format(username)
+
+
+def get_user_or_404(username, queryset=None):
+    """Пользователь по username; при попадании в кэш — без запроса.
+
+    При промахе пользователь читается из `queryset`, так что связи из
+    его `select_related` доступны хотя бы на первом запросе.
+    """
+    key = summary_key(username)
+    cached = cache.get(key)
+    if cached == MISSING:
+        raise Http404('Пользователь не найден')
+    if cached is not None:
+        return User.from_db(router.db_for_read(User), SUMMARY_FIELDS,
+                            cached)
+    queryset = User.objects.all() if queryset is None else queryset
+    user = queryset.filter(username=username).first()
+    if user is None:
+        cache.set(key, MISSING, MISSING_TIMEOUT)
+        raise Http404('Пользователь не найден')
+    cache.set(key, [getattr(user, field) for field in SUMMARY_FIELDS],
+              SUMMARY_TIMEOUT)
+    return user
+
+
+def forget(*usernames):
+    cache.delete_many([summary_key(username) for username in usernames])
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import SUMMARY_FIELDS, User, forget
+
+
+def changes_summary(update_fields):
+    return update_fields is None or bool(set(update_fields)
+                                         & set(SUMMARY_FIELDS))
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    """Прежний username, чтобы сбросить и его после переименования."""
+    instance._previous_username = None
+    if instance.pk and changes_summary(update_fields):
+        instance._previous_username = (
+            User.objects.filter(pk=instance.pk)
+            .values_list('username', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user(sender, instance, update_fields=None, **kwargs):
+    if not changes_summary(update_fields):
+        return
+    previous = getattr(instance, '_previous_username', None)
+    forget(*filter(None, {instance.username, previous}))
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase
+
+from .cache import get_user_or_404
+
+User = get_user_model()
+
+
+class UserCacheTest(TestCase):
+    """Кэш пользователей по username"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+
+    def test_second_lookup_skips_database(self):
+        """Повторный поиск собирает пользователя из кэша без запросов"""
+        get_user_or_404('leo')
+        with self.assertNumQueries(0):
+            user = get_user_or_404('leo')
+            self.assertEqual(user, self.user)
+            self.assertEqual(user.get_full_name(), 'Лев Толстой')
+
+    def test_cached_user_loads_other_fields_lazily(self):
+        """Поля вне сводки дочитываются из базы"""
+        get_user_or_404('leo')
+        user = get_user_or_404('leo')
+        with self.assertNumQueries(1):
+            self.assertEqual(user.date_joined, self.user.date_joined)
+
+    def test_save_refreshes_summary(self):
+        """Сохранение и переименование сбрасывают сводку"""
+        get_user_or_404('leo')
+        self.user.first_name = 'Лёва'
+        self.user.save()
+        self.assertEqual(get_user_or_404('leo').first_name, 'Лёва')
+        self.user.username = 'lev'
+        self.user.save()
+        self.assertEqual(get_user_or_404('lev'), self.user)
+        with self.assertRaises(Http404):
+            get_user_or_404('leo')
+
+    def test_login_keeps_summary(self):
+        """Обновление last_login сводку не сбрасывает"""
+        get_user_or_404('leo')
+        self.client.force_login(self.user)
+        with self.assertNumQueries(0):
+            get_user_or_404('leo')
+
+    def test_missing_user_is_cached(self):
+        """Несуществующий username ищется в базе один раз, пока не создан"""
+        with self.assertRaises(Http404):
+            get_user_or_404('anna')
+        with self.assertNumQueries(0), self.assertRaises(Http404):
+            get_user_or_404('anna')
+        User.objects.create_user(username='anna')
+        self.assertEqual(get_user_or_404('anna').username, 'anna')
@@ -0,0 +1,16 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``; serve it with any ASGI server, for example
+``uvicorn yatube.asgi:application``. Django 2.2 has no ASGI support of
+its own, so views run in a bounded thread pool, see core.asgi.
+"""
+
+import os
+
+from core.asgi import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = ASGIHandler()
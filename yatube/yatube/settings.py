@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,11 +51,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -84,12 +87,60 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Профиль для небольших продакшен-установок на SQLite: WAL пускает
+# читателей параллельно с писателем, busy_timeout и транзакции
+# BEGIN IMMEDIATE (core.backends.sqlite3) заставляют писателей ждать
+# блокировку вместо ошибки «database is locked». PRAGMA выполняет
+# core.signals.apply_sqlite_pragmas при каждом подключении.
+SQLITE_PRODUCTION = os.getenv('YATUBE_SQLITE_PRODUCTION') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, а не в страницах.
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+if SQLITE_PRODUCTION:
+    DATABASES['default'].update(ENGINE='core.backends.sqlite3',
+                                PRAGMAS=SQLITE_PRAGMAS, CONN_MAX_AGE=60)
+
+# Реплики только для чтения: файлы SQLite через запятую. Копирует в них
+# основную базу команда `replicate`, читает из них core.routers.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+        filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, name),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:post_comments',
+    'posts:follow_index',
+    'api:posts',
+    'api:post_detail',
+    'api:comments',
+    'api:groups',
+    'api:group_detail',
+    'api:follow_feed',
+    'api:profile',
+)
+# Сколько секунд после записи браузер читает из основной базы.
+REPLICA_STICKY_SECONDS = 10
 
 
 # Password validation
@@ -125,6 +176,14 @@ USE_L10N = True
 USE_TZ = True
 
 NUMBER = 15
+
+# Keyset-пагинация лент по (pub_date, pk) вместо OFFSET, см. posts.utils
+CURSOR_PAGINATION = False
+
+# Авторы с большим числом подписчиков не раскладываются по лентам,
+# их посты подмешиваются в follow_index при чтении
+FEED_FANOUT_LIMIT = 5000
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
@@ -145,8 +204,110 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 upload_to = 'posts/'
 
+# Картинки постов хранятся по хэшу содержимого, см. core.storage
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+CONTENT_ADDRESSED_DIRS = ('posts/',)
+# Файлы без ссылок старше этого числа секунд удаляет sweep_files
+FILES_ORPHAN_MIN_AGE = 60 * 60
+# Отдавать медиа самим Django, а не веб-сервером
+SERVE_MEDIA = os.getenv('YATUBE_SERVE_MEDIA') == '1'
+
+# Картинки принимаются потоком, см. posts.uploads
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.StreamingImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_PERMISSIONS = 0o644
+IMAGE_UPLOAD_MAX_SIZE = 25 * 1024 * 1024
+IMAGE_UPLOAD_MAX_SIDE = 10000
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+
+# Миниатюры, которые заранее готовят задачи очереди (воркер run_tasks)
+THUMBNAIL_GEOMETRIES = {
+    '960x339': {'crop': 'center', 'upscale': True},
+}
+
+# Общий для воркеров кэш выбирается переменными окружения, см. core.cache
+CACHE_BACKENDS = {
+    'locmem': ('core.cache.locmem.LocMemCache', ''),
+    'redis': ('core.cache.redis.RedisCache', 'redis://127.0.0.1:6379/0'),
+    'sqlite': ('core.cache.sqlite.SQLiteCache',
+               os.path.join(BASE_DIR, 'cache.sqlite3')),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.getenv('YATUBE_CACHE', 'locmem')
+]
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('YATUBE_CACHE_LOCATION', CACHE_LOCATION),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'COMPRESS_MIN_LENGTH': 1024,
+        },
     }
 }
+
+# Потоки для представлений при запуске через ASGI, см. core.asgi.
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', 8))
+# Адреса, которые под ASGI обслуживает асинхронное приложение, а не
+# WSGI-обработчик в пуле: имя адреса → фабрика приложения.
+ASGI_ROUTES = {
+    'posts:follow_events': 'posts.events.FollowEvents',
+}
+
+# Брокер событий между процессами, см. core.pubsub
+PUBSUB_BACKENDS = {
+    'local': ('core.pubsub.LocalBroker', ''),
+    'redis': ('core.pubsub.RedisBroker', 'redis://127.0.0.1:6379/0'),
+}
+PUBSUB_BACKEND, PUBSUB_LOCATION = PUBSUB_BACKENDS[
+    os.getenv('YATUBE_PUBSUB', 'local')
+]
+PUBSUB_LOCATION = os.getenv('YATUBE_PUBSUB_LOCATION', PUBSUB_LOCATION)
+
+# Поток событий ленты подписок (только под ASGI): пауза между пингами,
+# секунды.
+EVENTS_HEARTBEAT = 15
+
+# Фоновые задачи, см. core.tasks: задачи выполняет воркер run_tasks.
+# С YATUBE_TASKS_EAGER=1 они выполняются сразу при постановке, без
+# воркера; так же их выполняют тесты (core.testing.TestRunner).
+# Аренда — секунды, после которых задача упавшего воркера вернётся.
+TASKS_EAGER = os.getenv('YATUBE_TASKS_EAGER', '0') == '1'
+TEST_RUNNER = 'core.testing.TestRunner'
+TASKS_LEASE = 300
+
+# Отчёты замеров: бюджеты запросов и нагрузочные прогоны.
+REPORTS_DIR = os.getenv('YATUBE_REPORTS_DIR',
+                        os.path.join(BASE_DIR, 'reports'))
+
+# Метрики запросов, см. core.metrics: доля запросов с подробностями,
+# токен для /metrics/ и уровень JSON-логов. Без токена /metrics/
+# отключён: за обратным прокси REMOTE_ADDR у всех запросов — адрес
+# прокси, и проверка адреса ничего не закрывает.
+METRICS_SAMPLE_RATE = float(os.getenv('YATUBE_METRICS_SAMPLE_RATE', '1'))
+METRICS_TOKEN = os.getenv('YATUBE_METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'metrics': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'yatube.metrics': {
+            'handlers': ['metrics'],
+            'level': os.getenv('YATUBE_METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}